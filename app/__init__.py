@@ -30,6 +30,8 @@ def create_app(config_class=Config):
 
     # Import models here so that they are registered with SQLAlchemy
     from app import models
+    from app import stats  # registers the trade statistics flush hook
+    from app import importer  # registers the flush hook forgetting deleted trades' imports
 
     from app.routes import bp as main_blueprint
     app.register_blueprint(main_blueprint)
@@ -40,6 +42,9 @@ def create_app(config_class=Config):
     from app import cli
     cli.register_commands(app)
 
+    from app import tasks
+    tasks.init_app(app)
+
     @app.before_request
     def update_last_seen():
         from flask_login import current_user
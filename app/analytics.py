@@ -0,0 +1,178 @@
+"""Vectorized analytics over a columnar trade frame.
+
+TradeFrame pulls the columns the analytics need into NumPy arrays with a
+single query; the kernels below then work on whole arrays at once instead
+of looping over Trade objects.
+"""
+from functools import cached_property
+import numpy as np
+from app import db
+from app.models import Trade
+from app.charts import execution_date
+
+# Trading days per year, used to annualize daily Sharpe and Sortino ratios
+TRADING_DAYS = 252
+
+
+class TradeFrame:
+    """A user's trades as parallel NumPy arrays, ordered by execution date."""
+
+    def __init__(self, rows):
+        pnl, entry_date, exit_date, direction, ticker, strategy_id, account = zip(*rows) if rows else ((),) * 7
+        self.pnl = np.array(pnl, dtype=float)  # None becomes NaN
+        self.entry_date = np.array(entry_date, dtype='datetime64[s]')
+        self.exit_date = np.array(exit_date, dtype='datetime64[s]')  # None becomes NaT
+        self.direction = np.array(direction, dtype=object)
+        self.ticker = np.array(ticker, dtype=object)
+        self.strategy_id = np.array(strategy_id, dtype=object)
+        self.account = np.array(account, dtype=object)
+        self.executed = np.where(np.isnat(self.exit_date), self.entry_date, self.exit_date)
+
+    @classmethod
+    def load(cls, user_id, account=None):
+        executed = execution_date()
+        query = db.session.query(
+            Trade.pnl, Trade.entry_date, Trade.exit_date, Trade.direction,
+            Trade.ticker, Trade.strategy_id, Trade.account,
+        ).filter(Trade.user_id == user_id)
+        if account:
+            query = query.filter(Trade.account == account)
+        return cls(query.order_by(executed, Trade.id).all())
+
+    def __len__(self):
+        return self.pnl.size
+
+    @property
+    def realized(self):
+        """PnL with open trades counted as zero."""
+        return np.nan_to_num(self.pnl)
+
+    @cached_property
+    def equity(self):
+        """Cumulative PnL after each trade."""
+        return np.cumsum(self.realized)
+
+    @cached_property
+    def underwater(self):
+        """(peak, drawdown) arrays of the equity curve."""
+        return underwater(self.equity)
+
+
+def expectancy(pnl):
+    """Average PnL per trade with a recorded result."""
+    closed = pnl[~np.isnan(pnl)]
+    return float(closed.mean()) if closed.size else 0.0
+
+
+def daily_pnl(frame):
+    """PnL summed per execution day."""
+    days, index = np.unique(frame.executed.astype('datetime64[D]'), return_inverse=True)
+    return days, np.bincount(index, weights=frame.realized, minlength=days.size)
+
+
+def sharpe_ratio(daily):
+    """Annualized Sharpe ratio of daily PnL (zero risk-free rate)."""
+    if daily.size < 2:
+        return None
+    std = daily.std(ddof=1)
+    return float(daily.mean() / std * np.sqrt(TRADING_DAYS)) if std > 0 else None
+
+
+def sortino_ratio(daily):
+    """Annualized Sortino ratio of daily PnL, penalizing only losing days."""
+    if daily.size < 2:
+        return None
+    downside = np.sqrt(np.mean(np.minimum(daily, 0) ** 2))
+    return float(daily.mean() / downside * np.sqrt(TRADING_DAYS)) if downside > 0 else None
+
+
+def underwater(equity):
+    """Running peak of the equity curve and the drawdown below it after each trade."""
+    # The account starts flat, so the first peak is zero
+    peak = np.maximum.accumulate(np.maximum(equity, 0))
+    return peak, equity - peak
+
+
+def _days(delta):
+    return float(delta.astype('timedelta64[s]').astype(float) / 86400.0)
+
+
+def drawdown_profile(frame, capital=None):
+    """Max drawdown (absolute and % of balance), its duration and recovery, and the longest time underwater.
+
+    The percentage is the deepest drawdown relative to the account balance
+    at the peak it fell from, capital plus the PnL up to that peak; it is
+    None without a positive capital. Durations are in days.
+    time_to_recovery_days is None while the deepest drawdown has not been
+    recovered yet.
+    """
+    profile = {
+        'max_drawdown': 0.0,
+        'max_drawdown_pct': None,
+        'drawdown_duration_days': 0.0,
+        'time_to_recovery_days': 0.0,
+        'longest_drawdown_days': 0.0,
+    }
+    if not len(frame):
+        return profile
+    peak, drawdown = frame.underwater
+    executed = frame.executed
+    trough = int(np.argmin(drawdown))
+    if drawdown[trough] >= 0:
+        return profile
+    at_peak = np.flatnonzero(drawdown[:trough] == 0)
+    peak_index = at_peak[-1] if at_peak.size else 0
+    recovered = np.flatnonzero(drawdown[trough:] >= 0)
+    profile['max_drawdown'] = float(drawdown[trough])
+    if capital is not None and capital > 0:
+        profile['max_drawdown_pct'] = float(drawdown[trough] / (capital + peak[trough]) * 100)
+    profile['drawdown_duration_days'] = _days(executed[trough] - executed[peak_index])
+    profile['time_to_recovery_days'] = (
+        _days(executed[trough + recovered[0]] - executed[trough]) if recovered.size else None
+    )
+
+    # Underwater stretches: from the last peak to the first trade back at or above it
+    edges = np.diff(np.concatenate(([0], (drawdown < 0).astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.minimum(np.flatnonzero(edges == -1), len(frame) - 1)
+    profile['longest_drawdown_days'] = _days((executed[ends] - executed[np.maximum(starts - 1, 0)]).max())
+    return profile
+
+
+def rolling_win_rate(pnl, window=20):
+    """Win rate (%) over the last `window` trades with a result, expanding at the start."""
+    closed = pnl[~np.isnan(pnl)]
+    if not closed.size:
+        return closed
+    wins = np.concatenate(([0], np.cumsum(closed > 0)))
+    counts = np.minimum(np.arange(1, closed.size + 1), window)
+    positions = np.arange(1, closed.size + 1)
+    return (wins[positions] - wins[positions - counts]) / counts * 100
+
+
+def streaks(pnl):
+    """Longest winning streak, longest losing streak and the current streak (negative when losing)."""
+    outcome = np.sign(pnl[~np.isnan(pnl)])
+    if not outcome.size:
+        return 0, 0, 0
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(outcome)) + 1))
+    lengths = np.diff(np.concatenate((starts, [outcome.size])))
+    values = outcome[starts]
+    longest_win = int(lengths[values > 0].max(initial=0))
+    longest_loss = int(lengths[values < 0].max(initial=0))
+    return longest_win, longest_loss, int(lengths[-1] * values[-1])
+
+
+def risk_metrics(frame, capital=None):
+    """Risk and consistency metrics for the statistics page; capital is the account balance before trading."""
+    _, daily = daily_pnl(frame)
+    longest_win, longest_loss, current = streaks(frame.pnl)
+    return dict(
+        drawdown_profile(frame, capital),
+        expectancy=expectancy(frame.pnl),
+        sharpe_ratio=sharpe_ratio(daily),
+        sortino_ratio=sortino_ratio(daily),
+        longest_win_streak=longest_win,
+        longest_loss_streak=longest_loss,
+        current_streak=current,
+    )
@@ -0,0 +1,52 @@
+"""Share-card background and fonts, loaded once per process.
+
+Decoding card_bg.png and parsing the Roboto variable font are most of the
+cost of drawing a card, so the decoded background and one font object per
+size are kept for the life of the process. Nothing is loaded until the
+first card is drawn; after that every render starts from a copy of the
+background, which is a memory copy rather than a PNG decode.
+"""
+import os
+import sys
+import threading
+from PIL import Image, ImageFont
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+BACKGROUND_PATH = os.path.join(STATIC_DIR, 'card_bg.png')
+FONT_PATH = os.path.join(STATIC_DIR, 'fonts', 'Roboto-VariableFont_wdth,wght.ttf')
+
+_lock = threading.Lock()
+_background = None
+_fonts = {}
+
+
+def background():
+    """The decoded RGBA background; callers must not draw on it."""
+    global _background
+    if _background is None:
+        with _lock:
+            if _background is None:
+                with Image.open(BACKGROUND_PATH) as img:
+                    _background = img.convert('RGBA')
+    return _background
+
+
+def canvas():
+    """A fresh copy of the background to draw one card on."""
+    return background().copy()
+
+
+def font(size):
+    """Roboto at size, or Pillow's default font if it cannot be loaded."""
+    loaded = _fonts.get(size)
+    if loaded is None:
+        with _lock:
+            loaded = _fonts.get(size)
+            if loaded is None:
+                try:
+                    loaded = ImageFont.truetype(FONT_PATH, size)
+                except OSError as e:
+                    print(f"[ERROR] Could not load Roboto font: {e}", file=sys.stderr)
+                    loaded = ImageFont.load_default()
+                _fonts[size] = loaded
+    return loaded
@@ -0,0 +1,284 @@
+"""Share-card rendering with a content-addressed disk cache.
+
+Both share routes draw the same card. A rendered card is stored in
+CARD_CACHE_FOLDER under a hash of exactly what is drawn on it: the text as
+it appears on the card, the screenshot file's size and modification time,
+and TEMPLATE_VERSION. Editing a trade therefore changes its key and the
+next view renders a fresh card, while unchanged trades are served from
+disk. Bump TEMPLATE_VERSION whenever the layout changes.
+
+Each card is encoded once per output format and cached as {key}.{format}.
+negotiate_format() picks WebP (or AVIF) for clients that list it in their
+Accept header and a palette-quantized PNG for everyone else, which is what
+crawlers get.
+
+The folder is kept under CARD_CACHE_MAX_BYTES by evicting the least
+recently used cards; a cache hit refreshes the file's modification time.
+Each process tracks the folder's size from its own writes and only scans
+it once that estimate crosses the limit, pruning to PRUNE_TO of it.
+"""
+import hashlib
+import os
+import threading
+import uuid
+from PIL import Image, ImageDraw, features
+from flask import current_app
+from app import card_assets, screenshots
+
+TEMPLATE_VERSION = 1
+
+# format: (Pillow format, MIME type, save options)
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 85}),
+    'avif': ('AVIF', 'image/avif', {'quality': 70}),
+    'png': ('PNG', 'image/png', {'optimize': True}),
+}
+
+# Preferred first among the formats a client explicitly accepts; PNG is the fallback
+NEGOTIATED_FORMATS = [fmt for fmt in ('webp', 'avif') if features.check(fmt)]
+DEFAULT_FORMAT = 'png'
+
+# Encoded ahead of time by the background renderer: browsers' and crawlers' formats
+PRERENDER_FORMATS = NEGOTIATED_FORMATS[:1] + [DEFAULT_FORMAT]
+
+SCREENSHOT_SIZE = 80
+
+# Fraction of CARD_CACHE_MAX_BYTES left after pruning, so scans stay rare
+PRUNE_TO = 0.9
+
+# Estimated bytes in each cache folder, from the last scan plus this process's writes since
+_folder_bytes = {}
+_folder_lock = threading.Lock()
+
+
+def _text_size(font, text):
+    bbox = font.getbbox(text)
+    return bbox[2] - bbox[0], bbox[3] - bbox[1]
+
+
+def _screenshot_path(trade, upload_folder):
+    """The screenshot's small copy for the inset, or the best file on disk until it is ready."""
+    if not trade.screenshot:
+        return None
+    screenshot = screenshots.best_available(upload_folder, trade, 'inset')
+    path = os.path.join(upload_folder, screenshot.replace('\\', '/'))
+    return path if os.path.exists(path) else None
+
+
+def card_fields(trade, upload_folder):
+    """Everything the card shows, as it is drawn."""
+    screenshot = _screenshot_path(trade, upload_folder)
+    if screenshot:
+        stat = os.stat(screenshot)
+        screenshot = (os.path.basename(screenshot), stat.st_size, stat.st_mtime_ns)
+    return (
+        trade.ticker,
+        trade.direction.capitalize(),
+        f"{trade.pnl:.2f}" if trade.pnl is not None else '-',
+        f"{trade.entry_price:.2f}",
+        f"{trade.exit_price:.2f}" if trade.exit_price is not None else '-',
+        trade.strategy.name if trade.strategy else '-',
+        trade.entry_date.strftime('%Y-%m-%d'),
+        screenshot,
+    )
+
+
+def card_key(trade, upload_folder):
+    fields = (TEMPLATE_VERSION,) + card_fields(trade, upload_folder)
+    return hashlib.sha256(repr(fields).encode('utf-8')).hexdigest()
+
+
+def _draw_badge(text, font, color):
+    text_w, text_h = _text_size(font, text)
+    badge_w, badge_h = text_w + 36, text_h + 16  # padding inside the badge
+    badge = Image.new('RGBA', (badge_w, badge_h), (0, 0, 0, 0))
+    badge_draw = ImageDraw.Draw(badge)
+    badge_draw.rounded_rectangle([(0, 0), (badge_w, badge_h)], radius=badge_h // 2, fill=color)
+    badge_draw.text(((badge_w - text_w) // 2, (badge_h - text_h) // 2), text, font=font, fill='#fff')
+    return badge
+
+
+def render(trade, upload_folder):
+    """Draw the share card for trade; returns an RGBA image."""
+    card = card_assets.canvas()
+    width, height = card.size
+    font_title = card_assets.font(64)
+    font_label = card_assets.font(36)
+    font_value = card_assets.font(48)
+    font_pnl = card_assets.font(96)
+    font_small = card_assets.font(28)
+    font_value_large = card_assets.font(60)
+    font_badge = card_assets.font(44)
+    draw = ImageDraw.Draw(card)
+
+    center_x = width // 2
+    y = 250  # Below the lion logo
+
+    title_text = "KINGLINE"
+    title_w, title_h = _text_size(font_title, title_text)
+    draw.text((center_x - title_w // 2, y), title_text, font=font_title, fill='#f7b32b')
+    y += title_h + 30
+
+    # Ticker with the direction badge to its right, or below it if it does not fit
+    ticker_text = trade.ticker
+    ticker_w, ticker_h = _text_size(font_value_large, ticker_text)
+    badge_text = trade.direction.capitalize()
+    badge_color = (0, 212, 170, 255) if badge_text == 'Long' else (255, 107, 107, 255)
+    badge = _draw_badge(badge_text, font_badge, badge_color)
+    badge_w, badge_h = badge.size
+    badge_gap = 20
+    ticker_x = center_x - (ticker_w + badge_gap + badge_w) // 2
+    badge_x = ticker_x + ticker_w + badge_gap
+    if badge_x + badge_w < width - 20:
+        draw.text((ticker_x, y), ticker_text, font=font_value_large, fill='#fff')
+        card.paste(badge, (int(badge_x), int(y + (ticker_h - badge_h) // 2)), badge)
+        y += max(ticker_h, badge_h) + 30
+    else:
+        draw.text((center_x - ticker_w // 2, y), ticker_text, font=font_value_large, fill='#fff')
+        y += ticker_h + 10
+        card.paste(badge, (int(center_x - badge_w // 2), int(y)), badge)
+        y += badge_h + 30
+
+    # Large PnL, colored by sign
+    pnl_color = '#00d4aa' if trade.pnl and trade.pnl > 0 else '#ff6b6b' if trade.pnl and trade.pnl < 0 else '#fff'
+    pnl_text = f"{trade.pnl:.2f}" if trade.pnl is not None else '-'
+    pnl_label = "PnL"
+    pnl_label_w, pnl_label_h = _text_size(font_label, pnl_label)
+    pnl_text_w, pnl_text_h = _text_size(font_pnl, pnl_text)
+    draw.text((center_x - pnl_label_w // 2, y), pnl_label, font=font_label, fill='#b0b0b0')
+    y += pnl_label_h + 8
+    draw.text((center_x - pnl_text_w // 2, y), pnl_text, font=font_pnl, fill=pnl_color)
+    y += pnl_text_h + 36
+
+    # Entry and exit prices in two columns, values sharing a baseline
+    col_width = 220
+    columns = (
+        ("Entry", f"{trade.entry_price:.2f}"),
+        ("Exit", f"{trade.exit_price:.2f}" if trade.exit_price is not None else '-'),
+    )
+    label_h = max(_text_size(font_label, label)[1] for label, _ in columns)
+    value_baseline = y + label_h + 8 + max(_text_size(font_value, value)[1] for _, value in columns)
+    col_x = center_x - col_width
+    for label, value in columns:
+        label_w, _ = _text_size(font_label, label)
+        value_w, value_h = _text_size(font_value, value)
+        draw.text((col_x + (col_width - label_w) // 2, y), label, font=font_label, fill='#b0b0b0')
+        draw.text((col_x + (col_width - value_w) // 2, value_baseline - value_h), value, font=font_value, fill='#fff')
+        col_x += col_width
+
+    # Strategy and date at the bottom
+    bottom_y = height - 80
+    strat_text = f"Strategy: {trade.strategy.name if trade.strategy else '-'}"
+    date_text = f"Date: {trade.entry_date.strftime('%Y-%m-%d')}"
+    strat_w, strat_h = _text_size(font_small, strat_text)
+    date_w, _ = _text_size(font_small, date_text)
+    draw.text((center_x - strat_w // 2, bottom_y), strat_text, font=font_small, fill='#b0b0b0')
+    draw.text((center_x - date_w // 2, bottom_y + strat_h + 4), date_text, font=font_small, fill='#b0b0b0')
+
+    # Screenshot thumbnail, bottom right above the logo
+    screenshot_path = _screenshot_path(trade, upload_folder)
+    if screenshot_path:
+        try:
+            with Image.open(screenshot_path) as img:
+                img.thumbnail((SCREENSHOT_SIZE, SCREENSHOT_SIZE))
+                mask = Image.new('L', img.size, 0)
+                ImageDraw.Draw(mask).rounded_rectangle([(0, 0), img.size], radius=12, fill=255)
+                img.putalpha(mask)
+                card.paste(img, (width - 110, height - 130), img)
+        except Exception:
+            pass
+    return card
+
+
+def negotiate_format(accept):
+    """Card format for a request's Accept header (a werkzeug MIMEAccept).
+
+    Wildcards do not count, so clients that only send */* get PNG.
+    """
+    accepted = {value for value, quality in accept if quality > 0}
+    for fmt in NEGOTIATED_FORMATS:
+        if FORMATS[fmt][1] in accepted:
+            return fmt
+    return DEFAULT_FORMAT
+
+
+def mimetype(fmt):
+    return FORMATS[fmt][1]
+
+
+def _encode(card, path, fmt):
+    """Write card to path in fmt; returns the file's size."""
+    pillow_format, _, options = FORMATS[fmt]
+    if fmt == 'png':
+        # A 256-colour palette with alpha is a fraction of the size of RGBA
+        card = card.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+    # Write under a temporary name so concurrent requests never serve a partial file
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    card.save(tmp_path, pillow_format, **options)
+    size = os.path.getsize(tmp_path)
+    os.replace(tmp_path, path)
+    return size
+
+
+def _prune(folder, max_bytes, keep):
+    """Delete the least recently used cards not in keep until folder is within max_bytes.
+
+    Returns the bytes left in the folder.
+    """
+    extensions = tuple(f'.{fmt}' for fmt in FORMATS)
+    entries = []
+    total = 0
+    with os.scandir(folder) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(extensions):
+                stat = entry.stat()
+                total += stat.st_size
+                if entry.path not in keep:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+    return total
+
+
+def _account_write(folder, written, keep):
+    """Add written bytes to folder's estimate, pruning once it is over the limit."""
+    max_bytes = current_app.config['CARD_CACHE_MAX_BYTES']
+    with _folder_lock:
+        total = _folder_bytes.get(folder)
+        if total is not None and total + written <= max_bytes:
+            _folder_bytes[folder] = total + written
+            return
+    # Scanned on the first write to the folder, then whenever the estimate is over the limit
+    total = _prune(folder, max_bytes if total is None else int(max_bytes * PRUNE_TO), keep)
+    with _folder_lock:
+        _folder_bytes[folder] = total
+
+
+def cached_cards(trade, upload_folder, formats, key=None):
+    """{format: path} of the trade's cached cards, rendering once for any formats missing."""
+    folder = current_app.config['CARD_CACHE_FOLDER']
+    key = key or card_key(trade, upload_folder)
+    paths = {fmt: os.path.join(folder, f'{key}.{fmt}') for fmt in formats}
+    missing = []
+    for fmt, path in paths.items():
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            missing.append(fmt)
+    if missing:
+        os.makedirs(folder, exist_ok=True)
+        card = render(trade, upload_folder)
+        written = sum(_encode(card, paths[fmt], fmt) for fmt in missing)
+        _account_write(folder, written, set(paths.values()))
+    return paths
+
+
+def card_path(trade, upload_folder, fmt=DEFAULT_FORMAT, key=None):
+    """Path of the trade's cached card in fmt, rendering it first on a miss."""
+    return cached_cards(trade, upload_folder, (fmt,), key)[fmt]
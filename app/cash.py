@@ -0,0 +1,137 @@
+"""Reconciliation of imported Tradovate cash history against trades.
+
+Cash History exports are stored as CashLedgerEntry rows by the importer.
+Realized PnL ("Trade Paired"), actual commissions and the closing balance
+are summed per account and trading day with GROUP BY subqueries. Those are
+joined to the same per-day totals of the trade journal, so a page view
+runs one aggregate query instead of a lookup per entry or trade.
+"""
+from collections import namedtuple
+from app import db
+from app.importer import COMMISSION_PER_CONTRACT
+from app.models import CashLedgerEntry, Trade
+
+TRADE_PAIRED = 'Trade Paired'
+COMMISSION = 'Commission'
+
+# Differences smaller than this are rounding, not a mismatch
+TOLERANCE = 0.005
+
+ReconciledDay = namedtuple('ReconciledDay', [
+    'account', 'date',
+    'realized', 'commissions', 'other', 'balance',  # from the cash ledger
+    'trade_count', 'trade_pnl', 'estimated_commissions',  # from the trade journal
+])
+
+
+def _cash_totals(user_id, account):
+    entry = CashLedgerEntry
+    query = db.select(
+        entry.account, entry.date.label('day'),
+        db.func.sum(db.case((entry.change_type == TRADE_PAIRED, entry.delta), else_=0)).label('realized'),
+        db.func.sum(db.case((entry.change_type == COMMISSION, entry.delta), else_=0)).label('commissions'),
+        db.func.sum(db.case((entry.change_type.in_((TRADE_PAIRED, COMMISSION)), 0), else_=entry.delta)).label('other'),
+        # Transaction ids increase, so the day's largest one carries its closing balance
+        db.func.max(entry.transaction_id).label('last_transaction_id'),
+    ).where(entry.user_id == user_id)
+    if account:
+        query = query.where(entry.account == account)
+    return query.group_by(entry.account, entry.date).subquery('cash')
+
+
+def _trade_totals(user_id, account):
+    day = db.func.date(Trade.exit_date, type_=db.Date)
+    query = db.select(
+        Trade.account, day.label('day'),
+        db.func.count(Trade.id).label('trade_count'),
+        db.func.sum(Trade.pnl).label('trade_pnl'),
+        db.func.sum(Trade.position_size).label('contracts'),
+    ).where(Trade.user_id == user_id, Trade.exit_date.isnot(None))
+    if account:
+        query = query.where(Trade.account == account)
+    return query.group_by(Trade.account, day).subquery('trades')
+
+
+def daily_reconciliation(user_id, account=None):
+    """ReconciledDay rows for every account and day with cash entries or closed trades, oldest first."""
+    cash = _cash_totals(user_id, account)
+    trades = _trade_totals(user_id, account)
+    # Every (account, day) seen on either side; portable where FULL OUTER JOIN is not
+    days = db.union(
+        db.select(cash.c.account, cash.c.day),
+        db.select(trades.c.account, trades.c.day),
+    ).subquery('days')
+    closing = db.aliased(CashLedgerEntry)
+    query = db.select(
+        days.c.account, days.c.day,
+        cash.c.realized, cash.c.commissions, cash.c.other, closing.amount,
+        trades.c.trade_count, trades.c.trade_pnl, trades.c.contracts,
+    ).select_from(days).outerjoin(
+        cash, db.and_(cash.c.account == days.c.account, cash.c.day == days.c.day)
+    ).outerjoin(
+        closing, db.and_(closing.user_id == user_id, closing.transaction_id == cash.c.last_transaction_id)
+    ).outerjoin(
+        trades, db.and_(trades.c.account == days.c.account, trades.c.day == days.c.day)
+    ).order_by(days.c.day, days.c.account)
+    return [
+        ReconciledDay(
+            account, day,
+            realized or 0.0, commissions or 0.0, other or 0.0, balance,
+            trade_count or 0, trade_pnl or 0.0, (contracts or 0) * 2 * COMMISSION_PER_CONTRACT,
+        )
+        for account, day, realized, commissions, other, balance, trade_count, trade_pnl, contracts
+        in db.session.execute(query)
+    ]
+
+
+def cash_net(day):
+    """Realized PnL after actual commissions."""
+    return day.realized + day.commissions
+
+
+def difference(day):
+    """Cash ledger net PnL minus the journal's net PnL for the day."""
+    return cash_net(day) - day.trade_pnl
+
+
+def account_summaries(days):
+    """Totals per account over ReconciledDay rows, with the latest balance."""
+    summaries = {}
+    for day in days:
+        summary = summaries.setdefault(day.account, {
+            'account': day.account, 'realized': 0.0, 'commissions': 0.0, 'estimated_commissions': 0.0,
+            'trade_pnl': 0.0, 'trade_count': 0, 'balance': None, 'mismatched_days': 0,
+        })
+        summary['realized'] += day.realized
+        summary['commissions'] += day.commissions
+        summary['estimated_commissions'] += day.estimated_commissions
+        summary['trade_pnl'] += day.trade_pnl
+        summary['trade_count'] += day.trade_count
+        if day.balance is not None:
+            summary['balance'] = day.balance
+        if abs(difference(day)) >= TOLERANCE:
+            summary['mismatched_days'] += 1
+    for summary in summaries.values():
+        summary['cash_net'] = summary['realized'] + summary['commissions']
+        summary['difference'] = summary['cash_net'] - summary['trade_pnl']
+    return sorted(summaries.values(), key=lambda summary: summary['account'])
+
+
+def capital(user_id, account=None):
+    """Money paid into the accounts less withdrawals, or None without cash entries.
+
+    Everything but realized PnL and commissions counts, so this is the
+    balance the account would have without any trading.
+    """
+    entry = CashLedgerEntry
+    query = db.session.query(db.func.count(entry.id), db.func.sum(entry.delta)).filter(
+        entry.user_id == user_id, entry.change_type.notin_((TRADE_PAIRED, COMMISSION))
+    )
+    if account:
+        query = query.filter(entry.account == account)
+    count, total = query.one()
+    return total if count else None
+
+
+def has_entries(user_id):
+    return db.session.query(CashLedgerEntry.id).filter_by(user_id=user_id).first() is not None
@@ -0,0 +1,80 @@
+"""Chart series for the statistics page."""
+from datetime import datetime
+from app import db
+from app.models import Trade
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def execution_date():
+    """A trade's execution date: exit date if closed, else entry date."""
+    return db.func.coalesce(Trade.exit_date, Trade.entry_date)
+
+
+def equity_curve(user_id, account=None, start=None, end=None):
+    """Cumulative PnL per trade ordered by execution date, optionally limited to [start, end]."""
+    executed = execution_date()
+    query = db.session.query(executed, Trade.pnl).filter(Trade.user_id == user_id)
+    if account:
+        query = query.filter(Trade.account == account)
+    current_pnl = 0
+    if start is not None:
+        # Carry the PnL realized before the window so the curve keeps its level
+        offset_query = db.session.query(db.func.coalesce(db.func.sum(Trade.pnl), 0)).filter(
+            Trade.user_id == user_id, executed < start
+        )
+        if account:
+            offset_query = offset_query.filter(Trade.account == account)
+        current_pnl = offset_query.scalar()
+        query = query.filter(executed >= start)
+    if end is not None:
+        query = query.filter(executed <= end)
+    dates = []
+    cumulative_pnl = []
+    for ref_date, pnl in query.order_by(executed, Trade.id).yield_per(1000):
+        dates.append(ref_date)
+        if pnl is not None:
+            current_pnl += pnl
+        cumulative_pnl.append(current_pnl)
+    return dates, cumulative_pnl
+
+
+def lttb(xs, ys, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last point and, from each of threshold - 2 equal
+    buckets, the point forming the largest triangle with the previously kept
+    point and the average of the next bucket, which preserves peaks and troughs.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        avg_x = sum(xs[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(ys[avg_start:avg_end]) / (avg_end - avg_start)
+        ax, ay = xs[a], ys[a]
+        max_area = -1
+        next_a = int(i * every) + 1
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                next_a = j
+        kept.append(next_a)
+        a = next_a
+    kept.append(n - 1)
+    return kept
+
+
+def downsample(dates, values, max_points):
+    """Reduce a date series to at most max_points while preserving its shape."""
+    if len(dates) <= max_points:
+        return dates, values
+    xs = [(d - EPOCH).total_seconds() for d in dates]
+    kept = lttb(xs, values, max_points)
+    return [dates[i] for i in kept], [values[i] for i in kept]
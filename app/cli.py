@@ -1,6 +1,8 @@
+import os
 import click
 from app import db
-from app.models import User
+from app.models import User, Trade, ImportJob, CashLedgerEntry
+from app import stats, screenshots, importer
 
 def register_commands(app):
     @app.cli.command('reset-password')
@@ -67,7 +69,7 @@ def register_commands(app):
     @app.cli.command('delete-user')
     @click.argument('username')
     def delete_user_command(username):
-        """Deletes a user and all their trades and strategies."""
+        """Deletes a user and all their trades, strategies, tags, imports and cash ledger."""
         user = User.query.filter_by(username=username).first()
         if user is None:
             click.echo(f"Error: User '{username}' not found.")
@@ -80,6 +82,45 @@ def register_commands(app):
         num_strategies = user.strategies.count()
         for strategy in user.strategies:
             db.session.delete(strategy)
+        for tag in user.tags:
+            db.session.delete(tag)
+        # Rows that reference the user and are not loaded as objects
+        for job in ImportJob.query.filter_by(user_id=user.id, finished_at=None):
+            if os.path.exists(job.path):
+                os.remove(job.path)
+        ImportJob.query.filter_by(user_id=user.id).delete()
+        CashLedgerEntry.query.filter_by(user_id=user.id).delete()
+        stats.reset_user(user.id)
+        importer.forget_imports(user.id)
         db.session.delete(user)
         db.session.commit()
-        click.echo(f"User '{username}' deleted. {num_trades} trades and {num_strategies} strategies removed.") 
\ No newline at end of file
+        click.echo(f"User '{username}' deleted. {num_trades} trades and {num_strategies} strategies removed.") 
+
+    @app.cli.command('process-screenshots')
+    def process_screenshots_command():
+        """Writes the scaled copies of screenshots uploaded before they existed."""
+        from app.routes import UPLOAD_FOLDER
+        pending = Trade.query.filter(Trade.screenshot.isnot(None), Trade.screenshot != '',
+                                     Trade.screenshot_ready == False).all()
+        processed = 0
+        for trade in pending:
+            try:
+                screenshots.make_variants(UPLOAD_FOLDER, trade.screenshot)
+            except OSError as e:
+                click.echo(f"Skipped trade {trade.id}: {e}")
+                continue
+            trade.screenshot_ready = True
+            db.session.commit()
+            processed += 1
+        click.echo(f"Processed {processed} of {len(pending)} screenshot(s).")
+
+    @app.cli.command('check-stats')
+    def check_stats_command():
+        """Compares every user's stored statistics with the trade table and rebuilds any that drifted."""
+        drifted_users = 0
+        for user in User.query.all():
+            drifted = stats.check_user(user.id)
+            if drifted:
+                drifted_users += 1
+                click.echo(f"User '{user.username}': rebuilt, {', '.join(drifted)} had drifted.")
+        click.echo(f"Checked statistics; {drifted_users} user(s) rebuilt.")
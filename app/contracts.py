@@ -0,0 +1,90 @@
+"""Futures contract specifications.
+
+Tickers are stored as the full contract symbol (MNQU5, ESZ24) or as a bare
+root (MNQ). parse_symbol() splits off the month code and year, and
+spec_for() returns the root's point value, tick size and commission. Both
+are memoized, so code pricing many trades does one lookup per distinct
+contract rather than one per row.
+"""
+import re
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+
+# Commission charged per contract on each side of a round trip
+COMMISSION_PER_CONTRACT = 0.25
+
+MONTH_CODES = 'FGHJKMNQUVXZ'
+
+ContractSpec = namedtuple('ContractSpec', ['root', 'month', 'year', 'point_value', 'tick_size', 'commission'])
+
+# root: (point value in dollars, tick size in points)
+ROOTS = {
+    'MNQ': (2, 0.25),
+    'NQ': (20, 0.25),
+    'MES': (5, 0.25),
+    'ES': (50, 0.25),
+    'RTY': (5, 0.1),
+    'M2K': (5, 0.1),
+    'CL': (1000, 0.01),
+    'MCL': (100, 0.01),
+    'GC': (100, 0.1),
+    'MGC': (10, 0.1),
+    'SI': (5000, 0.005),
+    'SIL': (1000, 0.005),
+    'HG': (25000, 0.0005),
+    'PA': (100, 0.5),
+    'PL': (50, 0.1),
+    'ZB': (1000, 1 / 32),
+    'ZN': (1000, 1 / 64),
+    'ZF': (1000, 1 / 128),
+    'ZT': (1000, 1 / 256),
+    'GE': (2500, 0.0025),
+    'BTC': (5, 5),
+    'MBT': (0.1, 5),
+}
+
+# Unknown roots are priced one dollar per point
+DEFAULT_POINT_VALUE = 1
+DEFAULT_TICK_SIZE = 0.01
+
+# Tickers are free text, so the parse caches are bounded
+SYMBOL_CACHE_SIZE = 4096
+
+_SYMBOL = re.compile(r'^([A-Z0-9]+?)([%s])(\d{1,2})$' % MONTH_CODES)
+
+
+@lru_cache(maxsize=SYMBOL_CACHE_SIZE)
+def parse_symbol(symbol):
+    """(root, month, year) for a ticker; month and year are None for a bare root.
+
+    A one-digit year is taken to be in the current decade.
+    """
+    symbol = (symbol or '').strip().upper()
+    match = _SYMBOL.match(symbol)
+    if match is None or symbol in ROOTS:
+        return symbol, None, None
+    root, month, year = match.groups()
+    if len(year) == 1:
+        year = date.today().year // 10 * 10 + int(year)
+    else:
+        year = 2000 + int(year)
+    return root, MONTH_CODES.index(month) + 1, year
+
+
+@lru_cache(maxsize=SYMBOL_CACHE_SIZE)
+def spec_for(symbol):
+    """ContractSpec for a ticker such as MNQU5, ESZ24 or MNQ."""
+    root, month, year = parse_symbol(symbol)
+    point_value, tick_size = ROOTS.get(root, (DEFAULT_POINT_VALUE, DEFAULT_TICK_SIZE))
+    return ContractSpec(root, month, year, point_value, tick_size, COMMISSION_PER_CONTRACT)
+
+
+def point_value(symbol):
+    return spec_for(symbol).point_value
+
+
+def gross_pnl(spec, direction, qty, entry_price, exit_price):
+    """Dollar PnL before commissions of a closed position in one contract."""
+    points = exit_price - entry_price if direction.lower() == 'long' else entry_price - exit_price
+    return points * qty * spec.point_value
@@ -0,0 +1,88 @@
+"""Per-user filter facets: symbols, accounts, strategies and tags with trade counts.
+
+Facets are cached per process and keyed by User.trade_data_version, which
+every write to a user's trades, strategies or tags bumps (see app.stats), so
+a page that only needs the dropdowns runs no query at all on a hit.
+"""
+from collections import OrderedDict, namedtuple
+from threading import Lock
+from app import db
+from app.models import Trade, Strategy, Tag, trade_tags
+
+# Users whose facets are kept in memory per process
+MAX_CACHED_USERS = 1024
+
+Facet = namedtuple('Facet', 'id name count')
+
+_cache = OrderedDict()
+_lock = Lock()
+
+
+class Facets:
+    """Dropdown values for one user; counts are numbers of trades."""
+
+    def __init__(self, symbol_counts, account_counts, strategies, tags):
+        self.symbol_counts = symbol_counts
+        self.account_counts = account_counts
+        self.strategies = strategies
+        self.tags = tags
+
+    @property
+    def symbols(self):
+        return list(self.symbol_counts)
+
+    @property
+    def accounts(self):
+        return list(self.account_counts)
+
+    @property
+    def used_strategy_ids(self):
+        return {strategy.id for strategy in self.strategies if strategy.count}
+
+
+def _load(user_id):
+    symbol_counts = OrderedDict(
+        db.session.query(Trade.ticker, db.func.count(Trade.id))
+        .filter(Trade.user_id == user_id)
+        .group_by(Trade.ticker).order_by(Trade.ticker)
+    )
+    account_counts = OrderedDict(
+        db.session.query(Trade.account, db.func.count(Trade.id))
+        .filter(Trade.user_id == user_id)
+        .group_by(Trade.account).order_by(Trade.account)
+    )
+    strategy_trades = (
+        db.session.query(Trade.strategy_id, db.func.count(Trade.id).label('count'))
+        .filter(Trade.user_id == user_id)
+        .group_by(Trade.strategy_id).subquery()
+    )
+    strategies = [
+        Facet(id, name, count or 0) for id, name, count in
+        db.session.query(Strategy.id, Strategy.name, strategy_trades.c.count)
+        .outerjoin(strategy_trades, strategy_trades.c.strategy_id == Strategy.id)
+        .filter(Strategy.user_id == user_id).order_by(Strategy.name)
+    ]
+    tags = [
+        Facet(id, name, count) for id, name, count in
+        db.session.query(Tag.id, Tag.name, db.func.count(trade_tags.c.trade_id))
+        .outerjoin(trade_tags, trade_tags.c.tag_id == Tag.id)
+        .filter(Tag.user_id == user_id)
+        .group_by(Tag.id, Tag.name).order_by(Tag.name)
+    ]
+    return Facets(symbol_counts, account_counts, strategies, tags)
+
+
+def get_facets(user):
+    """Facets for user, rebuilt only when the user's trade data version has moved on."""
+    with _lock:
+        entry = _cache.get(user.id)
+        if entry and entry[0] == user.trade_data_version:
+            _cache.move_to_end(user.id)
+            return entry[1]
+    facets = _load(user.id)
+    with _lock:
+        _cache[user.id] = (user.trade_data_version, facets)
+        _cache.move_to_end(user.id)
+        while len(_cache) > MAX_CACHED_USERS:
+            _cache.popitem(last=False)
+    return facets
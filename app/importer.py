@@ -0,0 +1,690 @@
+"""CSV trade import.
+
+Uploads are decoded and parsed as a stream. Tradovate fills are matched per
+contract whenever the position goes flat, and trades are built as plain
+column dicts and written with batched executemany INSERTs in the request's
+transaction, so memory stays bounded by the batch and the open positions
+rather than the file. Fills are matched per (account, contract) shard; a
+file that has to be buffered whole is matched across a process pool once
+it is large enough. Because the rows bypass the session,
+the statistics store is updated explicitly through stats.apply_rows().
+Re-imported rows are recognised by their Trade.fingerprint, and fills an
+earlier import already covered are skipped before matching (see
+ImportWatermark), unless the import is forced. Deleting trades forgets
+the manifest and the watermarks of their contracts (forget_imports()), so
+importing the file again restores them. Cash History
+exports are stored as CashLedgerEntry rows for app/cash.py to reconcile.
+
+An optional progress callback, progress(rows_read, imported, skipped), is
+called after each batch and every BATCH_SIZE rows; background jobs
+(app/tasks.py) use it to commit as they go.
+"""
+import csv
+import io
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import IntegrityError
+from app import db, stats, ledger, contracts
+from app.models import Trade, Strategy, CashLedgerEntry, ImportManifest, ImportWatermark
+
+# Commission rate: $0.25 per contract per side (buy and sell)
+COMMISSION_PER_CONTRACT = contracts.COMMISSION_PER_CONTRACT
+
+# Rows per executemany INSERT
+BATCH_SIZE = 1000
+
+# Buffered fills are matched in parallel from this many fills on, when there are several shards
+PARALLEL_MATCH_MIN_FILLS = 250000
+MATCH_PROCESSES = os.cpu_count() or 1
+
+TRADOVATE_NOTES = 'Imported from Tradovate'
+
+IMPORTED_STRATEGY = 'Imported'
+
+
+def imported_strategy(user_id):
+    """The user's "Imported" strategy, created (and committed) on first use."""
+    strategy = Strategy.query.filter_by(name=IMPORTED_STRATEGY, user_id=user_id).first()
+    if strategy:
+        return strategy
+    strategy = Strategy(name=IMPORTED_STRATEGY, user_id=user_id)
+    db.session.add(strategy)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Created meanwhile by a concurrent import
+        db.session.rollback()
+        strategy = Strategy.query.filter_by(name=IMPORTED_STRATEGY, user_id=user_id).one()
+    return strategy
+
+
+def is_tradovate_orders(fieldnames):
+    """Tradovate Orders exports are recognised by their B/S column."""
+    return 'B/S' in (fieldnames or ())
+
+
+def iter_tradovate_fills(csv_reader):
+    """Filled orders from a Tradovate Orders export, one dict per row, in file order."""
+    for row in csv_reader:
+        try:
+            if row.get('Status', '').strip() != 'Filled':
+                continue
+            symbol = row.get('Contract', '')
+            side = row.get('B/S', '').strip()
+            quantity = row.get('filledQty', '')
+            price = row.get('avgPrice', '')
+            date_str = row.get('Date', '')
+            fill_time = row.get('Fill Time', '')
+            account = row.get('Account', 'Default')  # Get account from CSV
+            if not all([symbol, side, quantity, price, date_str]):
+                continue
+            # Parse date and time
+            try:
+                trade_date = datetime.strptime(date_str, '%m/%d/%y')
+            except ValueError:
+                continue
+            try:
+                if fill_time:
+                    time_part = fill_time.split(' ')[1] if ' ' in fill_time else fill_time
+                    time_obj = datetime.strptime(time_part, '%H:%M:%S').time()
+                    trade_date = trade_date.replace(hour=time_obj.hour, minute=time_obj.minute, second=time_obj.second)
+            except ValueError:
+                pass
+            yield {
+                'symbol': symbol,
+                'side': side,
+                'quantity': float(quantity),
+                'price': float(price),
+                'datetime': trade_date,
+                'order_id': row.get('orderId', ''),
+                'account': account
+            }
+        except (ValueError, TypeError, AttributeError):
+            continue
+
+
+def shard_key(fill):
+    """Positions are independent per account and contract."""
+    return fill['account'], fill['symbol']
+
+
+def fills_in_order(csv_reader):
+    """Whether every shard's fills are listed oldest first."""
+    last_times = {}
+    for fill in iter_tradovate_fills(csv_reader):
+        key = shard_key(fill)
+        last_time = last_times.get(key)
+        if last_time is not None and fill['datetime'] < last_time:
+            return False
+        last_times[key] = fill['datetime']
+    return True
+
+
+def parse_tradovate_orders(csv_reader):
+    """Filled orders from a Tradovate Orders export, grouped by (account, contract)."""
+    shards = defaultdict(list)
+    for fill in iter_tradovate_fills(csv_reader):
+        shards[shard_key(fill)].append(fill)
+    return shards
+
+
+def _closed_trade(symbol, spec, close, account):
+    """Trade dict for a Close produced by the position ledger."""
+    gross_pnl = contracts.gross_pnl(spec, close.direction, close.qty, close.entry_price, close.exit_price)
+    return {
+        'ticker': symbol,
+        'account': account,
+        'direction': close.direction,
+        'position_size': close.qty,
+        'entry_price': close.entry_price,
+        'entry_date': close.entry_time,
+        'exit_price': close.exit_price,
+        'exit_date': close.exit_time,
+        'pnl': gross_pnl - (close.qty * spec.commission * 2),
+        'notes': TRADOVATE_NOTES,
+    }
+
+
+def _sorted_fills(orders):
+    """A shard's Buy and Sell fills, oldest first."""
+    return sorted((order for order in orders if order['side'] in ('Buy', 'Sell')), key=lambda x: x['datetime'])
+
+
+def _match_fills(fills, mode):
+    """Closes from (signed quantity, price) pairs in time order.
+
+    Entry and exit times are indexes into fills, so the input and output
+    are plain numbers and cheap to send to a worker process.
+    """
+    position = ledger.PositionLedger(mode)
+    closes = []
+    for index, (signed, price) in enumerate(fills):
+        side = 'Buy' if signed > 0 else 'Sell'
+        closes.extend(tuple(close) for close in position.fill(side, abs(signed), price, index))
+    return closes
+
+
+def _shard_trades(symbol, account, fills, closes):
+    """Trade dicts for closes computed from fills by _match_fills()."""
+    spec = contracts.spec_for(symbol)
+    trades = []
+    for direction, qty, entry_price, entry_index, exit_price, exit_index in closes:
+        close = ledger.Close(direction, qty, entry_price, fills[entry_index]['datetime'],
+                             exit_price, fills[exit_index]['datetime'])
+        trades.append(_closed_trade(symbol, spec, close, account))
+    return trades
+
+
+def _signed(fills):
+    return [(fill['quantity'] if fill['side'] == 'Buy' else -fill['quantity'], fill['price']) for fill in fills]
+
+
+def match_orders(symbol, orders, mode=ledger.AVERAGE):
+    """Closed trades from one (account, contract) shard's fills, in fill order."""
+    fills = _sorted_fills(orders)
+    if not fills:
+        return []
+    return _shard_trades(symbol, fills[0]['account'], fills, _match_fills(_signed(fills), mode))
+
+
+def _process_context():
+    # Imports run on worker threads, and forking a threaded process can
+    # deadlock the child, so start workers from a clean server process
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def match_shards(shards, mode=ledger.AVERAGE):
+    """Closed trades of every (account, contract) shard, one list per shard.
+
+    Shards are independent, so large imports match them across processes.
+    Results come back in sorted shard order, whichever way the work was split.
+    """
+    keys = sorted(shards)
+    fills = [_sorted_fills(shards[key]) for key in keys]
+    signed = [_signed(shard_fills) for shard_fills in fills]
+    modes = [mode] * len(keys)
+    workers = min(MATCH_PROCESSES, len(keys))
+    if workers > 1 and sum(map(len, fills)) >= PARALLEL_MATCH_MIN_FILLS:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_process_context()) as pool:
+            closes = list(pool.map(_match_fills, signed, modes, chunksize=max(1, len(keys) // (workers * 4))))
+    else:
+        closes = list(map(_match_fills, signed, modes))
+    # Trade dicts are built here, so only numbers cross the process boundary
+    return [
+        _shard_trades(symbol, account, shard_fills, shard_closes)
+        for (account, symbol), shard_fills, shard_closes in zip(keys, fills, closes)
+    ]
+
+
+def _fingerprint(user_id, row):
+    return Trade.make_fingerprint(
+        user_id, row['ticker'], row['account'], row['entry_date'], row.get('exit_date'), row['position_size']
+    )
+
+
+def _dedupe(rows, user_id):
+    """Fingerprinted rows that are neither imported already nor repeated earlier in rows.
+
+    One query loads the fingerprints inside the file's date range; the unique
+    (user_id, fingerprint) index backs this up against concurrent imports.
+    """
+    if not rows:
+        return []
+    dates = [row['entry_date'] for row in rows]
+    seen = {fingerprint for (fingerprint,) in db.session.query(Trade.fingerprint).filter(
+        Trade.user_id == user_id,
+        Trade.entry_date >= min(dates),
+        Trade.entry_date <= max(dates),
+        Trade.fingerprint.isnot(None),
+    )}
+    fresh = []
+    for row in rows:
+        fingerprint = _fingerprint(user_id, row)
+        if fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+        fresh.append(dict(row, fingerprint=fingerprint))
+    return fresh
+
+
+def insert_trades(rows, user_id, strategy_id):
+    """Write trade dicts with batched executemany INSERTs and fold them into the statistics."""
+    columns = ('ticker', 'account', 'direction', 'position_size', 'entry_price', 'entry_date',
+               'exit_price', 'exit_date', 'pnl', 'notes', 'fingerprint')
+    rows = [
+        dict({column: row.get(column) for column in columns}, user_id=user_id, strategy_id=strategy_id)
+        for row in rows
+    ]
+    table = Trade.__table__
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(table.insert(), rows[start:start + BATCH_SIZE])
+    stats.apply_rows(rows)
+    return len(rows)
+
+
+class OutOfOrderFills(Exception):
+    """A contract's fills are not oldest first, so they can't be matched as they stream in."""
+
+
+class WatermarkFilter:
+    """Drops a shard's fills that an earlier import covered and finds its new flat point.
+
+    Fills must be passed oldest first. Skipping only starts when the file's
+    first fill falls inside the watermark's range; a file reaching further
+    back is imported whole and left to fingerprint de-duplication.
+    """
+
+    def __init__(self, watermark=None, skip=True):
+        self.watermark = watermark
+        self.order_ids = watermark.order_id_set if watermark else set()
+        self.skip = skip
+        self.skipping = False
+        self.skipped = 0
+        self.first_at = None
+        self.last_at = None
+        self.position = 0.0
+        self.time = None
+        self.ids_at_time = []
+        self.flat_at = None
+        self.flat_ids = []
+
+    def admit(self, fill):
+        """Whether fill still has to be matched."""
+        time = fill['datetime']
+        watermark = self.watermark
+        if self.first_at is None:
+            self.first_at = time
+            self.skipping = self.skip and watermark is not None and watermark.start_at <= time <= watermark.flat_at
+        self.last_at = time
+        if self.skipping and (time < watermark.flat_at or (time == watermark.flat_at and fill['order_id'] in self.order_ids)):
+            self.skipped += 1
+            return False
+        if fill['side'] == 'Buy':
+            self.position += fill['quantity']
+        elif fill['side'] == 'Sell':
+            self.position -= fill['quantity']
+        if time != self.time:
+            self.time = time
+            self.ids_at_time = []
+        self.ids_at_time.append(fill['order_id'])
+        if abs(self.position) < 1e-9:
+            self.position = 0.0
+            self.flat_at = time
+            self.flat_ids = list(self.ids_at_time)
+        return True
+
+    def coverage(self):
+        """(start_at, flat_at, order_ids) known to be imported after this file, or None."""
+        watermark = self.watermark
+        flat = (self.flat_at, self.flat_ids) if self.flat_at else None
+        if watermark is not None:
+            previous = (watermark.flat_at, sorted(self.order_ids))
+            if flat is None or flat[0] < previous[0]:
+                flat = previous
+            elif flat[0] == previous[0]:
+                flat = (flat[0], sorted(set(flat[1]) | self.order_ids))
+            if self.first_at is not None and watermark.start_at <= self.first_at <= watermark.flat_at:
+                # Continues the covered range
+                return watermark.start_at, flat[0], flat[1]
+            if self.first_at is not None and self.first_at < watermark.start_at <= self.last_at:
+                # Reaches back before it and overlaps it
+                return self.first_at, flat[0], flat[1]
+            if self.flat_at is None or self.flat_at <= watermark.flat_at:
+                return None
+            # Disjoint and newer: the gap in between is unknown, so start over
+            flat = (self.flat_at, self.flat_ids)
+        if flat is None:
+            return None
+        return self.first_at, flat[0], flat[1]
+
+
+def load_watermarks(user_id):
+    """The user's ImportWatermark rows keyed like shards."""
+    return {
+        (watermark.account, watermark.contract): watermark
+        for watermark in ImportWatermark.query.filter_by(user_id=user_id)
+    }
+
+
+def save_watermarks(user_id, filters):
+    """Store the coverage of each shard's WatermarkFilter after an import."""
+    for (account, contract), watermark_filter in filters.items():
+        coverage = watermark_filter.coverage()
+        if coverage is None:
+            continue
+        start_at, flat_at, order_ids = coverage
+        watermark = watermark_filter.watermark
+        if watermark is None:
+            watermark = ImportWatermark(user_id=user_id, account=account, contract=contract)
+            db.session.add(watermark)
+        watermark.start_at = start_at
+        watermark.flat_at = flat_at
+        watermark.order_ids = ','.join(order_ids)
+
+
+def forget_imports(user_id, shards=None):
+    """Forget which files and fills the user imported once their trades are deleted.
+
+    Importing the same file again then reads it in full, so deleted trades
+    come back. The manifest always goes; of the watermarks, only those of
+    the given (account, contract) shards, or all of them when shards is None.
+    """
+    connection = db.session.connection()
+    connection.execute(ImportManifest.__table__.delete().where(ImportManifest.user_id == user_id))
+    watermarks = ImportWatermark.__table__
+    condition = watermarks.c.user_id == user_id
+    if shards is not None:
+        if not shards:
+            return
+        condition &= db.tuple_(watermarks.c.account, watermarks.c.contract).in_(list(shards))
+    connection.execute(watermarks.delete().where(condition))
+
+
+def _committed(trade, field):
+    history = inspect(trade).attrs[field].history
+    return history.deleted[0] if history.deleted else getattr(trade, field)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _forget_deleted_trades(session, flush_context):
+    shards = defaultdict(set)
+    for obj in session.deleted:
+        if isinstance(obj, Trade):
+            shards[_committed(obj, 'user_id')].add((_committed(obj, 'account'), _committed(obj, 'ticker')))
+    for user_id, user_shards in shards.items():
+        forget_imports(user_id, user_shards)
+
+
+class FillAccumulator:
+    """Buffers one shard's fills until its position is flat again, then matches them.
+
+    Matching each flat-to-flat stretch on its own gives the same trades as
+    matching the whole sorted history, provided the file lists the shard's
+    fills oldest first.
+    """
+
+    def __init__(self, symbol, mode, watermark_filter):
+        self.symbol = symbol
+        self.mode = mode
+        self.watermark_filter = watermark_filter
+        self.fills = []
+        self.position = 0.0
+        self.last_time = None
+
+    def add(self, fill):
+        """Closed trades completed by fill."""
+        if self.last_time is not None and fill['datetime'] < self.last_time:
+            raise OutOfOrderFills(self.symbol)
+        self.last_time = fill['datetime']
+        if not self.watermark_filter.admit(fill):
+            return []
+        self.fills.append(fill)
+        if fill['side'] == 'Buy':
+            self.position += fill['quantity']
+        elif fill['side'] == 'Sell':
+            self.position -= fill['quantity']
+        if abs(self.position) > 1e-9:
+            return []
+        return self.finish()
+
+    def finish(self):
+        """Closed trades from the buffered fills; contracts still open yield no trade."""
+        fills, self.fills = self.fills, []
+        self.position = 0.0
+        return list(match_orders(self.symbol, fills, self.mode))
+
+
+class TradeWriter:
+    """Collects imported trade dicts and writes them in de-duplicated batches."""
+
+    def __init__(self, user_id, strategy_id, csv_reader, progress=None):
+        self.user_id = user_id
+        self.strategy_id = strategy_id
+        self.csv_reader = csv_reader
+        self.progress = progress
+        self.pending = []
+        self.imported = 0
+        self.skipped = 0
+        self.reported_at = 0
+
+    def add(self, rows):
+        self.pending.extend(rows)
+        if len(self.pending) >= BATCH_SIZE:
+            self.flush()
+        elif self.progress and self.csv_reader.line_num - self.reported_at >= BATCH_SIZE:
+            self.report()
+
+    def flush(self):
+        pending, self.pending = self.pending, []
+        imported = self.write(pending)
+        self.imported += imported
+        self.skipped += len(pending) - imported
+        self.report()
+
+    def write(self, rows):
+        """Insert the new rows of a batch; returns how many were inserted."""
+        # Earlier batches are already inserted, so _dedupe() also sees them
+        return insert_trades(_dedupe(rows, self.user_id), self.user_id, self.strategy_id)
+
+    def report(self):
+        if self.progress:
+            self.reported_at = self.csv_reader.line_num
+            # line_num counts the header too
+            self.progress(max(self.reported_at - 1, 0), self.imported, self.skipped)
+
+
+def import_tradovate_orders(csv_reader, strategy, user_id, mode=ledger.AVERAGE, buffered=False, progress=None,
+                            force=False):
+    """Import a Tradovate Orders export as it is read; returns (imported, skipped).
+
+    Raises OutOfOrderFills when buffered is False and a shard's fills are
+    not in time order. With buffered=True every fill is kept and matched at
+    the end instead, for files in any order. Fills covered by the user's
+    watermarks are skipped unless force is set; either way the watermarks
+    are advanced.
+    """
+    writer = TradeWriter(user_id, strategy.id, csv_reader, progress)
+    watermarks = load_watermarks(user_id)
+    filters = {}
+    if buffered:
+        shards = defaultdict(list)
+        for fill in iter_tradovate_fills(csv_reader):
+            shards[shard_key(fill)].append(fill)
+            writer.add(())  # nothing to write yet, but keeps progress reports coming
+        for key, fills in shards.items():
+            watermark_filter = filters[key] = WatermarkFilter(watermarks.get(key), skip=not force)
+            shards[key] = [fill for fill in _sorted_fills(fills) if watermark_filter.admit(fill)]
+        for rows in match_shards(shards, mode):
+            writer.add(rows)
+    else:
+        accumulators = {}
+        for fill in iter_tradovate_fills(csv_reader):
+            key = shard_key(fill)
+            accumulator = accumulators.get(key)
+            if accumulator is None:
+                filters[key] = WatermarkFilter(watermarks.get(key), skip=not force)
+                accumulator = accumulators[key] = FillAccumulator(fill['symbol'], mode, filters[key])
+            writer.add(accumulator.add(fill))
+        for accumulator in accumulators.values():
+            writer.add(accumulator.finish())
+    writer.flush()
+    save_watermarks(user_id, filters)
+    return writer.imported, writer.skipped
+
+
+def iter_generic_trades(csv_reader, filename):
+    """Trades from a simple Symbol/Side/Quantity/Price/Date CSV; None for each invalid row."""
+    for row in csv_reader:
+        try:
+            symbol = row.get('Symbol', row.get('symbol', ''))
+            side = row.get('Side', row.get('side', ''))
+            quantity = row.get('Quantity', row.get('quantity', ''))
+            price = row.get('Price', row.get('price', ''))
+            date_str = row.get('Date', row.get('date', ''))
+            pnl = row.get('PnL', row.get('pnl', ''))
+
+            if not all([symbol, side, quantity, price, date_str]):
+                continue
+
+            try:
+                trade_date = datetime.strptime(date_str, '%Y-%m-%d')
+            except ValueError:
+                try:
+                    trade_date = datetime.strptime(date_str, '%m/%d/%Y')
+                except ValueError:
+                    continue
+
+            trade = {
+                'ticker': symbol,
+                'account': 'Default',
+                'direction': 'Long' if side.lower() in ['buy', 'long'] else 'Short',
+                'position_size': float(quantity),
+                'entry_price': float(price),
+                'entry_date': trade_date,
+                'pnl': 0,
+                'notes': f"Imported from CSV - {filename}",
+            }
+            if pnl:
+                try:
+                    trade['pnl'] = float(pnl)
+                except ValueError:
+                    pass
+            yield trade
+        except (ValueError, KeyError):
+            yield None
+
+
+def import_generic_trades(csv_reader, strategy, user_id, filename, progress=None):
+    """Import a simple trade CSV as it is read; returns (imported, skipped)."""
+    writer = TradeWriter(user_id, strategy.id, csv_reader, progress)
+    for trade in iter_generic_trades(csv_reader, filename):
+        if trade is None:
+            writer.skipped += 1
+        else:
+            writer.add([trade])
+    writer.flush()
+    return writer.imported, writer.skipped
+
+
+def is_cash_history(fieldnames):
+    """Tradovate Cash History exports are recognised by their Cash Change Type column."""
+    return 'Cash Change Type' in (fieldnames or ())
+
+
+def _amount(value):
+    # Tradovate writes thousands separators, e.g. "25,000.00"
+    return float(value.replace(',', ''))
+
+
+def iter_cash_history(csv_reader):
+    """Entries of a Tradovate Cash History export as column dicts; None for each invalid row."""
+    for row in csv_reader:
+        try:
+            yield {
+                'account': row['Account'].strip(),
+                'transaction_id': int(row['Transaction ID']),
+                'timestamp': datetime.strptime(row['Timestamp'].strip(), '%m/%d/%Y %H:%M:%S'),
+                'date': datetime.strptime(row['Date'].strip(), '%Y-%m-%d').date(),
+                'delta': _amount(row['Delta']),
+                'amount': _amount(row['Amount']),
+                'change_type': row['Cash Change Type'].strip(),
+                'currency': (row.get('Currency') or '').strip() or None,
+                'contract': (row.get('Contract') or '').strip() or None,
+            }
+        except (ValueError, KeyError, AttributeError):
+            yield None
+
+
+def insert_cash_entries(rows, user_id):
+    """Write the cash entries not stored yet; returns how many were inserted.
+
+    One IN query per batch finds the transactions already imported; the
+    unique (user_id, transaction_id) index backs this up.
+    """
+    if not rows:
+        return 0
+    seen = {transaction_id for (transaction_id,) in db.session.query(CashLedgerEntry.transaction_id).filter(
+        CashLedgerEntry.user_id == user_id,
+        CashLedgerEntry.transaction_id.in_([row['transaction_id'] for row in rows]),
+    )}
+    fresh = []
+    for row in rows:
+        if row['transaction_id'] in seen:
+            continue
+        seen.add(row['transaction_id'])
+        fresh.append(dict(row, user_id=user_id))
+    if fresh:
+        db.session.execute(CashLedgerEntry.__table__.insert(), fresh)
+        # The statistics page's drawdown % depends on the deposits
+        stats.bump_data_version(db.session.connection(), {user_id})
+    return len(fresh)
+
+
+class CashWriter(TradeWriter):
+    """TradeWriter for cash ledger entries."""
+
+    def __init__(self, user_id, csv_reader, progress=None):
+        super().__init__(user_id, None, csv_reader, progress)
+
+    def write(self, rows):
+        return insert_cash_entries(rows, self.user_id)
+
+
+def import_cash_history(csv_reader, user_id, progress=None):
+    """Import a Tradovate Cash History export as it is read; returns (imported, skipped)."""
+    writer = CashWriter(user_id, csv_reader, progress)
+    for entry in iter_cash_history(csv_reader):
+        if entry is None:
+            writer.skipped += 1
+        else:
+            writer.add([entry])
+    writer.flush()
+    return writer.imported, writer.skipped
+
+
+def _rewind(stream, text):
+    """A fresh text wrapper over stream, read again from the start."""
+    text.detach()
+    stream.seek(0)
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+
+def import_csv_stream(stream, user_id, filename, mode=ledger.AVERAGE, progress=None, force=False):
+    """Import an uploaded CSV from its binary stream without reading it into memory.
+
+    Returns (imported, skipped): trades, or ledger entries for a Cash History
+    export. Trades go to the user's "Imported" strategy. A Tradovate export
+    whose fills turn out not to be oldest first is rolled back and imported
+    again from the start with every fill buffered, when the stream can be
+    rewound. A progress callback may commit each batch, leaving nothing to
+    roll back, so with one the order is checked in a first pass instead.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        csv_reader = csv.DictReader(text)
+        if is_cash_history(csv_reader.fieldnames):
+            return import_cash_history(csv_reader, user_id, progress)
+        strategy = imported_strategy(user_id)
+        if not is_tradovate_orders(csv_reader.fieldnames):
+            return import_generic_trades(csv_reader, strategy, user_id, filename, progress)
+        if not stream.seekable():
+            return import_tradovate_orders(csv_reader, strategy, user_id, mode, True, progress, force)
+        if progress is not None:
+            buffered = not fills_in_order(csv_reader)
+            text = _rewind(stream, text)
+            return import_tradovate_orders(csv.DictReader(text), strategy, user_id, mode, buffered, progress, force)
+        try:
+            with db.session.begin_nested():
+                return import_tradovate_orders(csv_reader, strategy, user_id, mode, force=force)
+        except OutOfOrderFills:
+            text = _rewind(stream, text)
+            return import_tradovate_orders(csv.DictReader(text), strategy, user_id, mode, buffered=True, force=force)
+    finally:
+        # Leave the upload's stream open for its owner
+        text.detach()
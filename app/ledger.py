@@ -0,0 +1,93 @@
+"""Position ledger turning a contract's fills into closed trades.
+
+The ledger keeps the open position as FIFO lots plus a running quantity and
+notional, so every fill is handled in amortized constant time no matter how
+many times a position is scaled into or out of.
+"""
+from collections import deque, namedtuple
+
+# How a closing fill is priced against the open lots
+AVERAGE = 'average'  # one trade per closing fill at the position's average cost
+FIFO = 'fifo'  # one trade per lot consumed, at that lot's own price
+MODES = (AVERAGE, FIFO)
+
+# A quantity of an opening fill that is still open
+Lot = namedtuple('Lot', 'qty price time order_id')
+
+# Part of a position closed by a fill
+Close = namedtuple('Close', 'direction qty entry_price entry_time exit_price exit_time')
+
+
+class PositionLedger:
+    """Open position of one contract in one account."""
+
+    def __init__(self, mode=AVERAGE):
+        if mode not in MODES:
+            raise ValueError(f'Unknown matching mode: {mode}')
+        self.mode = mode
+        self.lots = deque()
+        self.quantity = 0.0  # contracts open, positive when long and negative when short
+        self.notional = 0.0  # cost basis of the open contracts
+        self.opened_at = None  # first fill since the position was last flat
+
+    @property
+    def direction(self):
+        if self.quantity > 0:
+            return 'Long'
+        if self.quantity < 0:
+            return 'Short'
+        return None
+
+    @property
+    def average_price(self):
+        return self.notional / abs(self.quantity) if self.quantity else 0.0
+
+    def fill(self, side, qty, price, time, order_id=None):
+        """Apply a Buy or Sell fill and return the Closes it produced."""
+        signed = qty if side == 'Buy' else -qty
+        closes = []
+        if self.quantity and (signed > 0) != (self.quantity > 0):
+            # Reduces the open position; any excess reverses it
+            closing = min(qty, abs(self.quantity))
+            closes = self._close(closing, price, time)
+            signed += closing if signed < 0 else -closing
+        if signed:
+            self._open(abs(signed), price, time, order_id, 1 if signed > 0 else -1)
+        return closes
+
+    def _open(self, qty, price, time, order_id, sign):
+        if not self.quantity:
+            self.opened_at = time
+        self.lots.append(Lot(qty, price, time, order_id))
+        self.quantity += sign * qty
+        self.notional += qty * price
+
+    def _close(self, qty, exit_price, exit_time):
+        direction = self.direction
+        closes = []
+        if self.mode == AVERAGE:
+            average = self.average_price
+            closes.append(Close(direction, qty, average, self.opened_at, exit_price, exit_time))
+        remaining = qty
+        while remaining > 0 and self.lots:
+            lot = self.lots[0]
+            used = min(lot.qty, remaining)
+            if self.mode == FIFO:
+                closes.append(Close(direction, used, lot.price, lot.time, exit_price, exit_time))
+            if used == lot.qty:
+                self.lots.popleft()
+            else:
+                self.lots[0] = lot._replace(qty=lot.qty - used)
+            remaining -= used
+        if self.mode == AVERAGE:
+            self.notional -= average * qty
+        else:
+            self.notional -= sum(close.qty * close.entry_price for close in closes)
+        self.quantity += qty if direction == 'Short' else -qty
+        if not self.lots or abs(self.quantity) < 1e-9:
+            # Flat: drop rounding residue so the next position starts clean
+            self.lots.clear()
+            self.quantity = 0.0
+            self.notional = 0.0
+            self.opened_at = None
+        return closes
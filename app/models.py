@@ -1,7 +1,8 @@
-from app import db, login
+from app import db, login, contracts
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+import hashlib
 
 # Association table for many-to-many relationship between Trade and Tag
 trade_tags = db.Table('trade_tags',
@@ -21,6 +22,8 @@ class User(UserMixin, db.Model):
     show_on_top_trades = db.Column(db.Boolean, default=False)
     trades = db.relationship('Trade', backref='trader', lazy='dynamic')
     last_seen = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped on every trade, strategy or tag write; keys cached statistics, facets and ETags
+    trade_data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -73,6 +76,9 @@ class Trade(db.Model):
     pnl = db.Column(db.Float, default=0)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     screenshot = db.Column(db.String(256))  # stores filename or path
+    screenshot_ready = db.Column(db.Boolean, nullable=False, default=False)  # scaled copies written, see app/screenshots.py
+    # Identity of the import row a trade came from; see make_fingerprint()
+    fingerprint = db.Column(db.String(40))
     tags = db.relationship('Tag', secondary=trade_tags, back_populates='trades')
 
     # Performance indexes for common queries
@@ -89,44 +95,179 @@ class Trade(db.Model):
         db.Index('idx_trade_user_entry_date', 'user_id', 'entry_date'),  # Composite index for main listing
         db.Index('idx_trade_user_pnl', 'user_id', 'pnl'),  # Composite index for PnL queries
         db.Index('idx_trade_user_entry_pnl', 'user_id', 'entry_date', 'pnl'),  # Composite index for calendar queries
+        db.Index('idx_trade_user_fingerprint', 'user_id', 'fingerprint', unique=True),  # Import de-duplication
     )
 
-    TICKER_POINT_VALUES = {
-        'MNQ': 2,
-        'NQ': 20,
-        'MES': 5,
-        'ES': 50,
-        'RTY': 5,
-        'M2K': 5,
-        'CL': 1000,
-        'MCL': 100,
-        'GC': 100,
-        'MGC': 10,
-        'SI': 5000,
-        'SIL': 1000,
-        'HG': 25000,
-        'PA': 100,
-        'PL': 50,
-        'ZB': 1000,
-        'ZN': 1000,
-        'ZF': 1000,
-        'ZT': 1000,
-        'GE': 2500,
-        'BTC': 5,
-        'MBT': 0.1,
-    }
-
     def __repr__(self):
         return f"Trade('{self.ticker}', '{self.entry_date}')"
 
+    @staticmethod
+    def make_fingerprint(user_id, ticker, account, entry_date, exit_date, position_size):
+        """Deterministic hash identifying a trade across repeated imports."""
+        parts = (
+            user_id, ticker, account,
+            entry_date.isoformat() if entry_date else '',
+            exit_date.isoformat() if exit_date else '',
+            repr(float(position_size)),
+        )
+        return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
     @property
     def calculate_pnl(self):
         if self.exit_price is not None and self.exit_date is not None:
-            point_value = self.TICKER_POINT_VALUES.get(self.ticker.upper(), 1)
-            if self.direction.lower() == 'long':
-                return (self.exit_price - self.entry_price) * self.position_size * point_value
-            else:
-                return (self.entry_price - self.exit_price) * self.position_size * point_value
+            spec = contracts.spec_for(self.ticker)
+            return contracts.gross_pnl(spec, self.direction, self.position_size, self.entry_price, self.exit_price)
         return 0
 
- 
\ No newline at end of file
+class CashLedgerEntry(db.Model):
+    """One row of a Tradovate Cash History export; amount is the balance after it."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    account = db.Column(db.String(100), nullable=False)
+    transaction_id = db.Column(db.BigInteger, nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    date = db.Column(db.Date, nullable=False)  # trading day as reported by Tradovate
+    delta = db.Column(db.Float, nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    change_type = db.Column(db.String(32), nullable=False)  # e.g. 'Commission', 'Trade Paired'
+    currency = db.Column(db.String(8))
+    contract = db.Column(db.String(20))
+    __table_args__ = (
+        db.Index('idx_cash_user_transaction', 'user_id', 'transaction_id', unique=True),
+        # Covers the per-account, per-day GROUP BY of the reconciliation
+        db.Index('idx_cash_user_account_date', 'user_id', 'account', 'date', 'change_type', 'delta'),
+    )
+
+    def __repr__(self):
+        return f'<CashLedgerEntry {self.transaction_id} {self.change_type}>'
+
+class ImportManifest(db.Model):
+    """A file already imported by a user, recognised by the SHA-256 of its content."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)
+    filename = db.Column(db.String(256), nullable=False)
+    imported = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    __table_args__ = (
+        db.Index('idx_import_manifest_user_hash', 'user_id', 'content_hash', unique=True),
+    )
+
+    def __repr__(self):
+        return f'<ImportManifest {self.filename} {self.content_hash[:12]}>'
+
+class ImportWatermark(db.Model):
+    """Tradovate fills of one account and contract known to be imported.
+
+    Every fill from start_at up to the flat point flat_at has been imported;
+    order_ids lists the fills stamped exactly flat_at, which are included.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    account = db.Column(db.String(100), nullable=False)
+    contract = db.Column(db.String(20), nullable=False)
+    start_at = db.Column(db.DateTime, nullable=False)
+    flat_at = db.Column(db.DateTime, nullable=False)
+    order_ids = db.Column(db.Text, nullable=False, default='')  # comma separated
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'account', 'contract', name='_user_account_contract_watermark_uc'),
+    )
+
+    @property
+    def order_id_set(self):
+        return set(self.order_ids.split(',')) if self.order_ids else set()
+
+    def __repr__(self):
+        return f'<ImportWatermark {self.account} {self.contract} {self.flat_at}>'
+
+class ImportJob(db.Model):
+    """A CSV upload imported in the background by app/tasks.py."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    # What the file holds, known from its header when it is staged
+    TRADES = 'trades'
+    CASH_HISTORY = 'cash_history'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    filename = db.Column(db.String(256), nullable=False)
+    kind = db.Column(db.String(16), nullable=False, default=TRADES)
+    path = db.Column(db.String(512), nullable=False)  # staged upload, removed once the job ends
+    matching = db.Column(db.String(16), nullable=False, default='average')
+    status = db.Column(db.String(16), nullable=False, default=QUEUED)
+    rows_total = db.Column(db.Integer, nullable=False, default=0)
+    rows_parsed = db.Column(db.Integer, nullable=False, default=0)
+    trades_created = db.Column(db.Integer, nullable=False, default=0)
+    duplicates_skipped = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    content_hash = db.Column(db.String(64))  # SHA-256 of the staged upload
+    force = db.Column(db.Boolean, nullable=False, default=False)  # ignore the manifest and watermarks
+    already_imported = db.Column(db.Boolean, nullable=False, default=False)  # matched a manifest entry
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # last progress committed by the worker running it
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # runs claimed so far
+    finished_at = db.Column(db.DateTime)
+    __table_args__ = (
+        db.Index('idx_import_job_user_id', 'user_id'),
+        db.Index('idx_import_job_status', 'status'),
+    )
+
+    @property
+    def finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    def __repr__(self):
+        return f'<ImportJob {self.id} {self.status}>'
+
+class TradeStats(db.Model):
+    """Running per-user, per-account aggregates behind the statistics page."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    account = db.Column(db.String(100), nullable=False)
+    trade_count = db.Column(db.Integer, nullable=False, default=0)
+    win_count = db.Column(db.Integer, nullable=False, default=0)
+    loss_count = db.Column(db.Integer, nullable=False, default=0)
+    breakeven_count = db.Column(db.Integer, nullable=False, default=0)
+    total_pnl = db.Column(db.Float, nullable=False, default=0)
+    gross_profit = db.Column(db.Float, nullable=False, default=0)
+    gross_loss = db.Column(db.Float, nullable=False, default=0)
+    largest_win = db.Column(db.Float)
+    largest_loss = db.Column(db.Float)
+    extremes_stale = db.Column(db.Boolean, nullable=False, default=False)
+    closed_count = db.Column(db.Integer, nullable=False, default=0)
+    holding_seconds = db.Column(db.Float, nullable=False, default=0)
+    long_count = db.Column(db.Integer, nullable=False, default=0)
+    long_wins = db.Column(db.Integer, nullable=False, default=0)
+    long_losses = db.Column(db.Integer, nullable=False, default=0)
+    long_be = db.Column(db.Integer, nullable=False, default=0)
+    short_count = db.Column(db.Integer, nullable=False, default=0)
+    short_wins = db.Column(db.Integer, nullable=False, default=0)
+    short_losses = db.Column(db.Integer, nullable=False, default=0)
+    short_be = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'account', name='_user_account_stats_uc'),
+    )
+
+    def __repr__(self):
+        return f'<TradeStats {self.user_id} {self.account}>'
+
+class TradeStatBucket(db.Model):
+    """Per-symbol and per-strategy PnL totals, kept alongside TradeStats."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    account = db.Column(db.String(100), nullable=False)
+    kind = db.Column(db.String(16), nullable=False)  # 'symbol' or 'strategy'
+    key = db.Column(db.String(100), nullable=False)
+    trade_count = db.Column(db.Integer, nullable=False, default=0)
+    pnl = db.Column(db.Float, nullable=False, default=0)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'account', 'kind', 'key', name='_user_stat_bucket_uc'),
+    )
+
+    def __repr__(self):
+        return f'<TradeStatBucket {self.kind} {self.key}>'
@@ -0,0 +1,83 @@
+"""Keyset (seek) pagination for the trade listing.
+
+Pages are addressed by the (entry_date, id) of a boundary trade instead of an
+OFFSET, so every page is a bounded range scan of idx_trade_user_entry_date no
+matter how deep it is.
+"""
+from datetime import datetime
+from app import db
+from app.models import Trade
+
+
+def encode_cursor(trade):
+    return f'{trade.entry_date.isoformat()}_{trade.id}'
+
+
+def decode_cursor(value):
+    """(entry_date, id) of a cursor, or None if it is missing or malformed."""
+    if not value:
+        return None
+    date_part, _, id_part = value.rpartition('_')
+    try:
+        return datetime.fromisoformat(date_part), int(id_part)
+    except ValueError:
+        return None
+
+
+def _older_than(cursor):
+    entry_date, trade_id = cursor
+    # The redundant entry_date <= bound lets the index seek straight to the cursor
+    return db.and_(
+        Trade.entry_date <= entry_date,
+        db.or_(Trade.entry_date < entry_date, Trade.id < trade_id),
+    )
+
+
+def _newer_than(cursor):
+    entry_date, trade_id = cursor
+    return db.and_(
+        Trade.entry_date >= entry_date,
+        db.or_(Trade.entry_date > entry_date, Trade.id > trade_id),
+    )
+
+
+class KeysetPagination:
+    """One page of trades, newest first, with cursors to its neighbours."""
+
+    def __init__(self, items, per_page, total, has_prev, has_next):
+        self.items = items
+        self.per_page = per_page
+        self.total = total
+        self.has_prev = has_prev  # newer trades exist
+        self.has_next = has_next  # older trades exist
+
+    @property
+    def prev_cursor(self):
+        return encode_cursor(self.items[0]) if self.items else None
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.items[-1]) if self.items else None
+
+
+def keyset_paginate(query, per_page, total, after=None, before=None, last=False):
+    """Page of query ordered by entry_date DESC, id DESC.
+
+    after/before are cursors: return the trades older than `after` or newer
+    than `before`. With last=True return the oldest page. One extra row is
+    fetched to tell whether another page follows in the direction of travel.
+    """
+    after = decode_cursor(after)
+    before = decode_cursor(before)
+    if before or last:
+        # Walk the index upwards from the cursor (or the oldest trade), then flip
+        if before:
+            query = query.filter(_newer_than(before))
+        rows = query.order_by(Trade.entry_date.asc(), Trade.id.asc()).limit(per_page + 1).all()
+        more = len(rows) > per_page
+        items = rows[:per_page][::-1]
+        return KeysetPagination(items, per_page, total, has_prev=more, has_next=bool(before))
+    if after:
+        query = query.filter(_older_than(after))
+    rows = query.order_by(Trade.entry_date.desc(), Trade.id.desc()).limit(per_page + 1).all()
+    return KeysetPagination(rows[:per_page], per_page, total, has_prev=bool(after), has_next=len(rows) > per_page)
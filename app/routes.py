@@ -1,16 +1,19 @@
-from flask import render_template, redirect, url_for, request, flash, Blueprint, jsonify, send_from_directory, send_file
+from flask import render_template, redirect, url_for, request, flash, Blueprint, jsonify, send_file, current_app, abort
 from flask_login import current_user, login_required
+from werkzeug.security import safe_join
 from app import db
-from app.models import Trade, Strategy, User, Tag
+from app.models import Trade, Strategy, User, Tag, ImportJob
+from app import stats, charts, analytics, facets, search, importer, ledger, tasks, cash, cards, screenshots
+from app.pagination import keyset_paginate
 from datetime import datetime, timedelta
 from app.forms import ChangePasswordForm
 import os
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
 from calendar import monthrange
 import calendar as cal
-from io import BytesIO
 import sys
 import random
+import hashlib
+from functools import lru_cache
 
 FUTURES_SYMBOLS = [
     'MNQ', 'NQ', 'MES', 'ES', 'RTY', 'M2K', 'CL', 'MCL', 'GC', 'MGC', 'SI', 
@@ -20,10 +23,16 @@ FUTURES_SYMBOLS = [
 bp = Blueprint('main', __name__)
 
 UPLOAD_FOLDER = '/var/data/uploads'
-THUMB_SIZE = (150, 150)
 
-# Commission rate: $0.25 per contract per side (buy and sell)
-COMMISSION_PER_CONTRACT = 0.25
+# Versioned (?v=) image URLs change whenever the image does, so caches may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+VERSION_LENGTH = 16
+
+# Bump whenever the /api/statistics payload changes shape
+STATISTICS_API_VERSION = 4
+
+# Trades per window of the rolling win rate chart
+ROLLING_WIN_RATE_WINDOW = 20
 
 @bp.route('/')
 @bp.route('/index')
@@ -39,22 +48,24 @@ def index():
     start_date = request.args.get('start_date', '').strip()
     end_date = request.args.get('end_date', '').strip()
     
-    # Get pagination parameters
-    page = request.args.get('page', 1, type=int)
+    # Get pagination parameters: keyset cursors instead of page numbers
+    after = request.args.get('after', '').strip()
+    before = request.args.get('before', '').strip()
+    last = request.args.get('last') == '1'
     per_page = request.args.get('per_page', 25, type=int)  # Default 25 trades per page
+    per_page = min(max(per_page, 1), 200)
     
-    # Start with base query for current user's trades
-    query = Trade.query.filter_by(user_id=current_user.id)
+    # Start with base query for current user's trades; each row renders its strategy and tags,
+    # so load them with the page instead of one lazy SELECT per trade
+    query = Trade.query.filter_by(user_id=current_user.id).options(
+        db.joinedload(Trade.strategy),
+        db.selectinload(Trade.tags),
+    )
     
     # Apply filters
     if search_query:
-        # Search in ticker and notes
-        query = query.filter(
-            db.or_(
-                Trade.ticker.ilike(f'%{search_query}%'),
-                Trade.notes.ilike(f'%{search_query}%')
-            )
-        )
+        # Search in ticker and notes (full-text index when available)
+        query = query.filter(search.search_condition(search_query))
     
     if symbol_filter:
         query = query.filter(Trade.ticker == symbol_filter)
@@ -94,27 +105,29 @@ def index():
         except ValueError:
             pass
     
-    # Apply pagination to filtered trades
-    pagination = query.order_by(Trade.entry_date.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
-    trades = pagination.items
-    
-    # Get filter options for the form - use database aggregation for better performance
-    user_strategies = Strategy.query.filter_by(user_id=current_user.id).order_by(Strategy.name).all()
+    # Filter options for the form come from the per-user facet cache
+    user_facets = facets.get_facets(current_user)
     
-    # Use database aggregation for distinct values
-    user_symbols_result = db.session.query(Trade.ticker).filter_by(user_id=current_user.id).distinct().order_by(Trade.ticker).all()
-    user_symbols = [symbol[0] for symbol in user_symbols_result]
+    # Unfiltered and single-facet totals come from the facet counts; any other filtered
+    # total is counted once and then carried along in the page links
+    other_filters = search_query or strategy_filter or direction_filter or pnl_filter or start_date or end_date
+    if not (other_filters or symbol_filter):
+        total = user_facets.account_counts.get(account_filter, 0) if account_filter else sum(user_facets.account_counts.values())
+    elif not (other_filters or account_filter):
+        total = user_facets.symbol_counts.get(symbol_filter, 0)
+    else:
+        total = request.args.get('total', type=int)
+        if total is None:
+            total = query.order_by(None).count()
     
-    user_accounts_result = db.session.query(Trade.account).filter_by(user_id=current_user.id).distinct().order_by(Trade.account).all()
-    user_accounts = [account[0] for account in user_accounts_result]
+    # Apply pagination to filtered trades
+    pagination = keyset_paginate(query, per_page, total, after=after, before=before, last=last)
+    trades = pagination.items
     
     return render_template('index.html', 
                          title='Home', 
                          trades=trades,
                          pagination=pagination,
-                         page=page,
                          per_page=per_page,
                          search_query=search_query,
                          symbol_filter=symbol_filter,
@@ -125,14 +138,79 @@ def index():
                          start_date=start_date,
                          end_date=end_date,
                          symbols=FUTURES_SYMBOLS,
-                         user_symbols=user_symbols,
-                         user_accounts=user_accounts,
-                         strategies=user_strategies)
+                         user_symbols=user_facets.symbols,
+                         user_accounts=user_facets.accounts,
+                         symbol_counts=user_facets.symbol_counts,
+                         account_counts=user_facets.account_counts,
+                         strategies=user_facets.strategies,
+                         used_strategy_ids=user_facets.used_strategy_ids)
+
+@bp.route('/api/search')
+@login_required
+def api_search():
+    """Ranked ticker/notes matches for the search box, best first."""
+    search_query = request.args.get('q', '').strip()
+    limit = request.args.get('limit', 10, type=int)
+    if not search_query:
+        return jsonify({'results': []})
+    results = search.ranked_matches(current_user.id, search_query, limit)
+    for result in results:
+        result['entry_date'] = result['entry_date'].strftime('%Y-%m-%d %H:%M')
+        result['url'] = url_for('main.edit_trade', trade_id=result['id'])
+    return jsonify({'results': results})
+
+def _content_response(etag, send, scope='public'):
+    """Response for content identified by etag; send() only runs when the client's copy is stale."""
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = send()
+    response.set_etag(etag)
+    if request.args.get('v') == etag[:VERSION_LENGTH]:
+        response.headers['Cache-Control'] = f'{scope}, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response.headers['Cache-Control'] = f'{scope}, no-cache'
+    return response
+
+@lru_cache(maxsize=4096)
+def _file_digest(path, mtime_ns, size):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _upload_etag(path):
+    """SHA-256 of an uploaded file, hashed again only when its size or mtime changes."""
+    stat = os.stat(path)
+    return _file_digest(path, stat.st_mtime_ns, stat.st_size)
+
+@bp.app_template_global()
+def upload_url(filepath):
+    """URL of an uploaded file, versioned by its content."""
+    path = safe_join(UPLOAD_FOLDER, filepath)
+    if path and os.path.isfile(path):
+        return url_for('main.uploaded_file', filepath=filepath, v=_upload_etag(path)[:VERSION_LENGTH])
+    return url_for('main.uploaded_file', filepath=filepath)
+
+@bp.app_template_global()
+def screenshot_url(trade, size):
+    """URL of a trade's screenshot scaled to size, or of the best file on disk until that is ready."""
+    return upload_url(screenshots.best_available(UPLOAD_FOLDER, trade, size))
+
+@bp.app_template_global()
+def card_url(trade, endpoint='main.share_trade_png', **values):
+    """URL of a trade's share card, versioned by what is drawn on it."""
+    version = cards.card_key(trade, UPLOAD_FOLDER)[:VERSION_LENGTH]
+    return url_for(endpoint, trade_id=trade.id, v=version, **values)
 
 @bp.route('/uploads/<path:filepath>')
 def uploaded_file(filepath):
     # Serve files from persistent storage
-    return send_from_directory(UPLOAD_FOLDER, filepath)
+    path = safe_join(UPLOAD_FOLDER, filepath)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    return _content_response(_upload_etag(path), lambda: send_file(path, etag=False))
 
 @bp.route('/add_trade', methods=['GET', 'POST'])
 @login_required
@@ -182,15 +260,17 @@ def add_trade():
                 tags.append(tag)
             new_trade.tags = tags
             db.session.commit()
+            if new_trade.exit_date is not None:
+                tasks.submit_card_renders([new_trade.id], UPLOAD_FOLDER)
             flash('Trade added successfully!', 'success')
             return redirect(url_for('main.index'))
         except Exception as e:
             db.session.rollback()
             flash(f'Error adding trade: {e}', 'danger')
-    strategies = Strategy.query.filter_by(user_id=current_user.id).order_by(Strategy.name).all()
-    user_tags = Tag.query.filter_by(user_id=current_user.id).order_by(Tag.name).all()
-    user_accounts = db.session.query(Trade.account).filter_by(user_id=current_user.id).distinct().order_by(Trade.account).all()
-    user_accounts = [account[0] for account in user_accounts]
+    user_facets = facets.get_facets(current_user)
+    strategies = user_facets.strategies
+    user_tags = user_facets.tags
+    user_accounts = user_facets.accounts
     if not user_accounts:
         user_accounts = ['Default']
     return render_template(
@@ -234,6 +314,9 @@ def clear_log():
         
         # Delete all trades for this user
         num_rows_deleted = Trade.query.filter_by(user_id=current_user.id).delete()
+        # Bulk delete bypasses the flush hooks, so drop the aggregates and import records as well
+        stats.reset_user(current_user.id)
+        importer.forget_imports(current_user.id)
         
         db.session.commit()
         flash(f'Successfully deleted {num_rows_deleted} trades and all associated tags.', 'success')
@@ -266,178 +349,145 @@ def add_strategy():
 @bp.route('/statistics')
 @login_required
 def statistics():
-    # Get account filter and pagination parameters from request
+    # Get account filter from request
     account_filter = request.args.get('account', '').strip()
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)  # Default 50 trades per page
-    
-    # Start with base query for current user's trades
-    query = Trade.query.filter_by(user_id=current_user.id)
-    
-    # Apply account filter if specified
-    if account_filter:
-        query = query.filter(Trade.account == account_filter)
-    
-    # Get total count for pagination
-    total_trades_count = query.count()
-    
-    # Apply pagination
-    pagination = query.order_by(Trade.entry_date.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
-    
-    trades = pagination.items
-    
-    if not trades and page == 1:
-        return render_template('statistics.html', title='Statistics', no_trades=True, account_filter=account_filter)
-
-    # For statistics calculations, we need ALL trades (not just the current page)
-    # So we'll get all trades for the user/account filter
-    all_trades_query = Trade.query.filter_by(user_id=current_user.id)
-    if account_filter:
-        all_trades_query = all_trades_query.filter(Trade.account == account_filter)
-    all_trades = all_trades_query.all()
-    
-    # Sort trades by execution date (exit_date if present, else entry_date)
-    trades_sorted = sorted(all_trades, key=lambda t: t.exit_date or t.entry_date)
-
-    # --- Basic Stats ---
-    total_trades = len(trades_sorted)
-    winning_trades = [t for t in trades_sorted if t.pnl is not None and t.pnl > 0]
-    losing_trades = [t for t in trades_sorted if t.pnl is not None and t.pnl < 0]
-    breakeven_trades = [t for t in trades_sorted if t.pnl is not None and t.pnl == 0]
-
-    total_wins = len(winning_trades)
-    total_losses = len(losing_trades)
-    win_rate = (total_wins / total_trades) * 100 if total_trades > 0 else 0
-
-    # --- PnL Stats ---
-    all_pnl = [t.pnl for t in trades_sorted if t.pnl is not None]
-    total_pnl = sum(all_pnl)
-    gross_profit = sum(t.pnl for t in winning_trades)
-    gross_loss = sum(t.pnl for t in losing_trades)
-    
-    if gross_loss != 0:
-        profit_factor = abs(gross_profit / gross_loss)
-    elif gross_profit > 0:
-        profit_factor = 'Infinite'
-    else:
-        profit_factor = 'N/A'
-
-    avg_win = gross_profit / total_wins if total_wins > 0 else 0
-    avg_loss = gross_loss / total_losses if total_losses > 0 else 0
-    largest_win = max(winning_trades, key=lambda t: t.pnl, default=None)
-    largest_loss = min(losing_trades, key=lambda t: t.pnl, default=None)
-
-    # --- Time & Direction Stats ---
-    holding_times = [(t.exit_date - t.entry_date).total_seconds() for t in trades_sorted if t.exit_date]
-    avg_holding_time_seconds = sum(holding_times) / len(holding_times) if holding_times else 0
-
-    long_trades = [t for t in trades_sorted if t.direction == 'Long']
-    short_trades = [t for t in trades_sorted if t.direction == 'Short']
-    long_wins = sum(1 for t in long_trades if t.pnl is not None and t.pnl > 0)
-    short_wins = sum(1 for t in short_trades if t.pnl is not None and t.pnl > 0)
-    long_win_rate = (long_wins / len(long_trades)) * 100 if long_trades else 0
-    short_win_rate = (short_wins / len(short_trades)) * 100 if short_trades else 0
 
-    # -- Chart 1: Cumulative PnL ---
-    cumulative_pnl = []
-    current_pnl = 0
-    dates = []
-    for t in trades_sorted:
-        ref_date = t.exit_date or t.entry_date
-        dates.append(ref_date.strftime('%Y-%m-%d %H:%M'))
-        if t.pnl is not None:
-            current_pnl += t.pnl
-        cumulative_pnl.append(current_pnl)
+    # Headline numbers come from the incrementally maintained aggregates; no trade rows are
+    # read here. Charts load from api_statistics and the trade table from statistics_trades.
+    summary = stats.load_summary(current_user.id, account_filter)
 
-    # --- Chart 2: PnL by Symbol ---
-    symbol_pnl = {}
-    for t in trades_sorted:
-        symbol_pnl.setdefault(t.ticker, 0)
-        symbol_pnl[t.ticker] += t.pnl or 0
-    symbol_names = list(symbol_pnl.keys())
-    symbol_pnls = [round(v, 2) for v in symbol_pnl.values()]
-    
-    # --- Chart 3: PnL by Strategy ---
-    strategy_pnl = {}
-    for t in trades_sorted:
-        strategy_pnl.setdefault(t.strategy.name, 0)
-        strategy_pnl[t.strategy.name] += t.pnl or 0
-    strategy_names = list(strategy_pnl.keys())
-    strategy_pnls = [round(v, 2) for v in strategy_pnl.values()]
-
-    # --- Chart 4: PnL by Account (only if not filtering by account) ---
-    account_pnl = {}
-    if not account_filter:
-        for t in trades_sorted:
-            account_pnl.setdefault(t.account, 0)
-            account_pnl[t.account] += t.pnl or 0
-        account_names = list(account_pnl.keys())
-        account_pnls = [round(v, 2) for v in account_pnl.values()]
-    else:
-        account_names = []
-        account_pnls = []
-
-    # --- Chart 5: Trade Outcomes by Direction ---
-    long_losses = len([t for t in long_trades if t.pnl is not None and t.pnl < 0])
-    long_be = len([t for t in long_trades if t.pnl is not None and t.pnl == 0])
-    short_losses = len([t for t in short_trades if t.pnl is not None and t.pnl < 0])
-    short_be = len([t for t in short_trades if t.pnl is not None and t.pnl == 0])
-    
-    # --- Other ---
-    from collections import Counter
-    symbol_counts = Counter(t.ticker for t in trades_sorted)
-    most_traded_symbol = symbol_counts.most_common(1)[0][0] if symbol_counts else 'N/A'
+    # Accounts for the filter dropdown
+    user_accounts = facets.get_facets(current_user).accounts
 
-    # Get unique accounts for the filter dropdown
-    user_accounts = db.session.query(Trade.account).filter_by(user_id=current_user.id).distinct().order_by(Trade.account).all()
-    user_accounts = [account[0] for account in user_accounts]
+    if not summary['total_trades']:
+        return render_template('statistics.html', title='Statistics', no_trades=True,
+                               account_filter=account_filter, user_accounts=user_accounts)
 
     return render_template(
         'statistics.html',
         title='Statistics',
-        # Overall Performance
-        total_trades=total_trades,
-        win_rate=win_rate,
-        total_pnl=total_pnl,
-        profit_factor=profit_factor,
-        # PnL Details
-        avg_win=avg_win,
-        avg_loss=avg_loss,
-        largest_win=largest_win,
-        largest_loss=largest_loss,
-        # By Direction
-        long_win_rate=long_win_rate,
-        short_win_rate=short_win_rate,
-        # Other
-        avg_holding_time_seconds=avg_holding_time_seconds,
-        most_traded_symbol=most_traded_symbol,
-        # Chart Data
-        dates=dates,
-        cumulative_pnl=cumulative_pnl,
-        symbol_names=symbol_names,
-        symbol_pnls=symbol_pnls,
-        strategy_names=strategy_names,
-        strategy_pnls=strategy_pnls,
-        account_names=account_names,
-        account_pnls=account_pnls,
-        # Direction Chart Data
-        long_wins=long_wins,
-        long_losses=long_losses,
-        long_be=long_be,
-        short_wins=short_wins,
-        short_losses=short_losses,
-        short_be=short_be,
+        # Overall Performance, PnL Details, By Direction and Other
+        **summary,
         # Account filtering
         account_filter=account_filter,
+        user_accounts=user_accounts
+    )
+
+@bp.route('/reconciliation')
+@login_required
+def reconciliation():
+    """Imported cash history reconciled per account and day against the trade journal"""
+    account_filter = request.args.get('account', '').strip()
+    has_entries = cash.has_entries(current_user.id)
+    days = cash.daily_reconciliation(current_user.id, account_filter) if has_entries else []
+    user_accounts = sorted(set(facets.get_facets(current_user).accounts) | {day.account for day in days})
+    return render_template(
+        'reconciliation.html',
+        title='Cash Reconciliation',
+        has_entries=has_entries,
+        days=days,
+        summaries=cash.account_summaries(days),
+        account_filter=account_filter,
         user_accounts=user_accounts,
-        # Pagination
+        cash_net=cash.cash_net,
+        difference=cash.difference,
+        tolerance=cash.TOLERANCE,
+        commission_per_contract=importer.COMMISSION_PER_CONTRACT,
+    )
+
+@bp.route('/statistics/trades')
+@login_required
+def statistics_trades():
+    """Paginated trade table fragment, loaded on demand by the statistics page."""
+    account_filter = request.args.get('account', '').strip()
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 50, type=int)  # Default 50 trades per page
+    per_page = min(max(per_page, 1), 200)
+
+    query = Trade.query.filter_by(user_id=current_user.id).options(db.joinedload(Trade.strategy))
+    if account_filter:
+        query = query.filter(Trade.account == account_filter)
+    pagination = query.order_by(Trade.entry_date.desc()).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+    return render_template(
+        'statistics_trades.html',
+        trades=pagination.items,
         pagination=pagination,
         page=page,
-        per_page=per_page
+        per_page=per_page,
+        account_filter=account_filter
     )
 
+def _statistics_etag(account_filter):
+    key = ':'.join(str(part) for part in (
+        STATISTICS_API_VERSION,
+        current_user.id,
+        current_user.trade_data_version,
+        account_filter,
+        current_app.config['STATS_CHART_MAX_POINTS'],
+    ))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+@bp.route('/api/statistics')
+@login_required
+def api_statistics():
+    """Chart data for the statistics page, revalidated against the user's trade-data version."""
+    account_filter = request.args.get('account', '').strip()
+    etag = _statistics_etag(account_filter)
+    if request.if_none_match.contains_weak(etag):
+        # Nothing changed since the client's copy: skip recomputation and serialization
+        response = current_app.response_class(status=304)
+    else:
+        max_points = current_app.config['STATS_CHART_MAX_POINTS']
+        summary = stats.load_summary(current_user.id, account_filter)
+        frame = analytics.TradeFrame.load(current_user.id, account_filter)
+        # Shape-preserving reduction; zooming fetches finer detail from statistics_equity
+        executed = frame.executed.tolist()
+        dates, cumulative_pnl = charts.downsample(executed, frame.equity.tolist(), max_points)
+        underwater_dates, underwater = charts.downsample(executed, frame.underwater[1].tolist(), max_points)
+        win_rates = analytics.rolling_win_rate(frame.pnl, ROLLING_WIN_RATE_WINDOW).tolist()
+        kept = charts.lttb(range(len(win_rates)), win_rates, max_points)
+        response = jsonify(dict(
+            summary,
+            **analytics.risk_metrics(frame, cash.capital(current_user.id, account_filter)),
+            dates=[d.strftime('%Y-%m-%d %H:%M:%S') for d in dates],
+            cumulative_pnl=cumulative_pnl,
+            equity_total_points=len(frame),
+            underwater_dates=[d.strftime('%Y-%m-%d %H:%M:%S') for d in underwater_dates],
+            underwater=underwater,
+            rolling_win_rate_window=ROLLING_WIN_RATE_WINDOW,
+            rolling_win_rate_trades=[i + 1 for i in kept],
+            rolling_win_rate=[win_rates[i] for i in kept],
+        ))
+    response.set_etag(etag)
+    # Per-user data: only the browser may cache it, and it must revalidate each time
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@bp.route('/statistics/equity')
+@login_required
+def statistics_equity():
+    """Cumulative PnL points inside a zoomed date range of the equity chart."""
+    account_filter = request.args.get('account', '').strip()
+    bounds = []
+    for name in ('start', 'end'):
+        value = request.args.get(name, '').strip()
+        try:
+            # Plotly sends 'YYYY-MM-DD HH:MM:SS.ffff'; second precision is enough
+            bounds.append(datetime.fromisoformat(value[:19]) if value else None)
+        except ValueError:
+            return jsonify({'success': False, 'message': f'Invalid {name} date.'}), 400
+    start, end = bounds
+    dates, cumulative_pnl = charts.equity_curve(current_user.id, account_filter, start, end)
+    total_points = len(dates)
+    dates, cumulative_pnl = charts.downsample(dates, cumulative_pnl, current_app.config['STATS_CHART_MAX_POINTS'])
+    return jsonify({
+        'dates': [d.strftime('%Y-%m-%d %H:%M:%S') for d in dates],
+        'cumulative_pnl': cumulative_pnl,
+        'total_points': total_points,
+    })
+
 @bp.route('/change-password', methods=['GET', 'POST'])
 @login_required
 def change_password():
@@ -548,29 +598,30 @@ def edit_trade(trade_id):
                 img_filename = f'screenshot{ext}'
                 img_path = os.path.join(trade_folder, img_filename)
                 file.save(img_path)
-                thumb_filename = f'thumb{ext}'
-                thumb_path = os.path.join(trade_folder, thumb_filename)
-                with Image.open(img_path) as img:
-                    img.thumbnail(THUMB_SIZE)
-                    img.save(thumb_path)
                 trade.screenshot = f'{user_id}/{trade_id}/{img_filename}'
+                # Scaled copies are written in the background; pages show the original until then
+                trade.screenshot_ready = False
             trade.pnl = trade.calculate_pnl
             db.session.commit()
+            if file and file.filename:
+                # Also pre-renders the card once the inset is ready
+                tasks.submit_screenshot(trade.id, UPLOAD_FOLDER)
+            elif trade.exit_date is not None:
+                tasks.submit_card_renders([trade.id], UPLOAD_FOLDER)
             flash('Trade updated successfully!', 'success')
             return redirect(url_for('main.index'))
         except Exception as e:
             db.session.rollback()
             flash(f'Error updating trade: {e}', 'danger')
-    strategies = Strategy.query.filter_by(user_id=current_user.id).order_by(Strategy.name).all()
-    user_tags = Tag.query.filter_by(user_id=current_user.id).order_by(Tag.name).all()
+    user_facets = facets.get_facets(current_user)
     return render_template(
         'add_trade.html',
         title='Edit Trade',
-        strategies=strategies,
+        strategies=user_facets.strategies,
         symbols=FUTURES_SYMBOLS,
         trade=trade,
         edit_mode=True,
-        user_tags=user_tags
+        user_tags=user_facets.tags
     ) 
 
 @bp.route('/delete_strategy/<int:strategy_id>', methods=['POST'])
@@ -717,6 +768,18 @@ def calendar():
         # Return a simple error page
         return f"Calendar Error: {e}", 500 
 
+def _card_response(trade, scope='public'):
+    """The trade's card in the format the client accepts, or 304 without rendering when it already has it."""
+    key = cards.card_key(trade, UPLOAD_FOLDER)
+    fmt = cards.negotiate_format(request.accept_mimetypes)
+    def send():
+        path = cards.card_path(trade, UPLOAD_FOLDER, fmt, key)
+        return send_file(path, mimetype=cards.mimetype(fmt), as_attachment=False,
+                         download_name=f'trade_{trade.id}_card.{fmt}', etag=False)
+    response = _content_response(f'{key}-{fmt}', send, scope)
+    response.vary.add('Accept')
+    return response
+
 @bp.route('/share_trade/<int:trade_id>')
 @login_required
 def share_trade(trade_id):
@@ -725,159 +788,7 @@ def share_trade(trade_id):
         flash('You are not authorized to share this trade.', 'danger')
         return redirect(url_for('main.index'))
 
-    # Use pre-designed card background as-is (no masking needed)
-    # Use absolute path based on current file location for Render compatibility
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    bg_path = os.path.join(current_dir, 'static', 'card_bg.png')
-    with Image.open(bg_path).convert('RGBA') as base_img:
-        card = base_img.copy()
-    width, height = card.size
-
-    # Load Roboto font (log error if not found)
-    # Use absolute path based on current file location for Render compatibility
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    font_path = os.path.join(current_dir, 'static', 'fonts', 'Roboto-VariableFont_wdth,wght.ttf')
-    try:
-        font_title = ImageFont.truetype(font_path, 64)
-        font_label = ImageFont.truetype(font_path, 36)
-        font_value = ImageFont.truetype(font_path, 48)
-        font_pnl = ImageFont.truetype(font_path, 96)
-        font_small = ImageFont.truetype(font_path, 28)
-    except Exception as e:
-        print(f"[ERROR] Could not load Roboto font: {e}", file=sys.stderr)
-        font_title = font_label = font_value = font_pnl = font_small = ImageFont.load_default()
-
-    draw = ImageDraw.Draw(card)
-
-    # Helper for text size (Pillow >=8.0)
-    def get_text_size(font, text):
-        bbox = font.getbbox(text)
-        return bbox[2] - bbox[0], bbox[3] - bbox[1]
-
-    # Centered layout variables
-    center_x = width // 2
-    top_margin = 250  # Estimated lion logo height + padding
-    y = top_margin
-
-    # TRADELOG branding (centered top, below lion logo)
-    title_text = "KINGLINE"
-    title_w, title_h = get_text_size(font_title, title_text)
-    draw.text((center_x - title_w//2, y), title_text, font=font_title, fill='#f7b32b')
-    y += title_h + 10  # 10px spacing
-    y += 20  # Move ticker and badge 20px lower
-
-    # Ticker and badge (centered, badge to right or below if needed)
-    ticker_text = trade.ticker
-    font_value_large = ImageFont.truetype(font_path, 60)
-    ticker_w, ticker_h = get_text_size(font_value_large, ticker_text)
-    badge_text = trade.direction.capitalize()
-    badge_color = (0, 212, 170, 255) if badge_text == 'Long' else (255, 107, 107, 255)
-    font_badge = ImageFont.truetype(font_path, 44)
-    badge_text_w, badge_text_h = get_text_size(font_badge, badge_text)
-    badge_padding_x = 36  # horizontal padding inside badge
-    badge_padding_y = 16  # vertical padding inside badge
-    badge_w = badge_text_w + badge_padding_x
-    badge_h = badge_text_h + badge_padding_y
-    badge_gap = 20
-    # Calculate the total width of ticker + gap + badge
-    total_w = ticker_w + badge_gap + badge_w
-    ticker_x = center_x - total_w // 2
-    badge_x = ticker_x + ticker_w + badge_gap
-    badge_y = y + (ticker_h - badge_h) // 2
-    badge_fits = badge_x + badge_w < width - 20
-    if badge_fits:
-        # Draw ticker
-        draw.text((ticker_x, y), ticker_text, font=font_value_large, fill='#fff')
-        # Draw badge to right of ticker, perfectly centered
-        badge = Image.new('RGBA', (badge_w, badge_h), (0,0,0,0))
-        badge_draw = ImageDraw.Draw(badge)
-        badge_draw.rounded_rectangle([(0,0),(badge_w,badge_h)], radius=badge_h//2, fill=badge_color)
-        # Draw text centered in badge
-        badge_draw.text(((badge_w-badge_text_w)//2, (badge_h-badge_text_h)//2), badge_text, font=font_badge, fill='#fff')
-        card.paste(badge, (int(badge_x), int(badge_y)), badge)
-        y += max(ticker_h, badge_h) + 30  # 30px spacing
-    else:
-        # Draw ticker centered
-        draw.text((center_x - ticker_w//2, y), ticker_text, font=font_value_large, fill='#fff')
-        y += ticker_h + 10
-        # Draw badge centered below ticker
-        badge_x_center = center_x - badge_w//2
-        badge_y = y
-        badge = Image.new('RGBA', (badge_w, badge_h), (0,0,0,0))
-        badge_draw = ImageDraw.Draw(badge)
-        badge_draw.rounded_rectangle([(0,0),(badge_w,badge_h)], radius=badge_h//2, fill=badge_color)
-        badge_draw.text(((badge_w-badge_text_w)//2, (badge_h-badge_text_h)//2), badge_text, font=font_badge, fill='#fff')
-        card.paste(badge, (int(badge_x_center), int(badge_y)), badge)
-        y += badge_h + 30  # 30px spacing
-
-    # Large PnL (centered, colored)
-    pnl_color = '#00d4aa' if trade.pnl and trade.pnl > 0 else '#ff6b6b' if trade.pnl and trade.pnl < 0 else '#fff'
-    pnl_text = f"{trade.pnl:.2f}" if trade.pnl is not None else '-'
-    pnl_label = "PnL"
-    pnl_label_w, pnl_label_h = get_text_size(font_label, pnl_label)
-    pnl_text_w, pnl_text_h = get_text_size(font_pnl, pnl_text)
-    draw.text((center_x - pnl_label_w//2, y), pnl_label, font=font_label, fill='#b0b0b0')
-    y += pnl_label_h + 8  # slightly more spacing
-    draw.text((center_x - pnl_text_w//2, y), pnl_text, font=font_pnl, fill=pnl_color)
-    y += pnl_text_h + 36  # more spacing before prices
-
-    # Entry/Exit price (two columns, centered below PnL)
-    price_y = y
-    col_width = 220  # Increased width for more space
-    total_cols_w = col_width * 2
-    group_x = center_x - total_cols_w // 2
-    entry_label = "Entry"
-    exit_label = "Exit"
-    entry_label_w, entry_label_h = get_text_size(font_label, entry_label)
-    exit_label_w, exit_label_h = get_text_size(font_label, exit_label)
-    entry_val = f"{trade.entry_price:.2f}"
-    exit_val = f"{trade.exit_price:.2f}" if trade.exit_price is not None else '-'
-    entry_val_w, entry_val_h = get_text_size(font_value, entry_val)
-    exit_val_w, exit_val_h = get_text_size(font_value, exit_val)
-    # Entry column
-    entry_col_x = group_x
-    # Exit column
-    exit_col_x = group_x + col_width
-    # Draw labels
-    draw.text((entry_col_x + (col_width - entry_label_w)//2, price_y), entry_label, font=font_label, fill='#b0b0b0')
-    draw.text((exit_col_x + (col_width - exit_label_w)//2, price_y), exit_label, font=font_label, fill='#b0b0b0')
-    # Baseline alignment for values
-    max_val_h = max(entry_val_h, exit_val_h)
-    value_y_base = price_y + entry_label_h + 8 + max_val_h  # baseline for both values
-    draw.text((entry_col_x + (col_width - entry_val_w)//2, value_y_base - entry_val_h), entry_val, font=font_value, fill='#fff')
-    draw.text((exit_col_x + (col_width - exit_val_w)//2, value_y_base - exit_val_h), exit_val, font=font_value, fill='#fff')
-    y = value_y_base + 32
-
-    # Strategy and date (bottom center)
-    bottom_y = height - 80
-    strat_text = f"Strategy: {trade.strategy.name if trade.strategy else '-'}"
-    date_text = f"Date: {trade.entry_date.strftime('%Y-%m-%d')}"
-    strat_w, strat_h = get_text_size(font_small, strat_text)
-    date_w, date_h = get_text_size(font_small, date_text)
-    draw.text((center_x - strat_w//2, bottom_y), strat_text, font=font_small, fill='#b0b0b0')
-    draw.text((center_x - date_w//2, bottom_y+strat_h+4), date_text, font=font_small, fill='#b0b0b0')
-
-    # Screenshot thumbnail (bottom right, above logo)
-    if trade.screenshot:
-        screenshot_path = os.path.join(UPLOAD_FOLDER, trade.screenshot.replace('\\', '/'))
-        if os.path.exists(screenshot_path):
-            try:
-                with Image.open(screenshot_path) as img:
-                    img.thumbnail((80, 80))
-                    screenshot_mask = Image.new('L', (80, 80), 0)
-                    screenshot_mask_draw = ImageDraw.Draw(screenshot_mask)
-                    screenshot_mask_draw.rounded_rectangle([(0, 0), (80, 80)], radius=12, fill=255)
-                    img.putalpha(screenshot_mask)
-                    card.paste(img, (card.width-110, card.height-130), img)
-            except Exception as e:
-                pass
-
-    # Output to BytesIO
-    img_io = BytesIO()
-    # Save as PNG with alpha preserved
-    card.save(img_io, 'PNG')
-    img_io.seek(0)
-    return send_file(img_io, mimetype='image/png', as_attachment=False, download_name=f'trade_{trade.id}_card.png') 
+    return _card_response(trade, scope='private')
 
 @bp.route('/shared/<int:trade_id>')
 def shared_card(trade_id):
@@ -906,6 +817,8 @@ def top_trades():
         .filter(Trade.pnl.isnot(None))  # Only trades with PnL calculated
         .filter(Trade.exit_date >= start_of_week)  # Current week only
         .filter(Trade.exit_date <= end_of_week)  # Current week only
+        # The cards' keys include the strategy name, and each card shows its trader
+        .options(db.contains_eager(Trade.trader), db.joinedload(Trade.strategy))
         .order_by(Trade.pnl.desc())
     )
     
@@ -931,6 +844,15 @@ def update_top_trades_optin():
     current_user.show_on_top_trades = show
     from app import db
     db.session.commit()
+    if show:
+        # Cards for this week's leaderboard, which links to many at once
+        today = datetime.utcnow().date()
+        start_of_week = today - timedelta(days=today.weekday())
+        closed = db.session.query(Trade.id).filter(
+            Trade.user_id == current_user.id,
+            Trade.exit_date >= start_of_week,
+        )
+        tasks.submit_card_renders([trade_id for trade_id, in closed], UPLOAD_FOLDER)
     flash('Top Trades opt-in updated.', 'success')
     return redirect(url_for('main.index')) 
 
@@ -942,125 +864,8 @@ def share_trade_png(trade_id):
         flash('You are not authorized to share this trade.', 'danger')
         return redirect(url_for('main.index'))
 
-    # Use project root for save_dir to avoid /app/app/ path issues
-    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    save_dir = os.path.join(project_root, 'var', 'data', 'trade_cards')
-    os.makedirs(save_dir, exist_ok=True)
-    save_path = os.path.join(save_dir, f"trade_{trade.id}.png")
-    print(f"[DEBUG] Saving/serving trade card at: {save_path}")
-
     try:
-        if not os.path.exists(save_path):
-            # Generate the PNG
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            bg_path = os.path.join(current_dir, 'static', 'card_bg.png')
-            with Image.open(bg_path).convert('RGBA') as base_img:
-                card = base_img.copy()
-            width, height = card.size
-            font_path = os.path.join(current_dir, 'static', 'fonts', 'Roboto-VariableFont_wdth,wght.ttf')
-            try:
-                font_title = ImageFont.truetype(font_path, 64)
-                font_label = ImageFont.truetype(font_path, 36)
-                font_value = ImageFont.truetype(font_path, 48)
-                font_pnl = ImageFont.truetype(font_path, 96)
-                font_small = ImageFont.truetype(font_path, 28)
-            except Exception as e:
-                print(f"[ERROR] Could not load Roboto font: {e}", file=sys.stderr)
-                font_title = font_label = font_value = font_pnl = font_small = ImageFont.load_default()
-            draw = ImageDraw.Draw(card)
-            def get_text_size(font, text):
-                bbox = font.getbbox(text)
-                return bbox[2] - bbox[0], bbox[3] - bbox[1]
-            center_x = width // 2
-            top_margin = 240
-            y = top_margin
-            title_text = "KINGLINE"
-            title_w, title_h = get_text_size(font_title, title_text)
-            draw.text((center_x - title_w//2, y), title_text, font=font_title, fill='#f7b32b')
-            y += title_h + 10
-            y += 20
-            ticker_text = trade.ticker
-            font_value_large = ImageFont.truetype(font_path, 60)
-            ticker_w, ticker_h = get_text_size(font_value_large, ticker_text)
-            badge_text = trade.direction.capitalize()
-            badge_color = (0, 212, 170, 255) if badge_text == 'Long' else (255, 107, 107, 255)
-            font_badge = ImageFont.truetype(font_path, 44)
-            badge_text_w, badge_text_h = get_text_size(font_badge, badge_text)
-            badge_padding_x = 36
-            badge_padding_y = 16
-            badge_w = badge_text_w + badge_padding_x
-            badge_h = badge_text_h + badge_padding_y
-            badge_gap = 20
-            # Calculate the total width of ticker + gap + badge
-            total_w = ticker_w + badge_gap + badge_w
-            ticker_x = center_x - total_w // 2
-            badge_x = ticker_x + ticker_w + badge_gap
-            badge_y = y + (ticker_h - badge_h) // 2
-            badge_fits = badge_x + badge_w < width - 20
-            if badge_fits:
-                draw.text((ticker_x, y), ticker_text, font=font_value_large, fill='#fff')
-                badge = Image.new('RGBA', (badge_w, badge_h), (0,0,0,0))
-                badge_draw = ImageDraw.Draw(badge)
-                badge_draw.rounded_rectangle([(0,0),(badge_w,badge_h)], radius=badge_h//2, fill=badge_color)
-                badge_draw.text(((badge_w-badge_text_w)//2, (badge_h-badge_text_h)//2), badge_text, font=font_badge, fill='#fff')
-                card.paste(badge, (int(badge_x), int(badge_y)), badge)
-                y += max(ticker_h, badge_h) + 30
-            else:
-                draw.text((center_x - ticker_w//2, y), ticker_text, font=font_value_large, fill='#fff')
-                y += ticker_h + 10
-                badge_x_center = center_x - badge_w//2
-                badge_y = y
-                badge = Image.new('RGBA', (badge_w, badge_h), (0,0,0,0))
-                badge_draw = ImageDraw.Draw(badge)
-                badge_draw.rounded_rectangle([(0,0),(badge_w,badge_h)], radius=badge_h//2, fill=badge_color)
-                badge_draw.text(((badge_w-badge_text_w)//2, (badge_h-badge_text_h)//2), badge_text, font=font_badge, fill='#fff')
-                card.paste(badge, (int(badge_x_center), int(badge_y)), badge)
-                y += badge_h + 30
-            pnl_color = '#00d4aa' if trade.pnl and trade.pnl > 0 else '#ff6b6b' if trade.pnl and trade.pnl < 0 else '#fff'
-            pnl_text = f"{trade.pnl:.2f}" if trade.pnl is not None else '-'
-            pnl_label = "PnL"
-            pnl_label_w, pnl_label_h = get_text_size(font_label, pnl_label)
-            pnl_text_w, pnl_text_h = get_text_size(font_pnl, pnl_text)
-            draw.text((center_x - pnl_label_w//2, y), pnl_label, font=font_label, fill='#b0b0b0')
-            y += pnl_label_h + 8
-            draw.text((center_x - pnl_text_w//2, y), pnl_text, font=font_pnl, fill=pnl_color)
-            y += pnl_text_h + 36
-            price_y = y
-            col_gap = 120
-            col_width = 220  # Increased width for more space, matches shareable card
-            total_cols_w = col_width * 2
-            group_x = center_x - total_cols_w // 2
-            entry_label = "Entry"
-            exit_label = "Exit"
-            entry_label_w, entry_label_h = get_text_size(font_label, entry_label)
-            exit_label_w, exit_label_h = get_text_size(font_label, exit_label)
-            entry_val = f"{trade.entry_price:.2f}"
-            exit_val = f"{trade.exit_price:.2f}" if trade.exit_price is not None else '-'
-            entry_val_w, entry_val_h = get_text_size(font_value, entry_val)
-            exit_val_w, exit_val_h = get_text_size(font_value, exit_val)
-            # Entry column
-            entry_col_x = group_x
-            # Exit column
-            exit_col_x = group_x + col_width
-            # Draw labels
-            draw.text((entry_col_x + (col_width - entry_label_w)//2, price_y), entry_label, font=font_label, fill='#b0b0b0')
-            draw.text((exit_col_x + (col_width - exit_label_w)//2, price_y), exit_label, font=font_label, fill='#b0b0b0')
-            # Baseline alignment for values (match share_trade logic)
-            max_val_h = max(entry_val_h, exit_val_h)
-            value_y_base = price_y + entry_label_h + 8 + max_val_h  # baseline for both values
-            draw.text((entry_col_x + (col_width - entry_val_w)//2, value_y_base - entry_val_h), entry_val, font=font_value, fill='#fff')
-            draw.text((exit_col_x + (col_width - exit_val_w)//2, value_y_base - exit_val_h), exit_val, font=font_value, fill='#fff')
-            y = value_y_base + 32
-            bottom_y = height - 80
-            strat_text = f"Strategy: {trade.strategy.name if trade.strategy else '-'}"
-            date_text = f"Date: {trade.entry_date.strftime('%Y-%m-%d')}"
-            strat_w, strat_h = get_text_size(font_small, strat_text)
-            date_w, date_h = get_text_size(font_small, date_text)
-            draw.text((center_x - strat_w//2, bottom_y), strat_text, font=font_small, fill='#b0b0b0')
-            draw.text((center_x - date_w//2, bottom_y+strat_h+4), date_text, font=font_small, fill='#b0b0b0')
-            # Save PNG to disk
-            card.save(save_path, 'PNG')
-        return send_file(save_path, mimetype='image/png', as_attachment=False, download_name=f'trade_{trade.id}_card.png')
+        return _card_response(trade)
     except Exception as e:
         print(f"[ERROR] Could not generate or serve trade card PNG: {e}", file=sys.stderr)
         return f"Error generating trade card image: {e}", 500
@@ -1070,16 +875,20 @@ def share_trade_png(trade_id):
 @bp.route('/import_trades', methods=['GET'])
 @login_required
 def import_trades():
-    """Show import trades page"""
+    """Show import trades page, with the progress of an import job if one is given"""
+    job = None
+    job_id = request.args.get('job', type=int)
+    if job_id:
+        job = ImportJob.query.filter_by(id=job_id, user_id=current_user.id).first()
     return render_template('import_trades.html', 
-                         title='Import Trades')
+                         title='Import Trades', job=job)
 
 
 
 @bp.route('/import_csv', methods=['POST'])
 @login_required
 def import_csv():
-    """Import trades from CSV file"""
+    """Queue a CSV file for import in the background"""
     if 'csv_file' not in request.files:
         flash('No file selected', 'error')
         return redirect(url_for('main.import_trades'))
@@ -1093,290 +902,37 @@ def import_csv():
         flash('Please select a CSV file', 'error')
         return redirect(url_for('main.import_trades'))
     
+    mode = request.form.get('matching', ledger.AVERAGE)
+    if mode not in ledger.MODES:
+        mode = ledger.AVERAGE
     try:
-        # Read CSV file
-        import csv
-        import io
-        from datetime import datetime
-        
-        # Read the file content
-        content = file.read().decode('utf-8')
-        csv_reader = csv.DictReader(io.StringIO(content))
-        
-        # Get or create "Imported" strategy
-        strategy = Strategy.query.filter_by(name='Imported', user_id=current_user.id).first()
-        if not strategy:
-            strategy = Strategy(name='Imported', user_id=current_user.id)
-            db.session.add(strategy)
-            db.session.commit()
-        
-        imported_count = 0
-        skipped_count = 0
-        
-        # Check if this is a Tradovate Orders export (has B/S column)
-        is_tradovate_orders = 'B/S' in csv_reader.fieldnames
-        
-        if is_tradovate_orders:
-            # Handle Tradovate Orders export format
-            imported_count, skipped_count = process_tradovate_orders(csv_reader, strategy, current_user)
-        else:
-            # Handle standard trade CSV format
-            for row in csv_reader:
-                try:
-                    # Parse trade data from CSV
-                    # This is a basic implementation - you may need to adjust based on your CSV format
-                    symbol = row.get('Symbol', row.get('symbol', ''))
-                    side = row.get('Side', row.get('side', ''))
-                    quantity = row.get('Quantity', row.get('quantity', ''))
-                    price = row.get('Price', row.get('price', ''))
-                    date_str = row.get('Date', row.get('date', ''))
-                    pnl = row.get('PnL', row.get('pnl', ''))
-                    
-                    if not all([symbol, side, quantity, price, date_str]):
-                        continue
-                    
-                    # Parse date
-                    try:
-                        trade_date = datetime.strptime(date_str, '%Y-%m-%d')
-                    except ValueError:
-                        try:
-                            trade_date = datetime.strptime(date_str, '%m/%d/%Y')
-                        except ValueError:
-                            continue
-                    
-                    # Check for duplicate trade
-                    existing_trade = Trade.query.filter_by(
-                        ticker=symbol,
-                        entry_date=trade_date,
-                        user_id=current_user.id
-                    ).first()
-                    
-                    if existing_trade:
-                        skipped_count += 1
-                        continue
-                    
-                    # Create new trade
-                    trade = Trade(
-                        ticker=symbol,
-                        direction='Long' if side.lower() in ['buy', 'long'] else 'Short',
-                        position_size=float(quantity),
-                        entry_price=float(price),
-                        entry_date=trade_date,
-                        strategy=strategy,
-                        user_id=current_user.id,
-                        notes=f"Imported from CSV - {file.filename}"
-                    )
-                    
-                    if pnl:
-                        try:
-                            trade.pnl = float(pnl)
-                        except ValueError:
-                            pass
-                    
-                    db.session.add(trade)
-                    imported_count += 1
-                    
-                except (ValueError, KeyError) as e:
-                    skipped_count += 1
-                    continue
-        
-        db.session.commit()
-        
-        if imported_count > 0:
-            flash(f'Successfully imported {imported_count} trades. Skipped {skipped_count} duplicates/invalid entries.', 'success')
-        else:
-            flash('No valid trades found in CSV file', 'warning')
-            
+        # Staged to disk and imported by a worker thread; the page polls its progress
+        job = tasks.submit_import(current_user.id, file, mode, force=bool(request.form.get('force')))
     except Exception as e:
+        db.session.rollback()
         flash(f'Error importing CSV: {str(e)}', 'error')
+        return redirect(url_for('main.import_trades'))
     
-    return redirect(url_for('main.import_trades'))
-
-def process_tradovate_orders(csv_reader, strategy, current_user):
-    """Process Tradovate Orders export format and convert to trades using FIFO ledger logic"""
-    from collections import defaultdict
-    from datetime import datetime
+    return redirect(url_for('main.import_trades', job=job.id))
 
-    # Group all filled orders by symbol
-    orders_by_symbol = defaultdict(list)
-    for row in csv_reader:
-        try:
-            if row.get('Status', '').strip() != 'Filled':
-                continue
-            symbol = row.get('Contract', '')
-            side = row.get('B/S', '').strip()
-            quantity = row.get('filledQty', '')
-            price = row.get('avgPrice', '')
-            date_str = row.get('Date', '')
-            fill_time = row.get('Fill Time', '')
-            account = row.get('Account', 'Default')  # Get account from CSV
-            if not all([symbol, side, quantity, price, date_str]):
-                continue
-            # Parse date and time
-            try:
-                trade_date = datetime.strptime(date_str, '%m/%d/%y')
-            except ValueError:
-                continue
-            try:
-                if fill_time:
-                    time_part = fill_time.split(' ')[1] if ' ' in fill_time else fill_time
-                    time_obj = datetime.strptime(time_part, '%H:%M:%S').time()
-                    trade_date = trade_date.replace(hour=time_obj.hour, minute=time_obj.minute, second=time_obj.second)
-            except:
-                pass
-            orders_by_symbol[symbol].append({
-                'side': side,
-                'quantity': float(quantity),
-                'price': float(price),
-                'datetime': trade_date,
-                'order_id': row.get('orderId', ''),
-                'account': account  # Include account
-            })
-        except Exception:
-            continue
-
-    imported_count = 0
-    skipped_count = 0
-    for symbol, orders in orders_by_symbol.items():
-        # Sort all fills by time
-        orders.sort(key=lambda x: x['datetime'])
-        
-        # Track running positions and trades
-        long_position = 0  # Running count of long contracts
-        short_position = 0  # Running count of short contracts
-        long_entries = []  # List of buy orders for weighted average
-        short_entries = []  # List of sell orders for weighted average
-        completed_trades = []  # Trades that are fully closed
-        
-        for order in orders:
-            side = order['side']
-            qty = order['quantity']
-            price = order['price']
-            dt = order['datetime']
-            oid = order['order_id']
-            account = order['account']  # Get account
-            
-            if side == 'Buy':
-                if short_position > 0:
-                    # Close short positions first
-                    qty_to_close = min(qty, short_position)
-                    
-                    # Calculate weighted average entry price for short position
-                    total_short_value = sum(entry['price'] * entry['qty'] for entry in short_entries)
-                    total_short_qty = sum(entry['qty'] for entry in short_entries)
-                    avg_short_entry = total_short_value / total_short_qty if total_short_qty > 0 else 0
-                    
-                    # Create completed short trade
-                    # Get point value from Trade model
-                    base_symbol = symbol.split('U')[0] if 'U' in symbol else symbol  # Remove month code
-                    point_value = Trade.TICKER_POINT_VALUES.get(base_symbol.upper(), 1)
-                    gross_pnl = (avg_short_entry - price) * qty_to_close * point_value
-                    net_pnl = gross_pnl - (qty_to_close * COMMISSION_PER_CONTRACT * 2)
-                    notes = 'Imported from Tradovate'
-                    
-                    # Check for duplicate trade
-                    existing_trade = Trade.query.filter_by(
-                        ticker=symbol,
-                        entry_date=short_entries[0]['time'],
-                        exit_date=dt,
-                        position_size=qty_to_close,
-                        user_id=current_user.id
-                    ).first()
-                    if not existing_trade:
-                        trade = Trade(
-                            ticker=symbol,
-                            account=account,  # Add account
-                            direction='Short',
-                            position_size=qty_to_close,
-                            entry_price=avg_short_entry,
-                            entry_date=short_entries[0]['time'],
-                            exit_price=price,
-                            exit_date=dt,
-                            strategy=strategy,
-                            user_id=current_user.id,
-                            notes=notes,
-                            pnl=net_pnl
-                        )
-                        db.session.add(trade)
-                        imported_count += 1
-                    else:
-                        skipped_count += 1
-                    
-                    # Update short position
-                    short_position -= qty_to_close
-                    if short_position == 0:
-                        short_entries = []  # Reset short entries
-                    
-                    # Remaining qty goes to long position
-                    remaining_qty = qty - qty_to_close
-                    if remaining_qty > 0:
-                        long_position += remaining_qty
-                        long_entries.append({'qty': remaining_qty, 'price': price, 'time': dt, 'order_id': oid})
-                else:
-                    # Add to long position
-                    long_position += qty
-                    long_entries.append({'qty': qty, 'price': price, 'time': dt, 'order_id': oid})
-                    
-            elif side == 'Sell':
-                if long_position > 0:
-                    # Close long positions first
-                    qty_to_close = min(qty, long_position)
-                    
-                    # Calculate weighted average entry price for long position
-                    total_long_value = sum(entry['price'] * entry['qty'] for entry in long_entries)
-                    total_long_qty = sum(entry['qty'] for entry in long_entries)
-                    avg_long_entry = total_long_value / total_long_qty if total_long_qty > 0 else 0
-                    
-                    # Create completed long trade
-                    # Get point value from Trade model
-                    base_symbol = symbol.split('U')[0] if 'U' in symbol else symbol  # Remove month code
-                    point_value = Trade.TICKER_POINT_VALUES.get(base_symbol.upper(), 1)
-                    gross_pnl = (price - avg_long_entry) * qty_to_close * point_value
-                    net_pnl = gross_pnl - (qty_to_close * COMMISSION_PER_CONTRACT * 2)
-                    notes = 'Imported from Tradovate'
-                    
-                    # Check for duplicate trade
-                    existing_trade = Trade.query.filter_by(
-                        ticker=symbol,
-                        entry_date=long_entries[0]['time'],
-                        exit_date=dt,
-                        position_size=qty_to_close,
-                        user_id=current_user.id
-                    ).first()
-                    if not existing_trade:
-                        trade = Trade(
-                            ticker=symbol,
-                            account=account,  # Add account
-                            direction='Long',
-                            position_size=qty_to_close,
-                            entry_price=avg_long_entry,
-                            entry_date=long_entries[0]['time'],
-                            exit_price=price,
-                            exit_date=dt,
-                            strategy=strategy,
-                            user_id=current_user.id,
-                            notes=notes,
-                            pnl=net_pnl
-                        )
-                        db.session.add(trade)
-                        imported_count += 1
-                    else:
-                        skipped_count += 1
-                    
-                    # Update long position
-                    long_position -= qty_to_close
-                    if long_position == 0:
-                        long_entries = []  # Reset long entries
-                    
-                    # Remaining qty goes to short position
-                    remaining_qty = qty - qty_to_close
-                    if remaining_qty > 0:
-                        short_position += remaining_qty
-                        short_entries.append({'qty': remaining_qty, 'price': price, 'time': dt, 'order_id': oid})
-                else:
-                    # Add to short position
-                    short_position += qty
-                    short_entries.append({'qty': qty, 'price': price, 'time': dt, 'order_id': oid})
-    
-    db.session.commit()
-    return imported_count, skipped_count 
\ No newline at end of file
+@bp.route('/api/import_jobs/<int:job_id>')
+@login_required
+def api_import_job(job_id):
+    """Status and progress of one of the current user's import jobs"""
+    job = ImportJob.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    if tasks.stale(job) and tasks.recover_stale_jobs():
+        tasks.kick(current_app._get_current_object())
+        db.session.refresh(job)
+    return jsonify({
+        'id': job.id,
+        'filename': job.filename,
+        'kind': job.kind,
+        'status': job.status,
+        'finished': job.finished,
+        'rows_total': job.rows_total,
+        'rows_parsed': job.rows_parsed,
+        'trades_created': job.trades_created,
+        'duplicates_skipped': job.duplicates_skipped,
+        'error': job.error,
+        'already_imported': job.already_imported,
+    })
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""Scaled copies of uploaded trade screenshots.
+
+An upload is stored as is and processed on the background pool
+(app/tasks.py), which writes one WebP per entry in SIZES next to it and
+then sets Trade.screenshot_ready. Until then pages show the thumbnail an
+older upload was saved with, when small enough and current, or the original.
+
+Each size is scaled from the next larger one, so the upload is decoded
+once. JPEGs are decoded at a reduced scale with Image.draft(), and reduce()
+does the bulk of each downscale before the final resample.
+"""
+import os
+import posixpath
+import uuid
+from PIL import Image, ImageOps
+
+# name: bounding box; largest first, each one is scaled from the previous
+SIZES = {
+    'preview': (1280, 1280),  # Trade list modal
+    'thumb': (150, 150),  # Trade list and edit form
+    'inset': (80, 80),  # Share card
+}
+
+QUALITY = 80
+
+# Uploads saved before SIZES have a thumbnail of this size, e.g. thumb.png beside screenshot.png
+LEGACY_THUMB_SIZE = (150, 150)
+
+
+def variant(screenshot, size):
+    """Relative path of a screenshot's scaled copy."""
+    return posixpath.join(posixpath.dirname(screenshot.replace('\\', '/')), f'{size}.webp')
+
+
+def legacy_thumb(upload_folder, screenshot):
+    """Relative path of the thumbnail saved with screenshot before SIZES, or None if missing or older."""
+    screenshot = screenshot.replace('\\', '/')
+    dirname, filename = posixpath.split(screenshot)
+    thumb = posixpath.join(dirname, filename.replace('screenshot', 'thumb', 1))
+    try:
+        # A newer upload of the same name leaves the previous one's thumbnail behind
+        if os.stat(os.path.join(upload_folder, thumb)).st_mtime_ns >= \
+                os.stat(os.path.join(upload_folder, screenshot)).st_mtime_ns:
+            return thumb
+    except OSError:
+        pass
+    return None
+
+
+def best_available(upload_folder, trade, size):
+    """Relative path of the file to show for a trade's screenshot at size."""
+    if trade.screenshot_ready:
+        return variant(trade.screenshot, size)
+    box = SIZES[size]
+    if box[0] <= LEGACY_THUMB_SIZE[0] and box[1] <= LEGACY_THUMB_SIZE[1]:
+        thumb = legacy_thumb(upload_folder, trade.screenshot)
+        if thumb:
+            return thumb
+    return trade.screenshot
+
+
+def _downscale(img, box):
+    """img scaled to fit within box, never enlarged."""
+    factor = min(img.width // box[0], img.height // box[1])
+    if factor >= 2:
+        img = img.reduce(factor)
+    else:
+        img = img.copy()
+    img.thumbnail(box, Image.Resampling.LANCZOS, reducing_gap=None)
+    return img
+
+
+def make_variants(upload_folder, screenshot):
+    """Write every size of the screenshot stored at upload_folder/screenshot."""
+    path = os.path.join(upload_folder, screenshot.replace('\\', '/'))
+    with Image.open(path) as img:
+        img.draft('RGB', next(iter(SIZES.values())))
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if img.has_transparency_data else 'RGB')
+        for size, box in SIZES.items():
+            img = _downscale(img, box)
+            out = os.path.join(upload_folder, variant(screenshot, size))
+            # Write under a temporary name so a page never links to a partial file
+            tmp_path = f'{out}.{uuid.uuid4().hex}.tmp'
+            img.save(tmp_path, 'WEBP', quality=QUALITY)
+            os.replace(tmp_path, out)
@@ -0,0 +1,133 @@
+"""Full-text search over trade tickers and notes.
+
+On SQLite the trade_fts FTS5 table (created by a migration) indexes ticker and
+notes as an external-content table over `trade`. Triggers keep it in sync for
+every write path, ORM or bulk. Tickers also match as substrings, since a
+contract root sits inside its symbols (NQ in MNQU5). Other databases, or a
+database without the table, fall back to LIKE matching.
+"""
+import re
+import weakref
+from sqlalchemy import inspect, text
+from app import db
+from app.models import Trade
+
+FTS_TABLE = 'trade_fts'
+
+CREATE_STATEMENTS = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "ticker, notes, content='trade', content_rowid='id', tokenize='unicode61')",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON trade BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, ticker, notes) VALUES (new.id, new.ticker, new.notes);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON trade BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, ticker, notes) VALUES ('delete', old.id, old.ticker, old.notes);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF ticker, notes ON trade BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, ticker, notes) VALUES ('delete', old.id, old.ticker, old.notes);
+        INSERT INTO {FTS_TABLE}(rowid, ticker, notes) VALUES (new.id, new.ticker, new.notes);
+    END""",
+    # Index the trades that existed before the table
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+DROP_STATEMENTS = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+# Maximum number of ranked matches returned for suggestions
+MAX_RESULTS = 50
+
+_enabled = weakref.WeakKeyDictionary()
+
+
+def create_index(connection):
+    for statement in CREATE_STATEMENTS:
+        connection.execute(text(statement))
+
+
+def drop_index(connection):
+    for statement in DROP_STATEMENTS:
+        connection.execute(text(statement))
+
+
+def fts_enabled():
+    """Whether this database has the FTS index, checked once per engine."""
+    engine = db.engine
+    if engine not in _enabled:
+        _enabled[engine] = engine.dialect.name == 'sqlite' and inspect(engine).has_table(FTS_TABLE)
+    return _enabled[engine]
+
+
+def match_expression(search_query):
+    """FTS5 query matching every word of search_query as a prefix, or None if it has no words."""
+    words = re.findall(r'\w+', search_query)
+    if not words:
+        return None
+    # Quoting makes each word a literal string, so FTS operators in the input are inert
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _like_condition(search_query):
+    return db.or_(
+        Trade.ticker.ilike(f'%{search_query}%'),
+        Trade.notes.ilike(f'%{search_query}%'),
+    )
+
+
+def _fts_matches(expression):
+    return text(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :expression').bindparams(
+        expression=expression
+    ).columns(db.column('rowid', db.Integer))
+
+
+def search_condition(search_query):
+    """Filter for trades whose ticker contains search_query or whose ticker or notes match it."""
+    if not fts_enabled():
+        return _like_condition(search_query)
+    ticker_condition = Trade.ticker.ilike(f'%{search_query}%')
+    expression = match_expression(search_query)
+    if expression is None:
+        return ticker_condition
+    return db.or_(ticker_condition, Trade.id.in_(_fts_matches(expression)))
+
+
+def _recent_like_matches(user_id, condition, limit, exclude=()):
+    rows = db.session.query(Trade.id, Trade.ticker, Trade.entry_date, Trade.notes).filter(
+        Trade.user_id == user_id, condition, Trade.id.notin_(exclude)
+    ).order_by(Trade.entry_date.desc()).limit(limit).all()
+    return [
+        {'id': id, 'ticker': ticker, 'entry_date': entry_date, 'snippet': (notes or '')[:80]}
+        for id, ticker, entry_date, notes in rows
+    ]
+
+
+def ranked_matches(user_id, search_query, limit=10):
+    """Best matches for search_query as dicts, most relevant (bm25) first.
+
+    Trades whose ticker only contains search_query follow, newest first.
+    """
+    limit = max(1, min(limit, MAX_RESULTS))
+    if not fts_enabled():
+        return _recent_like_matches(user_id, _like_condition(search_query), limit)
+    results = []
+    expression = match_expression(search_query)
+    if expression is not None:
+        rows = db.session.execute(text(
+            f"SELECT trade.id, trade.ticker, trade.entry_date, snippet({FTS_TABLE}, 1, '', '', '...', 12) "
+            f"FROM {FTS_TABLE} JOIN trade ON trade.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH :expression AND trade.user_id = :user_id "
+            f"ORDER BY bm25({FTS_TABLE}) LIMIT :limit"
+        ).columns(db.column('id', db.Integer), db.column('ticker', db.String), db.column('entry_date', db.DateTime),
+                  db.column('snippet', db.String)), {'expression': expression, 'user_id': user_id, 'limit': limit})
+        results = [
+            {'id': id, 'ticker': ticker, 'entry_date': entry_date, 'snippet': snippet or ''}
+            for id, ticker, entry_date, snippet in rows
+        ]
+    if len(results) < limit:
+        results += _recent_like_matches(user_id, Trade.ticker.ilike(f'%{search_query}%'), limit - len(results),
+                                        [result['id'] for result in results])
+    return results
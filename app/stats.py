@@ -0,0 +1,461 @@
+"""Incrementally maintained trade statistics.
+
+Every flush that inserts, edits or deletes a Trade adjusts the owner's
+TradeStats and TradeStatBucket rows by the difference, so the statistics
+page reads a handful of precomputed rows instead of re-scanning the whole
+journal. Statements that bypass the ORM unit of work (e.g. Query.delete)
+must call reset_user() themselves, or apply_rows() for core INSERTs. Strategy and Tag writes only bump the
+owner's trade data version, which keys the cached filter facets.
+
+check_user() compares the store with aggregate_summary(), which computes
+the same figures straight from the trade table, and drops drifted rows;
+`flask check-stats` runs it for every user.
+"""
+import math
+from collections import defaultdict
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Trade, TradeStats, TradeStatBucket, Strategy, Tag, User
+
+# Trade attributes the aggregates depend on
+TRACKED_FIELDS = ('user_id', 'account', 'ticker', 'strategy_id', 'direction', 'pnl', 'entry_date', 'exit_date')
+
+# TradeStats columns that are plain running sums
+COUNTER_COLUMNS = (
+    'trade_count', 'win_count', 'loss_count', 'breakeven_count',
+    'total_pnl', 'gross_profit', 'gross_loss', 'closed_count', 'holding_seconds',
+    'long_count', 'long_wins', 'long_losses', 'long_be',
+    'short_count', 'short_wins', 'short_losses', 'short_be',
+)
+
+
+def _contribution(values):
+    """Counter deltas contributed by a single trade."""
+    counters = {'trade_count': 1}
+    pnl = values['pnl']
+    outcome = None
+    if pnl is not None:
+        counters['total_pnl'] = pnl
+        if pnl > 0:
+            outcome = 'wins'
+            counters['win_count'] = 1
+            counters['gross_profit'] = pnl
+        elif pnl < 0:
+            outcome = 'losses'
+            counters['loss_count'] = 1
+            counters['gross_loss'] = pnl
+        else:
+            outcome = 'be'
+            counters['breakeven_count'] = 1
+    if values['exit_date'] and values['entry_date']:
+        counters['closed_count'] = 1
+        counters['holding_seconds'] = (values['exit_date'] - values['entry_date']).total_seconds()
+    direction = {'Long': 'long', 'Short': 'short'}.get(values['direction'])
+    if direction:
+        counters[f'{direction}_count'] = 1
+        if outcome:
+            counters[f'{direction}_{outcome}'] = 1
+    return counters
+
+
+class _Totals:
+    """Accumulates signed trade contributions keyed by (user_id, account)."""
+
+    def __init__(self):
+        self.counters = defaultdict(lambda: dict.fromkeys(COUNTER_COLUMNS, 0))
+        self.buckets = defaultdict(lambda: [0, 0.0])
+        # key -> [largest win, largest loss] among added / removed trades
+        self.added = defaultdict(lambda: [None, None])
+        self.removed = defaultdict(lambda: [None, None])
+
+    def add(self, values, sign=1):
+        if values['user_id'] is None:
+            return
+        key = (values['user_id'], values['account'])
+        counters = self.counters[key]
+        for column, delta in _contribution(values).items():
+            counters[column] += sign * delta
+        pnl = values['pnl'] or 0
+        for kind, bucket_key in (('symbol', values['ticker']), ('strategy', str(values['strategy_id']))):
+            bucket = self.buckets[key + (kind, bucket_key)]
+            bucket[0] += sign
+            bucket[1] += sign * pnl
+        if values['pnl'] is not None and values['pnl'] != 0:
+            extremes = (self.added if sign > 0 else self.removed)[key]
+            if pnl > 0 and (extremes[0] is None or pnl > extremes[0]):
+                extremes[0] = pnl
+            elif pnl < 0 and (extremes[1] is None or pnl < extremes[1]):
+                extremes[1] = pnl
+
+    def __bool__(self):
+        return bool(self.counters)
+
+
+def _values(trade, committed=False):
+    """Tracked field values of a trade, optionally as they were before the flush."""
+    if not committed:
+        return {field: getattr(trade, field) for field in TRACKED_FIELDS}
+    state = inspect(trade)
+    values = {}
+    for field in TRACKED_FIELDS:
+        history = state.attrs[field].history
+        if history.deleted:
+            values[field] = history.deleted[0]
+        elif history.unchanged:
+            values[field] = history.unchanged[0]
+        else:
+            values[field] = getattr(trade, field)
+    # Strategy is usually reassigned through the relationship, not the FK
+    strategy_history = state.attrs.strategy.history
+    if strategy_history.deleted and strategy_history.deleted[0] is not None:
+        values['strategy_id'] = strategy_history.deleted[0].id
+    return values
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+# An attribute expired by a commit has no history when it is simply
+# overwritten; active history loads the committed value first, so _values()
+# subtracts what was stored rather than the new value
+for _field in TRACKED_FIELDS + ('strategy',):
+    event.listen(getattr(Trade, _field), 'set', _keep_old_value, active_history=True)
+
+
+def _tracked_change(trade):
+    state = inspect(trade)
+    return any(state.attrs[field].history.has_changes() for field in TRACKED_FIELDS + ('strategy',))
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_trade_changes(session, flush_context):
+    totals = _Totals()
+    changed_users = set()
+    for obj in session.new:
+        if isinstance(obj, Trade):
+            totals.add(_values(obj))
+            changed_users.add(obj.user_id)
+    for obj in session.deleted:
+        if isinstance(obj, Trade):
+            totals.add(_values(obj, committed=True), -1)
+            changed_users.add(obj.user_id)
+    for obj in session.dirty:
+        if isinstance(obj, Trade) and session.is_modified(obj):
+            changed_users.add(obj.user_id)
+            if _tracked_change(obj):
+                totals.add(_values(obj, committed=True), -1)
+                totals.add(_values(obj))
+    for obj in (*session.new, *session.deleted, *session.dirty):
+        if isinstance(obj, (Strategy, Tag)):
+            changed_users.add(obj.user_id)
+    changed_users.discard(None)
+    if changed_users:
+        bump_data_version(session.connection(), changed_users)
+    if totals:
+        _apply(session.connection(), totals)
+
+
+def bump_data_version(connection, user_ids):
+    """Mark the users' trade data as changed, invalidating cached statistics."""
+    users = User.__table__
+    connection.execute(
+        users.update()
+        .where(users.c.id.in_(user_ids))
+        .values(trade_data_version=users.c.trade_data_version + 1)
+    )
+
+
+def _apply(connection, totals):
+    """Add accumulated deltas to the stored aggregates of already-built users."""
+    stats_table = TradeStats.__table__
+    bucket_table = TradeStatBucket.__table__
+    user_ids = {user_id for user_id, _ in totals.counters}
+    # Users without any aggregate rows are rebuilt from scratch on their next read
+    built = {row[0] for row in connection.execute(
+        db.select(stats_table.c.user_id).where(stats_table.c.user_id.in_(user_ids)).distinct()
+    )}
+    if not built:
+        return
+    c = stats_table.c
+    for key, counters in totals.counters.items():
+        user_id, account = key
+        if user_id not in built:
+            continue
+        values = {column: getattr(c, column) + delta for column, delta in counters.items() if delta}
+        win, loss = totals.added[key]
+        if win is not None:
+            values['largest_win'] = db.case((c.largest_win.is_(None), win), (c.largest_win < win, win), else_=c.largest_win)
+        if loss is not None:
+            values['largest_loss'] = db.case((c.largest_loss.is_(None), loss), (c.largest_loss > loss, loss), else_=c.largest_loss)
+        removed_win, removed_loss = totals.removed[key]
+        if removed_win is not None or removed_loss is not None:
+            # Removing the current extreme can't be undone incrementally; recompute on read
+            stale = c.extremes_stale
+            if removed_win is not None:
+                stale = db.or_(stale, c.largest_win <= removed_win)
+            if removed_loss is not None:
+                stale = db.or_(stale, c.largest_loss >= removed_loss)
+            values['extremes_stale'] = db.case((stale, True), else_=False)
+        if not values:
+            continue
+        result = connection.execute(
+            stats_table.update()
+            .where(c.user_id == user_id, c.account == account)
+            .values(**values)
+        )
+        if result.rowcount == 0:
+            row = dict(counters, user_id=user_id, account=account, largest_win=win, largest_loss=loss, extremes_stale=False)
+            connection.execute(stats_table.insert().values(**row))
+    b = bucket_table.c
+    for (user_id, account, kind, key), (count, pnl) in totals.buckets.items():
+        if user_id not in built or (count == 0 and pnl == 0):
+            continue
+        result = connection.execute(
+            bucket_table.update()
+            .where(b.user_id == user_id, b.account == account, b.kind == kind, b.key == key)
+            .values(trade_count=b.trade_count + count, pnl=b.pnl + pnl)
+        )
+        if result.rowcount == 0:
+            connection.execute(bucket_table.insert().values(
+                user_id=user_id, account=account, kind=kind, key=key, trade_count=count, pnl=pnl
+            ))
+
+
+def apply_rows(rows):
+    """Fold trades inserted with core INSERTs (column dicts) into the aggregates."""
+    totals = _Totals()
+    for row in rows:
+        totals.add({field: row.get(field) for field in TRACKED_FIELDS})
+    if not totals:
+        return
+    connection = db.session.connection()
+    bump_data_version(connection, {user_id for user_id, _ in totals.counters})
+    _apply(connection, totals)
+
+
+def _drop_aggregates(user_id):
+    TradeStatBucket.query.filter_by(user_id=user_id).delete()
+    TradeStats.query.filter_by(user_id=user_id).delete()
+
+
+def reset_user(user_id):
+    """Drop a user's aggregates after a bulk write so they are rebuilt on the next read."""
+    _drop_aggregates(user_id)
+    bump_data_version(db.session.connection(), {user_id})
+
+
+def _seconds_between(start, end):
+    """SQL expression for the number of seconds between two DateTime columns."""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return (db.func.julianday(end) - db.func.julianday(start)) * 86400.0
+    if dialect in ('mysql', 'mariadb'):
+        return db.func.timestampdiff(db.text('SECOND'), start, end)
+    return db.func.extract('epoch', end - start)
+
+
+def _count_if(condition):
+    return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+
+
+def _sum_if(condition, value):
+    return db.func.coalesce(db.func.sum(db.case((condition, value), else_=0)), 0)
+
+
+def aggregate_trades(user_id, account=None):
+    """TradeStats columns per account, computed in SQL with one GROUP BY query."""
+    pnl = Trade.pnl
+    closed = db.and_(Trade.exit_date.isnot(None), Trade.entry_date.isnot(None))
+    is_long = Trade.direction == 'Long'
+    is_short = Trade.direction == 'Short'
+    query = db.session.query(
+        Trade.account.label('account'),
+        db.func.count(Trade.id).label('trade_count'),
+        _count_if(pnl > 0).label('win_count'),
+        _count_if(pnl < 0).label('loss_count'),
+        _count_if(pnl == 0).label('breakeven_count'),
+        db.func.coalesce(db.func.sum(pnl), 0).label('total_pnl'),
+        _sum_if(pnl > 0, pnl).label('gross_profit'),
+        _sum_if(pnl < 0, pnl).label('gross_loss'),
+        db.func.max(db.case((pnl > 0, pnl))).label('largest_win'),
+        db.func.min(db.case((pnl < 0, pnl))).label('largest_loss'),
+        _count_if(closed).label('closed_count'),
+        _sum_if(closed, _seconds_between(Trade.entry_date, Trade.exit_date)).label('holding_seconds'),
+        _count_if(is_long).label('long_count'),
+        _count_if(db.and_(is_long, pnl > 0)).label('long_wins'),
+        _count_if(db.and_(is_long, pnl < 0)).label('long_losses'),
+        _count_if(db.and_(is_long, pnl == 0)).label('long_be'),
+        _count_if(is_short).label('short_count'),
+        _count_if(db.and_(is_short, pnl > 0)).label('short_wins'),
+        _count_if(db.and_(is_short, pnl < 0)).label('short_losses'),
+        _count_if(db.and_(is_short, pnl == 0)).label('short_be'),
+    ).filter(Trade.user_id == user_id)
+    if account:
+        query = query.filter(Trade.account == account)
+    return [row._asdict() for row in query.group_by(Trade.account)]
+
+
+def aggregate_buckets(user_id, account=None):
+    """(account, kind, key, trade_count, pnl) rows for the symbol and strategy breakdowns."""
+    rows = []
+    for kind, column in (('symbol', Trade.ticker), ('strategy', Trade.strategy_id)):
+        query = db.session.query(
+            Trade.account,
+            column,
+            db.func.count(Trade.id),
+            db.func.coalesce(db.func.sum(Trade.pnl), 0),
+        ).filter(Trade.user_id == user_id)
+        if account:
+            query = query.filter(Trade.account == account)
+        for row_account, key, count, pnl in query.group_by(Trade.account, column):
+            rows.append((row_account, kind, str(key), count, pnl))
+    return rows
+
+
+def rebuild_user(user_id):
+    """Recompute a user's aggregates from their trades and store them."""
+    _drop_aggregates(user_id)
+    for row in aggregate_trades(user_id):
+        db.session.add(TradeStats(user_id=user_id, extremes_stale=False, **row))
+    for account, kind, key, count, pnl in aggregate_buckets(user_id):
+        db.session.add(TradeStatBucket(user_id=user_id, account=account, kind=kind, key=key, trade_count=count, pnl=pnl))
+
+
+def _refresh_extremes(row):
+    largest_win, largest_loss = db.session.query(
+        db.func.max(db.case((Trade.pnl > 0, Trade.pnl))),
+        db.func.min(db.case((Trade.pnl < 0, Trade.pnl))),
+    ).filter(Trade.user_id == row.user_id, Trade.account == row.account).one()
+    row.largest_win = largest_win
+    row.largest_loss = largest_loss
+    row.extremes_stale = False
+
+
+def _load_rows(user_id):
+    rows = TradeStats.query.filter_by(user_id=user_id).all()
+    if rows and not any(row.extremes_stale for row in rows):
+        return rows
+    try:
+        if not rows:
+            rebuild_user(user_id)
+            db.session.flush()
+            rows = TradeStats.query.filter_by(user_id=user_id).all()
+        for row in rows:
+            if row.extremes_stale:
+                _refresh_extremes(row)
+        db.session.commit()
+    except IntegrityError:
+        # Another request built the aggregates concurrently
+        db.session.rollback()
+        rows = TradeStats.query.filter_by(user_id=user_id).all()
+    return rows
+
+
+def load_summary(user_id, account=None):
+    """Headline statistics and per-symbol/strategy/account PnL for a user."""
+    rows = _load_rows(user_id)
+    if account:
+        rows = [row for row in rows if row.account == account]
+    rows = [
+        {column: getattr(row, column) for column in COUNTER_COLUMNS + ('account', 'largest_win', 'largest_loss')}
+        for row in rows
+    ]
+    bucket_query = db.session.query(
+        TradeStatBucket.kind,
+        TradeStatBucket.key,
+        db.func.sum(TradeStatBucket.pnl),
+        db.func.sum(TradeStatBucket.trade_count),
+    ).filter(TradeStatBucket.user_id == user_id, TradeStatBucket.trade_count > 0)
+    if account:
+        bucket_query = bucket_query.filter(TradeStatBucket.account == account)
+    buckets = bucket_query.group_by(TradeStatBucket.kind, TradeStatBucket.key).order_by(TradeStatBucket.key).all()
+    return _summarize(user_id, rows, buckets, account)
+
+
+def aggregate_summary(user_id, account=None):
+    """Same result as load_summary(), computed directly from SQL aggregates without the store."""
+    merged = {}
+    for _, kind, key, count, pnl in aggregate_buckets(user_id, account):
+        bucket = merged.setdefault((kind, key), [0, 0])
+        bucket[0] += pnl
+        bucket[1] += count
+    buckets = [(kind, key, pnl, count) for (kind, key), (pnl, count) in sorted(merged.items(), key=lambda item: item[0][1])]
+    return _summarize(user_id, aggregate_trades(user_id, account), buckets, account)
+
+
+def _same(stored, computed):
+    if isinstance(stored, list) and isinstance(computed, list):
+        return len(stored) == len(computed) and all(_same(a, b) for a, b in zip(stored, computed))
+    if isinstance(stored, (int, float)) and isinstance(computed, (int, float)):
+        return math.isclose(stored, computed, rel_tol=1e-9, abs_tol=1e-6)
+    return stored == computed
+
+
+def check_user(user_id):
+    """Names of the statistics where the store disagrees with aggregate_summary().
+
+    Drifted aggregates are dropped, so they are rebuilt on the next read.
+    """
+    stored = load_summary(user_id)
+    computed = aggregate_summary(user_id)
+    drifted = sorted(name for name in computed if not _same(stored.get(name), computed[name]))
+    if drifted:
+        reset_user(user_id)
+        db.session.commit()
+    return drifted
+
+
+def _summarize(user_id, rows, buckets, account):
+    totals = {column: sum(row[column] for row in rows) for column in COUNTER_COLUMNS}
+    total_trades = totals['trade_count']
+    gross_profit = totals['gross_profit']
+    gross_loss = totals['gross_loss']
+    if gross_loss != 0:
+        profit_factor = abs(gross_profit / gross_loss)
+    elif gross_profit > 0:
+        profit_factor = 'Infinite'
+    else:
+        profit_factor = 'N/A'
+    wins = [row['largest_win'] for row in rows if row['largest_win'] is not None]
+    losses = [row['largest_loss'] for row in rows if row['largest_loss'] is not None]
+    long_count = totals['long_count']
+    short_count = totals['short_count']
+
+    symbol_buckets = [b for b in buckets if b[0] == 'symbol']
+    strategy_names = dict(db.session.query(Strategy.id, Strategy.name).filter(Strategy.user_id == user_id).all())
+    strategy_pnl = {}
+    for kind, key, pnl, _ in buckets:
+        if kind == 'strategy':
+            name = strategy_names.get(int(key), '-') if key.isdigit() else '-'
+            strategy_pnl[name] = strategy_pnl.get(name, 0) + pnl
+    most_traded = max(symbol_buckets, key=lambda b: b[3], default=None)
+    account_rows = [] if account else sorted((row for row in rows if row['trade_count'] > 0), key=lambda row: row['account'])
+
+    return {
+        'total_trades': total_trades,
+        'win_rate': (totals['win_count'] / total_trades) * 100 if total_trades > 0 else 0,
+        'total_pnl': totals['total_pnl'],
+        'profit_factor': profit_factor,
+        'avg_win': gross_profit / totals['win_count'] if totals['win_count'] > 0 else 0,
+        'avg_loss': gross_loss / totals['loss_count'] if totals['loss_count'] > 0 else 0,
+        'largest_win': max(wins) if wins else None,
+        'largest_loss': min(losses) if losses else None,
+        'long_win_rate': (totals['long_wins'] / long_count) * 100 if long_count else 0,
+        'short_win_rate': (totals['short_wins'] / short_count) * 100 if short_count else 0,
+        'avg_holding_time_seconds': totals['holding_seconds'] / totals['closed_count'] if totals['closed_count'] else 0,
+        'most_traded_symbol': most_traded[1] if most_traded else 'N/A',
+        'symbol_names': [b[1] for b in symbol_buckets],
+        'symbol_pnls': [round(b[2], 2) for b in symbol_buckets],
+        'strategy_names': list(strategy_pnl.keys()),
+        'strategy_pnls': [round(v, 2) for v in strategy_pnl.values()],
+        'account_names': [row['account'] for row in account_rows],
+        'account_pnls': [round(row['total_pnl'], 2) for row in account_rows],
+        'long_wins': totals['long_wins'],
+        'long_losses': totals['long_losses'],
+        'long_be': totals['long_be'],
+        'short_wins': totals['short_wins'],
+        'short_losses': totals['short_losses'],
+        'short_be': totals['short_be'],
+    }
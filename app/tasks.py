@@ -0,0 +1,301 @@
+"""Background work on in-process thread pools.
+
+CSV imports are queued as ImportJob rows and claimed by IMPORT_WORKERS
+threads in any process; share cards and screenshots are processed on a
+separate pool of RENDER_WORKERS threads.
+"""
+import csv
+import hashlib
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db, importer, cards, screenshots
+from sqlalchemy.exc import IntegrityError
+from app.models import ImportJob, ImportManifest, Trade, CashLedgerEntry
+
+# Bytes copied per read while staging an upload
+CHUNK_SIZE = 1024 * 1024
+
+# Thread pools by name, each sized by the {NAME}_WORKERS setting
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+def _get_executor(app, name='import'):
+    with _executor_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(
+                max_workers=app.config[f'{name.upper()}_WORKERS'], thread_name_prefix=name
+            )
+        return _executors[name]
+
+
+def _stage_upload(stream, folder):
+    """Copy an upload to folder in chunks; returns (path, data rows counted by line, SHA-256)."""
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f'{uuid.uuid4().hex}.csv')
+    digest = hashlib.sha256()
+    lines = 0
+    last = b''
+    with open(path, 'wb') as out:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+            out.write(chunk)
+            digest.update(chunk)
+            lines += chunk.count(b'\n')
+            last = chunk
+    if last and not last.endswith(b'\n'):
+        lines += 1
+    return path, max(lines - 1, 0), digest.hexdigest()
+
+
+def _upload_kind(path):
+    """ImportJob.CASH_HISTORY or ImportJob.TRADES, from a staged upload's header row."""
+    with open(path, encoding='utf-8-sig', newline='', errors='replace') as f:
+        fieldnames = next(csv.reader(f), None)
+    return ImportJob.CASH_HISTORY if importer.is_cash_history(fieldnames) else ImportJob.TRADES
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _manifest(user_id, content_hash, kind):
+    """The user's manifest entry for a file, unless the rows it imported are gone."""
+    manifest = ImportManifest.query.filter_by(user_id=user_id, content_hash=content_hash).first()
+    if manifest is None or not manifest.imported:
+        return manifest
+    # Deleting trades forgets the manifest; this also catches writes that bypassed the flush hook
+    model = CashLedgerEntry if kind == ImportJob.CASH_HISTORY else Trade
+    if db.session.query(model.query.filter_by(user_id=user_id).exists()).scalar():
+        return manifest
+    return None
+
+
+def submit_import(user_id, upload, matching, force=False):
+    """Stage a werkzeug FileStorage upload, queue its import and return the ImportJob.
+
+    A file in the user's manifest gives a job that is already done.
+    """
+    app = current_app._get_current_object()
+    path, rows_total, content_hash = _stage_upload(upload.stream, app.config['IMPORT_FOLDER'])
+    job = ImportJob(user_id=user_id, filename=upload.filename, path=path, kind=_upload_kind(path), matching=matching,
+                    rows_total=rows_total, content_hash=content_hash, force=force)
+    manifest = None if force else _manifest(user_id, content_hash, job.kind)
+    if manifest is not None:
+        _remove(path)
+        now = datetime.utcnow()
+        job.status = ImportJob.DONE
+        job.already_imported = True
+        job.rows_parsed = rows_total
+        job.duplicates_skipped = manifest.imported + manifest.skipped
+        job.started_at = job.finished_at = now
+    db.session.add(job)
+    db.session.commit()
+    if manifest is None:
+        kick(app)
+    return job
+
+
+def kick(app):
+    """Have one of the process's import threads run queued jobs until none is left."""
+    _get_executor(app).submit(run_queued, app)
+
+
+def _claim(job_id):
+    """Mark a queued job running; False if another worker claimed it first."""
+    now = datetime.utcnow()
+    claimed = ImportJob.query.filter_by(id=job_id, status=ImportJob.QUEUED).update({
+        'status': ImportJob.RUNNING,
+        'started_at': now,
+        'heartbeat_at': now,
+        'attempts': ImportJob.attempts + 1,
+        'rows_parsed': 0,
+        'trades_created': 0,
+        'duplicates_skipped': 0,
+    }, synchronize_session=False)
+    db.session.commit()
+    return claimed == 1
+
+
+def run_queued(app):
+    """Claim and run the oldest queued job, from any process, until the queue is empty."""
+    with app.app_context():
+        try:
+            while True:
+                job_id = db.session.query(ImportJob.id).filter_by(status=ImportJob.QUEUED) \
+                    .order_by(ImportJob.id).limit(1).scalar()
+                if job_id is None:
+                    return
+                if _claim(job_id):
+                    run_import(app, job_id)
+        except Exception:
+            db.session.rollback()
+            app.logger.exception('Running queued import jobs failed')
+        finally:
+            db.session.remove()
+
+
+def stale(job):
+    """Whether a running job's worker has stopped reporting progress."""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['IMPORT_STALE_AFTER'])
+    return job.status == ImportJob.RUNNING and (job.heartbeat_at or job.started_at) < cutoff
+
+
+def recover_stale_jobs():
+    """Requeue the jobs left running by a stopped worker; returns how many were requeued.
+
+    A job out of attempts, or whose staged file is gone, fails instead.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['IMPORT_STALE_AFTER'])
+    requeued = 0
+    for job in ImportJob.query.filter(ImportJob.status == ImportJob.RUNNING, db.func.coalesce(
+            ImportJob.heartbeat_at, ImportJob.started_at) < cutoff).all():
+        retry = job.attempts < current_app.config['IMPORT_MAX_ATTEMPTS'] and os.path.exists(job.path)
+        if retry:
+            values = {'status': ImportJob.QUEUED}
+        else:
+            values = {'status': ImportJob.FAILED, 'error': 'the import was interrupted.',
+                      'finished_at': datetime.utcnow()}
+        # Unless its worker reported progress meanwhile
+        updated = ImportJob.query.filter_by(id=job.id, status=ImportJob.RUNNING, heartbeat_at=job.heartbeat_at) \
+            .update(values, synchronize_session=False)
+        db.session.commit()
+        if updated and retry:
+            requeued += 1
+        elif updated:
+            _remove(job.path)
+    return requeued
+
+
+def init_app(app):
+    """Recover and run the jobs other processes left behind on the first request this one serves."""
+    lock = threading.Lock()
+    recovered = False
+
+    @app.before_request
+    def recover_import_jobs():
+        nonlocal recovered
+        with lock:
+            if recovered:
+                return
+            recovered = True
+        try:
+            recover_stale_jobs()
+            if ImportJob.query.filter_by(status=ImportJob.QUEUED).first() is not None:
+                kick(app)
+        except Exception:
+            db.session.rollback()
+            app.logger.exception('Recovering import jobs failed')
+
+
+def _record_manifest(job, imported, skipped):
+    manifest = ImportManifest.query.filter_by(user_id=job.user_id, content_hash=job.content_hash).first()
+    if manifest is None:
+        manifest = ImportManifest(user_id=job.user_id, content_hash=job.content_hash)
+        db.session.add(manifest)
+    manifest.filename = job.filename
+    manifest.imported = imported
+    manifest.skipped = skipped
+    manifest.created_at = datetime.utcnow()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # The same file finished importing in another job meanwhile
+        db.session.rollback()
+
+
+def _error_message(error):
+    """What to tell the user about an import that raised error; the traceback is only logged."""
+    if isinstance(error, UnicodeDecodeError):
+        return 'the file is not UTF-8 text. Export it again as CSV.'
+    if isinstance(error, csv.Error):
+        return 'the file is not a valid CSV.'
+    if isinstance(error, ValueError):
+        return f'the file contains a value that could not be read ({error}).'
+    return 'the import stopped unexpectedly. Please try again.'
+
+
+def run_import(app, job_id):
+    """Import the staged upload of a job claimed by this worker, recording progress and the outcome."""
+    job = db.session.get(ImportJob, job_id)
+
+    def progress(rows_read, imported, skipped):
+        job.rows_parsed = rows_read
+        job.trades_created = imported
+        job.duplicates_skipped = skipped
+        job.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+
+    try:
+        with open(job.path, 'rb') as stream:
+            imported, skipped = importer.import_csv_stream(
+                stream, job.user_id, job.filename, job.matching, progress, job.force
+            )
+        job.trades_created = imported
+        job.duplicates_skipped = skipped
+        job.status = ImportJob.DONE
+    except Exception as e:
+        db.session.rollback()
+        app.logger.exception('Import job %s failed', job_id)
+        job.status = ImportJob.FAILED
+        job.error = _error_message(e)
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    if job.status == ImportJob.DONE and job.content_hash:
+        _record_manifest(job, job.trades_created, job.duplicates_skipped)
+    _remove(job.path)
+
+
+def submit_card_renders(trade_ids, upload_folder):
+    """Queue rendering the share cards of the given closed trades."""
+    trade_ids = list(trade_ids)
+    if trade_ids:
+        app = current_app._get_current_object()
+        _get_executor(app, 'render').submit(render_cards, app, trade_ids, upload_folder)
+
+
+def render_cards(app, trade_ids, upload_folder):
+    """Render and cache the cards of those trades that are still closed; failures are only logged."""
+    with app.app_context():
+        try:
+            for trade in Trade.query.filter(Trade.id.in_(trade_ids), Trade.exit_date.isnot(None)):
+                cards.cached_cards(trade, upload_folder, cards.PRERENDER_FORMATS)
+        except Exception:
+            app.logger.exception('Pre-rendering share cards %s failed', trade_ids)
+        finally:
+            db.session.remove()
+
+
+def submit_screenshot(trade_id, upload_folder):
+    """Queue scaling a trade's newly saved screenshot."""
+    app = current_app._get_current_object()
+    _get_executor(app, 'render').submit(process_screenshot, app, trade_id, upload_folder)
+
+
+def process_screenshot(app, trade_id, upload_folder):
+    """Write a trade's scaled screenshots, mark them ready and pre-render its card."""
+    with app.app_context():
+        try:
+            trade = db.session.get(Trade, trade_id)
+            if trade is None or not trade.screenshot:
+                return
+            screenshot = trade.screenshot
+            screenshots.make_variants(upload_folder, screenshot)
+            db.session.refresh(trade)
+            # A different screenshot saved meanwhile has its own job queued
+            if trade.screenshot == screenshot:
+                trade.screenshot_ready = True
+                db.session.commit()
+                if trade.exit_date is not None:
+                    cards.cached_cards(trade, upload_folder, cards.PRERENDER_FORMATS)
+        except Exception:
+            db.session.rollback()
+            app.logger.exception('Processing the screenshot of trade %s failed', trade_id)
+        finally:
+            db.session.remove()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Tradovate Orders import: the old one-ORM-object-per-trade path
+against the batched executemany path in app/importer.py.
+
+Generates a year-long multi-account Orders export in memory and imports it
+into a fresh SQLite database file with each path.
+
+Usage: python benchmark_import.py [round_trips_per_account]
+"""
+
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from config import Config
+from app import create_app, db, importer, search
+from app.models import User, Trade, Strategy
+
+NUM_ACCOUNTS = 10
+ROUND_TRIPS_PER_ACCOUNT = 2000
+CONTRACTS = ['MNQU5', 'MESU5', 'NQU5']
+FIELDS = ['orderId', 'Account', 'B/S', 'Contract', 'avgPrice', 'filledQty', 'Fill Time', 'Status', 'Date']
+
+
+def generate_orders(round_trips_per_account, seed=7):
+    """Tradovate Orders CSV text with an entry and an exit fill per round trip."""
+    rnd = random.Random(seed)
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=FIELDS)
+    writer.writeheader()
+    order_id = 100000000000
+    for account_index in range(NUM_ACCOUNTS):
+        account = f'TAKEPROFIT{6215418 + account_index}'
+        when = datetime(2025, 1, 2, 9, 30)
+        for _ in range(round_trips_per_account):
+            contract = rnd.choice(CONTRACTS)
+            qty = rnd.randint(1, 5)
+            entry = round(rnd.uniform(20000, 23000) * 4) / 4
+            exit_ = entry + rnd.choice([-1, 1]) * rnd.randint(1, 80) * 0.25
+            opening, closing = rnd.choice([(' Buy', ' Sell'), (' Sell', ' Buy')])
+            for side, price in ((opening, entry), (closing, exit_)):
+                when += timedelta(minutes=rnd.randint(1, 90))
+                order_id += 1
+                writer.writerow({
+                    'orderId': order_id, 'Account': account, 'B/S': side, 'Contract': contract,
+                    'avgPrice': price, 'filledQty': qty, 'Fill Time': when.strftime('%m/%d/%Y %H:%M:%S'),
+                    'Status': ' Filled', 'Date': when.strftime('%-m/%-d/%y'),
+                })
+    return out.getvalue()
+
+
+def legacy_import(content, strategy, user_id):
+    """The previous import loop: a duplicate SELECT and an ORM object per trade."""
+    imported = skipped = 0
+    for (account, symbol), orders in importer.parse_tradovate_orders(csv.DictReader(io.StringIO(content))).items():
+        for row in importer.match_orders(symbol, orders):
+            existing_trade = Trade.query.filter_by(
+                ticker=row['ticker'], entry_date=row['entry_date'], exit_date=row['exit_date'],
+                position_size=row['position_size'], user_id=user_id
+            ).first()
+            if existing_trade:
+                skipped += 1
+                continue
+            db.session.add(Trade(strategy=strategy, user_id=user_id, **row))
+            imported += 1
+    db.session.commit()
+    return imported, skipped
+
+
+def bulk_import(content, strategy, user_id):
+    """The upload path: streamed from bytes, batched executemany INSERTs."""
+    result = importer.import_csv_stream(io.BytesIO(content.encode('utf-8')), user_id, 'Orders.csv')
+    db.session.commit()
+    return result
+
+
+def run(import_function, content):
+    """Seconds taken by import_function on a fresh database, and its result."""
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+
+    app = create_app(BenchmarkConfig)
+    try:
+        with app.app_context():
+            db.create_all()
+            with db.engine.begin() as connection:
+                search.create_index(connection)
+            user = User(username='bench')
+            db.session.add(user)
+            db.session.flush()
+            strategy = Strategy(name='Imported', user_id=user.id)
+            db.session.add(strategy)
+            db.session.commit()
+
+            started = time.perf_counter()
+            result = import_function(content, strategy, user.id)
+            elapsed = time.perf_counter() - started
+            assert Trade.query.count() == result[0]
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        os.remove(path)
+    return elapsed, result
+
+
+if __name__ == "__main__":
+    round_trips = int(sys.argv[1]) if len(sys.argv) > 1 else ROUND_TRIPS_PER_ACCOUNT
+    content = generate_orders(round_trips)
+    print(f"Orders export: {NUM_ACCOUNTS * round_trips * 2} fills, {len(content) / 1e6:.1f} MB")
+    legacy_seconds, legacy_result = run(legacy_import, content)
+    print(f"ORM path:  {legacy_seconds:7.2f}s  (imported {legacy_result[0]}, skipped {legacy_result[1]})")
+    bulk_seconds, bulk_result = run(bulk_import, content)
+    print(f"Bulk path: {bulk_seconds:7.2f}s  (imported {bulk_result[0]}, skipped {bulk_result[1]})")
+    print(f"Speedup: {legacy_seconds / bulk_seconds:.1f}x")
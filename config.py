@@ -10,9 +10,30 @@ class Config:
         # Use the persistent disk path for the database
         SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
             'sqlite:///' + os.path.join('/var/data', 'app.db')
+        IMPORT_FOLDER = os.environ.get('IMPORT_FOLDER') or os.path.join('/var/data', 'imports')
+        CARD_CACHE_FOLDER = os.environ.get('CARD_CACHE_FOLDER') or os.path.join('/var/data', 'trade_cards')
     else:
         # Use a local path for development
         SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
             'sqlite:///' + os.path.join(basedir, 'instance', 'app.db')
+        IMPORT_FOLDER = os.environ.get('IMPORT_FOLDER') or os.path.join(basedir, 'instance', 'imports')
+        CARD_CACHE_FOLDER = os.environ.get('CARD_CACHE_FOLDER') or os.path.join(basedir, 'instance', 'trade_cards')
             
-    SQLALCHEMY_TRACK_MODIFICATIONS = False 
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Maximum number of points embedded in the statistics equity chart
+    STATS_CHART_MAX_POINTS = int(os.environ.get('STATS_CHART_MAX_POINTS', 1000))
+
+    # Threads running background CSV imports; uploads wait for them in IMPORT_FOLDER
+    IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', 2))
+
+    # A running import that has not reported progress for this many seconds
+    # lost its worker and is queued again, up to IMPORT_MAX_ATTEMPTS runs
+    IMPORT_STALE_AFTER = int(os.environ.get('IMPORT_STALE_AFTER', 600))
+    IMPORT_MAX_ATTEMPTS = int(os.environ.get('IMPORT_MAX_ATTEMPTS', 2))
+
+    # Threads pre-rendering share cards and scaling screenshots, apart from the imports
+    RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', 1))
+
+    # Rendered share cards are evicted least recently used first beyond this size
+    CARD_CACHE_MAX_BYTES = int(os.environ.get('CARD_CACHE_MAX_BYTES', 256 * 1024 * 1024))
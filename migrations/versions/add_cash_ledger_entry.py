@@ -0,0 +1,42 @@
+"""Add CashLedgerEntry table for Tradovate Cash History imports
+
+Revision ID: add_cash_ledger_entry
+Revises: add_import_job
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_cash_ledger_entry'
+down_revision = 'add_import_job'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'cash_ledger_entry',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('account', sa.String(length=100), nullable=False),
+        sa.Column('transaction_id', sa.BigInteger(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('delta', sa.Float(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('change_type', sa.String(length=32), nullable=False),
+        sa.Column('currency', sa.String(length=8), nullable=True),
+        sa.Column('contract', sa.String(length=20), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('cash_ledger_entry', schema=None) as batch_op:
+        batch_op.create_index('idx_cash_user_transaction', ['user_id', 'transaction_id'], unique=True)
+        batch_op.create_index('idx_cash_user_account_date', ['user_id', 'account', 'date', 'change_type', 'delta'], unique=False)
+
+def downgrade():
+    with op.batch_alter_table('cash_ledger_entry', schema=None) as batch_op:
+        batch_op.drop_index('idx_cash_user_account_date')
+        batch_op.drop_index('idx_cash_user_transaction')
+    op.drop_table('cash_ledger_entry')
@@ -0,0 +1,43 @@
+"""Add ImportJob table for background CSV imports
+
+Revision ID: add_import_job
+Revises: add_trade_fingerprint
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_import_job'
+down_revision = 'add_trade_fingerprint'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'import_job',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('filename', sa.String(length=256), nullable=False),
+        sa.Column('path', sa.String(length=512), nullable=False),
+        sa.Column('matching', sa.String(length=16), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('rows_total', sa.Integer(), nullable=False),
+        sa.Column('rows_parsed', sa.Integer(), nullable=False),
+        sa.Column('trades_created', sa.Integer(), nullable=False),
+        sa.Column('duplicates_skipped', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('import_job', schema=None) as batch_op:
+        batch_op.create_index('idx_import_job_user_id', ['user_id'], unique=False)
+
+def downgrade():
+    with op.batch_alter_table('import_job', schema=None) as batch_op:
+        batch_op.drop_index('idx_import_job_user_id')
+    op.drop_table('import_job')
@@ -0,0 +1,27 @@
+"""Add heartbeat and attempts to ImportJob model
+
+Revision ID: add_import_job_heartbeat
+Revises: add_import_job_kind
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_import_job_heartbeat'
+down_revision = 'add_import_job_kind'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table('import_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_index('idx_import_job_status', ['status'], unique=False)
+
+def downgrade():
+    with op.batch_alter_table('import_job', schema=None) as batch_op:
+        batch_op.drop_index('idx_import_job_status')
+        batch_op.drop_column('attempts')
+        batch_op.drop_column('heartbeat_at')
@@ -0,0 +1,23 @@
+"""Add kind to ImportJob model
+
+Revision ID: add_import_job_kind
+Revises: add_trade_screenshot_ready
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_import_job_kind'
+down_revision = 'add_trade_screenshot_ready'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table('import_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('kind', sa.String(length=16), nullable=False, server_default='trades'))
+
+def downgrade():
+    with op.batch_alter_table('import_job', schema=None) as batch_op:
+        batch_op.drop_column('kind')
@@ -0,0 +1,60 @@
+"""Add import manifest and per-contract watermarks
+
+Revision ID: add_import_manifest
+Revises: add_cash_ledger_entry
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_import_manifest'
+down_revision = 'add_cash_ledger_entry'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'import_manifest',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('filename', sa.String(length=256), nullable=False),
+        sa.Column('imported', sa.Integer(), nullable=False),
+        sa.Column('skipped', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('import_manifest', schema=None) as batch_op:
+        batch_op.create_index('idx_import_manifest_user_hash', ['user_id', 'content_hash'], unique=True)
+
+    op.create_table(
+        'import_watermark',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('account', sa.String(length=100), nullable=False),
+        sa.Column('contract', sa.String(length=20), nullable=False),
+        sa.Column('start_at', sa.DateTime(), nullable=False),
+        sa.Column('flat_at', sa.DateTime(), nullable=False),
+        sa.Column('order_ids', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'account', 'contract', name='_user_account_contract_watermark_uc')
+    )
+
+    with op.batch_alter_table('import_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('force', sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch_op.add_column(sa.Column('already_imported', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+def downgrade():
+    with op.batch_alter_table('import_job', schema=None) as batch_op:
+        batch_op.drop_column('already_imported')
+        batch_op.drop_column('force')
+        batch_op.drop_column('content_hash')
+    op.drop_table('import_watermark')
+    with op.batch_alter_table('import_manifest', schema=None) as batch_op:
+        batch_op.drop_index('idx_import_manifest_user_hash')
+    op.drop_table('import_manifest')
@@ -0,0 +1,78 @@
+"""Add import fingerprint to Trade model
+
+Revision ID: add_trade_fingerprint
+Revises: add_trade_fts_index
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+import hashlib
+from alembic import op
+import sqlalchemy as sa
+from app import search
+
+# revision identifiers, used by Alembic.
+revision = 'add_trade_fingerprint'
+down_revision = 'add_trade_fts_index'
+branch_labels = None
+depends_on = None
+
+trade = sa.table(
+    'trade',
+    sa.column('id', sa.Integer),
+    sa.column('user_id', sa.Integer),
+    sa.column('ticker', sa.String),
+    sa.column('account', sa.String),
+    sa.column('entry_date', sa.DateTime),
+    sa.column('exit_date', sa.DateTime),
+    sa.column('position_size', sa.Float),
+    sa.column('fingerprint', sa.String),
+)
+
+
+def fingerprint(user_id, ticker, account, entry_date, exit_date, position_size):
+    # Same formula as Trade.make_fingerprint at the time of this revision
+    parts = (
+        user_id, ticker, account,
+        entry_date.isoformat() if entry_date else '',
+        exit_date.isoformat() if exit_date else '',
+        repr(float(position_size)),
+    )
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def upgrade():
+    # Plain ADD COLUMN rather than batch mode, which would rebuild the table
+    # and drop the FTS triggers on SQLite
+    op.add_column('trade', sa.Column('fingerprint', sa.String(length=40), nullable=True))
+
+    # Backfill; later copies of an identical trade keep a NULL fingerprint
+    bind = op.get_bind()
+    seen = set()
+    updates = []
+    rows = bind.execute(sa.select(
+        trade.c.id, trade.c.user_id, trade.c.ticker, trade.c.account,
+        trade.c.entry_date, trade.c.exit_date, trade.c.position_size,
+    ).order_by(trade.c.id))
+    for id, *fields in rows:
+        value = fingerprint(*fields)
+        key = (fields[0], value)
+        if key in seen:
+            continue
+        seen.add(key)
+        updates.append({'trade_id': id, 'value': value})
+    if updates:
+        bind.execute(
+            trade.update().where(trade.c.id == sa.bindparam('trade_id')).values(fingerprint=sa.bindparam('value')),
+            updates,
+        )
+
+    op.create_index('idx_trade_user_fingerprint', 'trade', ['user_id', 'fingerprint'], unique=True)
+
+
+def downgrade():
+    op.drop_index('idx_trade_user_fingerprint', table_name='trade')
+    with op.batch_alter_table('trade', schema=None) as batch_op:
+        batch_op.drop_column('fingerprint')
+    # Rebuilding the table in batch mode dropped the FTS triggers
+    if op.get_bind().dialect.name == 'sqlite':
+        search.create_index(op.get_bind())
@@ -0,0 +1,25 @@
+"""Add FTS5 search index over trade ticker and notes
+
+Revision ID: add_trade_fts_index
+Revises: add_user_trade_data_version
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app import search
+
+# revision identifiers, used by Alembic.
+revision = 'add_trade_fts_index'
+down_revision = 'add_user_trade_data_version'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # FTS5 is SQLite-only; other databases keep searching with LIKE
+    if op.get_bind().dialect.name == 'sqlite':
+        search.create_index(op.get_bind())
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        search.drop_index(op.get_bind())
@@ -0,0 +1,28 @@
+"""Add screenshot_ready to Trade model
+
+Revision ID: add_trade_screenshot_ready
+Revises: add_import_manifest
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app import search
+
+# revision identifiers, used by Alembic.
+revision = 'add_trade_screenshot_ready'
+down_revision = 'add_import_manifest'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Plain ADD COLUMN rather than batch mode, which would rebuild the table
+    # and drop the FTS triggers on SQLite
+    op.add_column('trade', sa.Column('screenshot_ready', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+def downgrade():
+    with op.batch_alter_table('trade', schema=None) as batch_op:
+        batch_op.drop_column('screenshot_ready')
+    # Rebuilding the table in batch mode dropped the FTS triggers
+    if op.get_bind().dialect.name == 'sqlite':
+        search.create_index(op.get_bind())
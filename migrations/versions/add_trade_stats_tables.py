@@ -0,0 +1,64 @@
+"""Add incrementally maintained trade statistics tables
+
+Revision ID: add_trade_stats_tables
+Revises: 7636c2f0f036
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_trade_stats_tables'
+down_revision = '7636c2f0f036'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Rows are built lazily from existing trades on each user's first statistics view
+    op.create_table(
+        'trade_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('account', sa.String(length=100), nullable=False),
+        sa.Column('trade_count', sa.Integer(), nullable=False),
+        sa.Column('win_count', sa.Integer(), nullable=False),
+        sa.Column('loss_count', sa.Integer(), nullable=False),
+        sa.Column('breakeven_count', sa.Integer(), nullable=False),
+        sa.Column('total_pnl', sa.Float(), nullable=False),
+        sa.Column('gross_profit', sa.Float(), nullable=False),
+        sa.Column('gross_loss', sa.Float(), nullable=False),
+        sa.Column('largest_win', sa.Float(), nullable=True),
+        sa.Column('largest_loss', sa.Float(), nullable=True),
+        sa.Column('extremes_stale', sa.Boolean(), nullable=False),
+        sa.Column('closed_count', sa.Integer(), nullable=False),
+        sa.Column('holding_seconds', sa.Float(), nullable=False),
+        sa.Column('long_count', sa.Integer(), nullable=False),
+        sa.Column('long_wins', sa.Integer(), nullable=False),
+        sa.Column('long_losses', sa.Integer(), nullable=False),
+        sa.Column('long_be', sa.Integer(), nullable=False),
+        sa.Column('short_count', sa.Integer(), nullable=False),
+        sa.Column('short_wins', sa.Integer(), nullable=False),
+        sa.Column('short_losses', sa.Integer(), nullable=False),
+        sa.Column('short_be', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'account', name='_user_account_stats_uc')
+    )
+    op.create_table(
+        'trade_stat_bucket',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('account', sa.String(length=100), nullable=False),
+        sa.Column('kind', sa.String(length=16), nullable=False),
+        sa.Column('key', sa.String(length=100), nullable=False),
+        sa.Column('trade_count', sa.Integer(), nullable=False),
+        sa.Column('pnl', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'account', 'kind', 'key', name='_user_stat_bucket_uc')
+    )
+
+def downgrade():
+    op.drop_table('trade_stat_bucket')
+    op.drop_table('trade_stats')
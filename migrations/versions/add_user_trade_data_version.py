@@ -0,0 +1,23 @@
+"""Add trade_data_version to User model
+
+Revision ID: add_user_trade_data_version
+Revises: add_trade_stats_tables
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_user_trade_data_version'
+down_revision = 'add_trade_stats_tables'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('trade_data_version', sa.Integer(), nullable=False, server_default='0'))
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('trade_data_version')
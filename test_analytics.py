@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized analytics kernels (app/analytics.py) and the
+chart downsampling (app/charts.py)
+"""
+
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from app import analytics, charts
+
+
+def frame(pnls):
+    """A TradeFrame with one trade per day, closed in order."""
+    start = datetime(2025, 7, 1)
+    return analytics.TradeFrame([
+        (pnl, start + timedelta(days=i), start + timedelta(days=i), 'Long', 'MNQU5', 1, 'A')
+        for i, pnl in enumerate(pnls)
+    ])
+
+
+def test_drawdown_profile():
+    # Equity 100, 50, -50, 150, 140: the deepest drawdown is -150 from the peak of 100
+    trades = frame([100, -50, -100, 200, -10])
+    profile = analytics.drawdown_profile(trades)
+    assert profile['max_drawdown'] == -150
+    assert profile['max_drawdown_pct'] is None
+    assert profile['drawdown_duration_days'] == 2
+    assert profile['time_to_recovery_days'] == 1
+    assert profile['longest_drawdown_days'] == 3
+    # Relative to the balance at that peak, not the largest ratio anywhere in the series
+    assert analytics.drawdown_profile(trades, 1000)['max_drawdown_pct'] == pytest.approx(-150 / 1100 * 100)
+    assert analytics.drawdown_profile(trades, 0)['max_drawdown_pct'] is None
+
+
+def test_drawdown_profile_from_the_start():
+    """Losing from the first trade is measured against the starting balance and never recovers"""
+    profile = analytics.drawdown_profile(frame([-100, -50]), 1000)
+    assert profile['max_drawdown'] == -150
+    assert profile['max_drawdown_pct'] == pytest.approx(-15.0)
+    assert profile['time_to_recovery_days'] is None
+    assert analytics.drawdown_profile(frame([10, 20]), 1000)['max_drawdown'] == 0.0
+    assert analytics.drawdown_profile(frame([]))['max_drawdown'] == 0.0
+
+
+def test_streaks():
+    # Open trades (NaN) are skipped; breakeven ends a streak
+    pnl = np.array([1, 2, -1, np.nan, -2, -3, 0, 5], dtype=float)
+    assert analytics.streaks(pnl) == (2, 3, 1)
+    assert analytics.streaks(np.array([4, -1, -1], dtype=float)) == (1, 2, -2)
+    assert analytics.streaks(np.array([], dtype=float)) == (0, 0, 0)
+
+
+def test_rolling_win_rate():
+    pnl = np.array([1, -1, np.nan, 1, 1], dtype=float)
+    assert analytics.rolling_win_rate(pnl, window=2).tolist() == [100, 50, 50, 100]
+    assert analytics.rolling_win_rate(pnl, window=20).tolist() == pytest.approx([100, 50, 200 / 3, 75])
+
+
+def test_lttb_keeps_ends_and_extremes():
+    xs = list(range(100))
+    ys = [0.0] * 100
+    ys[37], ys[71] = 50.0, -40.0
+    kept = charts.lttb(xs, ys, 10)
+    assert len(kept) == 10 and kept == sorted(kept)
+    assert kept[0] == 0 and kept[-1] == 99
+    assert 37 in kept and 71 in kept
+    assert charts.lttb(xs[:5], ys[:5], 10) == [0, 1, 2, 3, 4]
+
+
+if __name__ == "__main__":
+    test_drawdown_profile()
+    test_drawdown_profile_from_the_start()
+    test_streaks()
+    test_rolling_win_rate()
+    test_lttb_keeps_ends_and_extremes()
+    print("Analytics tests passed")
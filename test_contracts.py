@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Tests for futures symbol parsing and contract specs (app/contracts.py)
+"""
+
+from datetime import datetime
+from app import contracts
+from app.models import Trade
+
+
+def test_parse_symbol():
+    """Month codes other than U are recognised, with one- or two-digit years"""
+    decade = datetime.now().year // 10 * 10
+    assert contracts.parse_symbol('MNQU5') == ('MNQ', 9, decade + 5)
+    assert contracts.parse_symbol('MNQZ5') == ('MNQ', 12, decade + 5)
+    assert contracts.parse_symbol('ESZ24') == ('ES', 12, 2024)
+    assert contracts.parse_symbol('m2kh6') == ('M2K', 3, decade + 6)
+    assert contracts.parse_symbol('MNQ') == ('MNQ', None, None)
+    assert contracts.parse_symbol('GC') == ('GC', None, None)
+
+
+def test_spec_for():
+    spec = contracts.spec_for('MNQZ5')
+    assert (spec.root, spec.point_value, spec.tick_size) == ('MNQ', 2, 0.25)
+    assert contracts.point_value('ESZ24') == 50
+    assert contracts.point_value('CLF6') == 1000
+    # Unknown contracts fall back to one dollar per point
+    assert contracts.point_value('XYZ') == contracts.DEFAULT_POINT_VALUE
+
+
+def test_trade_pnl_uses_contract_root():
+    trade = Trade(ticker='MNQZ5', direction='Short', entry_price=21010.0, exit_price=21000.0,
+                  position_size=2, entry_date=datetime(2025, 7, 1, 10), exit_date=datetime(2025, 7, 1, 11))
+    assert trade.calculate_pnl == 40.0
+
+
+if __name__ == "__main__":
+    test_parse_symbol()
+    test_spec_for()
+    test_trade_pnl_uses_contract_root()
+    print("Contract spec tests passed")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-process filter facet cache (app/facets.py), keyed by the
+user's trade data version
+"""
+
+from datetime import datetime
+from sqlalchemy import event
+from config import Config
+from app import create_app, db, facets
+from app.models import User, Trade, Strategy, Tag
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    TESTING = True
+
+
+def cached_facets(user):
+    """(facets, number of SQL statements get_facets ran) once the user row is loaded."""
+    user.trade_data_version
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        return facets.get_facets(user), len(statements)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def names(items):
+    return [item.name for item in items]
+
+
+def test_writes_invalidate_cached_facets():
+    facets._cache.clear()
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(username='trader')
+        strategy = Strategy(name='Breakout', user=user)
+        tag = Tag(name='a+', user=user)
+        db.session.add(Trade(ticker='MNQU5', account='A', entry_date=datetime(2025, 7, 1), entry_price=1.0,
+                             position_size=1, direction='Long', strategy=strategy, trader=user, tags=[tag]))
+        db.session.commit()
+
+        first, queries = cached_facets(user)
+        assert queries > 0 and first.symbols == ['MNQU5']
+        assert names(first.strategies) == ['Breakout'] and first.tags[0].count == 1
+        # A hit runs no query
+        assert cached_facets(user) == (first, 0)
+
+        version = user.trade_data_version
+        db.session.add(Strategy(name='Fade', user=user))
+        db.session.commit()
+        assert user.trade_data_version > version
+        result, queries = cached_facets(user)
+        assert queries > 0 and names(result.strategies) == ['Breakout', 'Fade']
+
+        for obj, name in ((strategy, 'Opening drive'), (tag, 'b')):
+            version = user.trade_data_version
+            obj.name = name
+            db.session.commit()
+            assert user.trade_data_version > version
+        result, _ = cached_facets(user)
+        assert names(result.strategies) == ['Fade', 'Opening drive'] and names(result.tags) == ['b']
+
+        db.session.add(Tag(name='c', user=user))
+        db.session.commit()
+        assert names(cached_facets(user)[0].tags) == ['b', 'c']
+
+
+if __name__ == "__main__":
+    test_writes_invalidate_cached_facets()
+    print("Facet cache test passed")
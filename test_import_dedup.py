@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for de-duplicating imported trades by Trade.fingerprint
+(app/importer.py)
+"""
+
+import csv
+import io
+import os
+from contextlib import contextmanager
+import pytest
+from sqlalchemy.exc import IntegrityError
+from config import Config
+from app import create_app, db, importer
+from app.models import User, Trade
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    TESTING = True
+
+
+@contextmanager
+def new_user():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(username='trader')
+        db.session.add(user)
+        db.session.commit()
+        yield user
+
+
+def import_bytes(user, content, filename='Orders.csv', **kwargs):
+    result = importer.import_csv_stream(io.BytesIO(content), user.id, filename, **kwargs)
+    db.session.commit()
+    return result
+
+
+def test_reimport_skips_every_trade():
+    with new_user() as user:
+        with open(os.path.join(HERE, 'Orders.csv'), 'rb') as file:
+            content = file.read()
+        imported, skipped = import_bytes(user, content)
+        assert imported > 0
+        # Forced past the watermarks, every matched trade is recognised by its fingerprint
+        assert import_bytes(user, content, force=True) == (0, imported)
+        assert Trade.query.count() == imported
+
+
+def test_repeats_within_a_file():
+    with new_user() as user:
+        content = (
+            'Symbol,Side,Quantity,Price,Date\n'
+            'MNQU5,Buy,1,21000,2025-07-01\n'
+            'MNQU5,Buy,1,21000,2025-07-01\n'
+            'MNQU5,Buy,2,21000,2025-07-01\n'
+        ).encode('utf-8')
+        assert import_bytes(user, content, 'trades.csv') == (2, 1)
+
+
+def test_identical_trades_in_two_accounts():
+    with new_user() as user:
+        with open(os.path.join(HERE, 'Orders.csv'), newline='') as file:
+            reader = csv.DictReader(file)
+            fieldnames = reader.fieldnames
+            rows = [row for row in reader if row['Contract'] == 'MNQU5' and row['Account'] == 'TAKEPROFIT6215418']
+        copies = [dict(row, Account='TAKEPROFIT6215419') for row in rows]
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows + copies)
+        imported, skipped = import_bytes(user, out.getvalue().encode('utf-8'))
+        assert skipped == 0 and imported % 2 == 0
+        accounts = ('TAKEPROFIT6215418', 'TAKEPROFIT6215419')
+        counts = [Trade.query.filter_by(account=account).count() for account in accounts]
+        assert counts == [imported // 2, imported // 2]
+
+
+def test_unique_index_rejects_a_concurrent_duplicate():
+    with new_user() as user:
+        content = b'Symbol,Side,Quantity,Price,Date\nMNQU5,Buy,1,21000,2025-07-01\n'
+        import_bytes(user, content, 'trades.csv')
+        trade = Trade.query.one()
+        row = {column: getattr(trade, column) for column in (
+            'ticker', 'account', 'direction', 'position_size', 'entry_price', 'entry_date', 'pnl', 'notes', 'fingerprint')}
+        # Another import inserting the same trade after this one's _dedupe() ran
+        with pytest.raises(IntegrityError):
+            importer.insert_trades([row], user.id, trade.strategy_id)
+        db.session.rollback()
+
+
+if __name__ == "__main__":
+    test_reimport_skips_every_trade()
+    test_repeats_within_a_file()
+    test_identical_trades_in_two_accounts()
+    test_unique_index_rejects_a_concurrent_duplicate()
+    print("Import de-duplication tests passed")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for the database-backed import queue: claiming queued jobs and
+recovering the ones a stopped worker left running (app/tasks.py)
+"""
+
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from config import Config
+from app import create_app, db, tasks
+from app.models import User, Trade, ImportJob
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    TESTING = True
+
+
+def staged_job(folder, user, name, **kwargs):
+    path = os.path.join(folder, name)
+    shutil.copy(os.path.join(HERE, 'Orders.csv'), path)
+    job = ImportJob(user_id=user.id, filename='Orders.csv', path=path, **kwargs)
+    db.session.add(job)
+    return job
+
+
+def test_stale_jobs_are_requeued_then_failed():
+    folder = tempfile.mkdtemp()
+    app = create_app(TestConfig)
+    try:
+        with app.app_context():
+            db.create_all()
+            user = User(username='trader')
+            db.session.add(user)
+            db.session.commit()
+            long_ago = datetime.utcnow() - timedelta(seconds=app.config['IMPORT_STALE_AFTER'] + 60)
+            retried = staged_job(folder, user, 'retried.csv', status=ImportJob.RUNNING, attempts=1,
+                                 started_at=long_ago, heartbeat_at=long_ago)
+            exhausted = staged_job(folder, user, 'exhausted.csv', status=ImportJob.RUNNING,
+                                   attempts=app.config['IMPORT_MAX_ATTEMPTS'], started_at=long_ago)
+            running = staged_job(folder, user, 'running.csv', status=ImportJob.RUNNING, attempts=1,
+                                 started_at=long_ago, heartbeat_at=datetime.utcnow())
+            db.session.commit()
+            assert tasks.stale(retried) and not tasks.stale(running)
+
+            assert tasks.recover_stale_jobs() == 1
+            db.session.expire_all()
+            assert retried.status == ImportJob.QUEUED
+            assert exhausted.status == ImportJob.FAILED and not os.path.exists(exhausted.path)
+            assert running.status == ImportJob.RUNNING
+
+            tasks.run_queued(app)
+            db.session.expire_all()
+            assert retried.status == ImportJob.DONE and retried.attempts == 2
+            assert retried.trades_created == Trade.query.count() > 0
+            assert not os.path.exists(retried.path)
+            # A job that is no longer queued cannot be claimed again
+            assert not tasks._claim(retried.id)
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_failed_job_error_is_readable():
+    folder = tempfile.mkdtemp()
+    app = create_app(TestConfig)
+    try:
+        with app.app_context():
+            db.create_all()
+            user = User(username='trader')
+            db.session.add(user)
+            db.session.commit()
+            path = os.path.join(folder, 'latin1.csv')
+            with open(path, 'wb') as file:
+                file.write('Symbol,Notes\nMNQU5,café\n'.encode('latin-1'))
+            job = ImportJob(user_id=user.id, filename='latin1.csv', path=path)
+            db.session.add(job)
+            db.session.commit()
+            tasks.run_queued(app)
+            db.session.expire_all()
+            assert job.status == ImportJob.FAILED
+            assert job.error == 'the file is not UTF-8 text. Export it again as CSV.'
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    test_stale_jobs_are_requeued_then_failed()
+    test_failed_job_error_is_readable()
+    print("Import job tests passed")
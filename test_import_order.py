@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for importing Tradovate exports whose fills are not oldest first
+(app/importer.py): without a progress callback the streamed import is
+rolled back to its savepoint and read again buffered; with one, a first
+pass checks the order before anything is committed
+"""
+
+import csv
+import io
+import os
+from datetime import datetime
+from config import Config
+from app import create_app, db, importer
+from app.models import User, Trade
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    TESTING = True
+
+
+def orders_csv(rows, fieldnames):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue().encode('utf-8')
+
+
+def journal(user):
+    return sorted(
+        (t.ticker, t.account, t.entry_date, t.exit_date, t.position_size, round(t.pnl, 6))
+        for t in Trade.query.filter_by(user_id=user.id)
+    )
+
+
+def test_out_of_order_fills_match_the_sorted_file():
+    with open(os.path.join(HERE, 'Orders.csv'), newline='') as file:
+        reader = csv.DictReader(file)
+        fieldnames = reader.fieldnames
+        rows = sorted(reader, key=lambda row: datetime.strptime(row['Fill Time'] or row['Timestamp'], '%m/%d/%Y %H:%M:%S'))
+    # One contract's fills newest first, everything else in order
+    shard = (rows[0]['Account'], rows[0]['Contract'])
+    positions = [i for i, row in enumerate(rows) if (row['Account'], row['Contract']) == shard]
+    shuffled = list(rows)
+    for position, row in zip(positions, reversed([rows[i] for i in positions])):
+        shuffled[position] = row
+    sorted_content, shuffled_content = orders_csv(rows, fieldnames), orders_csv(shuffled, fieldnames)
+    assert not importer.fills_in_order(csv.DictReader(io.StringIO(shuffled_content.decode('utf-8'))))
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        users = [User(username=name) for name in ('sorted', 'streamed', 'committed')]
+        db.session.add_all(users)
+        db.session.commit()
+        expected, streamed, committed = users
+
+        importer.import_csv_stream(io.BytesIO(sorted_content), expected.id, 'Orders.csv')
+        # No callback: the streamed attempt is rolled back and the file read again buffered
+        importer.import_csv_stream(io.BytesIO(shuffled_content), streamed.id, 'Orders.csv')
+        # A callback that commits each batch: the first pass sends it straight to the buffered import
+        reports = []
+
+        def progress(rows_read, imported, skipped):
+            reports.append((rows_read, imported, skipped))
+            db.session.commit()
+
+        imported, skipped = importer.import_csv_stream(
+            io.BytesIO(shuffled_content), committed.id, 'Orders.csv', progress=progress
+        )
+        db.session.commit()
+
+        assert journal(expected)
+        assert journal(streamed) == journal(expected)
+        assert journal(committed) == journal(expected)
+        assert (imported, skipped) == (len(journal(expected)), 0)
+        assert reports and reports[-1][1:] == (imported, skipped)
+
+
+if __name__ == "__main__":
+    test_out_of_order_fills_match_the_sorted_file()
+    print("Out-of-order import test passed")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for import watermarks: overlapping Tradovate exports only match the
+fills after what an earlier import covered (app/importer.py)
+"""
+
+import csv
+import io
+import os
+from datetime import datetime
+from config import Config
+from app import create_app, db, importer
+from app.models import User, Trade, ImportWatermark, ImportManifest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    TESTING = True
+
+
+def orders_csv(rows, fieldnames):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue().encode('utf-8')
+
+
+def import_bytes(user, content, **kwargs):
+    result = importer.import_csv_stream(io.BytesIO(content), user.id, 'Orders.csv', **kwargs)
+    db.session.commit()
+    return result
+
+
+def journal(user):
+    return sorted(
+        (t.ticker, t.account, t.entry_date, t.exit_date, t.position_size, round(t.pnl, 6))
+        for t in Trade.query.filter_by(user_id=user.id)
+    )
+
+
+def test_overlapping_exports_match_one_full_import():
+    """Importing two overlapping halves gives the same trades as the whole file"""
+    with open(os.path.join(HERE, 'Orders.csv'), newline='') as file:
+        reader = csv.DictReader(file)
+        fieldnames = reader.fieldnames
+        # Unfilled orders have no fill time
+        rows = sorted(reader, key=lambda row: datetime.strptime(row['Fill Time'] or row['Timestamp'], '%m/%d/%Y %H:%M:%S'))
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        whole, halves = User(username='whole'), User(username='halves')
+        db.session.add_all([whole, halves])
+        db.session.commit()
+
+        import_bytes(whole, orders_csv(rows, fieldnames))
+        import_bytes(halves, orders_csv(rows[:len(rows) * 2 // 3], fieldnames))
+        assert ImportWatermark.query.filter_by(user_id=halves.id).count() > 0
+        # The second half overlaps the first and is listed newest first
+        imported, skipped = import_bytes(halves, orders_csv(rows[len(rows) // 3:][::-1], fieldnames))
+        assert imported > 0 and skipped == 0
+        assert journal(halves) == journal(whole)
+
+        # Everything is covered now, so nothing is matched again unless forced
+        assert import_bytes(halves, orders_csv(rows, fieldnames)) == (0, 0)
+        imported, skipped = import_bytes(halves, orders_csv(rows, fieldnames), force=True)
+        assert imported == 0 and skipped == len(journal(whole))
+
+
+def test_deleted_trades_are_imported_again():
+    """Deleting a trade forgets its contract's watermark and the manifest, so a re-import restores it"""
+    with open(os.path.join(HERE, 'Orders.csv'), 'rb') as file:
+        content = file.read()
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(username='trader')
+        db.session.add(user)
+        db.session.commit()
+        import_bytes(user, content)
+        db.session.add(ImportManifest(user_id=user.id, content_hash='0' * 64, filename='Orders.csv', imported=1))
+        db.session.commit()
+        before = journal(user)
+        shards = {(w.account, w.contract) for w in ImportWatermark.query.filter_by(user_id=user.id)}
+
+        trade = Trade.query.filter_by(user_id=user.id).first()
+        shard = (trade.account, trade.ticker)
+        db.session.delete(trade)
+        db.session.commit()
+        assert ImportManifest.query.filter_by(user_id=user.id).count() == 0
+        assert {(w.account, w.contract) for w in ImportWatermark.query.filter_by(user_id=user.id)} == shards - {shard}
+        imported, _ = import_bytes(user, content)
+        assert imported == 1 and journal(user) == before
+
+        importer.forget_imports(user.id)
+        db.session.commit()
+        assert ImportWatermark.query.filter_by(user_id=user.id).count() == 0
+
+
+if __name__ == "__main__":
+    test_overlapping_exports_match_one_full_import()
+    test_deleted_trades_are_imported_again()
+    print("Import watermark tests passed")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for the order-to-trade position ledger (app/ledger.py)
+"""
+
+import csv
+import os
+from datetime import datetime, timedelta
+from app.ledger import PositionLedger, AVERAGE, FIFO
+from app import importer
+from app.importer import parse_tradovate_orders
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+T0 = datetime(2025, 7, 1, 9, 30)
+
+
+def run_fills(mode, fills):
+    """Closes produced by (side, qty, price) fills one minute apart."""
+    ledger = PositionLedger(mode)
+    closes = []
+    for i, (side, qty, price) in enumerate(fills):
+        closes += ledger.fill(side, qty, price, T0 + timedelta(minutes=i))
+    return ledger, closes
+
+
+def gross(closes):
+    return sum(
+        (c.exit_price - c.entry_price if c.direction == 'Long' else c.entry_price - c.exit_price) * c.qty
+        for c in closes
+    )
+
+
+def test_average_cost_after_partial_close():
+    """Adding to a partly closed position averages only the contracts still open"""
+    ledger, closes = run_fills(AVERAGE, [('Buy', 2, 100), ('Sell', 1, 110), ('Buy', 1, 120), ('Sell', 2, 130)])
+    assert [(c.qty, c.entry_price) for c in closes] == [(1, 100), (2, 110)]
+    # Both trades belong to the position opened by the first fill
+    assert all(c.entry_time == T0 for c in closes)
+    assert ledger.quantity == 0 and ledger.notional == 0
+
+
+def test_fifo_lots():
+    """FIFO closes the oldest lots first, one trade per lot"""
+    ledger, closes = run_fills(FIFO, [('Buy', 2, 100), ('Sell', 1, 110), ('Buy', 1, 120), ('Sell', 2, 130)])
+    assert [(c.qty, c.entry_price, c.entry_time) for c in closes] == [
+        (1, 100, T0), (1, 100, T0), (1, 120, T0 + timedelta(minutes=2)),
+    ]
+    assert not ledger.lots
+
+
+def test_reversal_opens_opposite_position():
+    """A fill larger than the position closes it and opens the other side"""
+    ledger, closes = run_fills(AVERAGE, [('Buy', 1, 100), ('Sell', 3, 90)])
+    assert [(c.direction, c.qty, c.entry_price) for c in closes] == [('Long', 1, 100)]
+    assert ledger.direction == 'Short'
+    assert ledger.quantity == -2 and ledger.average_price == 90
+    assert ledger.opened_at == T0 + timedelta(minutes=1)
+
+
+def check_export(filename):
+    """Both modes close every contract and realize the same gross PnL on a real export"""
+    with open(os.path.join(HERE, filename), newline='') as file:
+        shards = parse_tradovate_orders(csv.DictReader(file))
+    assert shards
+    for (account, symbol), orders in shards.items():
+        fills = [(o['side'], o['quantity'], o['price']) for o in sorted(orders, key=lambda o: o['datetime'])]
+        average_ledger, average_closes = run_fills(AVERAGE, fills)
+        fifo_ledger, fifo_closes = run_fills(FIFO, fills)
+        bought = sum(qty for side, qty, _ in fills if side == 'Buy')
+        sold = sum(qty for side, qty, _ in fills if side == 'Sell')
+        closed = sum(c.qty for c in average_closes)
+        print(f"{filename} {account} {symbol}: {len(fills)} fills, {len(average_closes)} average / {len(fifo_closes)} FIFO trades")
+        assert closed == sum(c.qty for c in fifo_closes)
+        assert closed == (bought + sold - abs(average_ledger.quantity)) / 2
+        assert average_ledger.quantity == fifo_ledger.quantity
+        if average_ledger.quantity == 0:
+            assert abs(gross(average_closes) - gross(fifo_closes)) < 1e-6
+
+
+def test_orders_csv():
+    check_export('Orders.csv')
+
+
+def test_simulated_trades_csv():
+    check_export('simulated_trades.csv')
+
+
+def test_parallel_matching_matches_serial():
+    """Shards matched across processes come back identical and in the same order"""
+    with open(os.path.join(HERE, 'simulated_trades.csv'), newline='') as file:
+        shards = parse_tradovate_orders(csv.DictReader(file))
+    assert len(shards) > 1
+    serial = importer.match_shards(shards, FIFO)
+    saved = importer.PARALLEL_MATCH_MIN_FILLS, importer.MATCH_PROCESSES
+    importer.PARALLEL_MATCH_MIN_FILLS, importer.MATCH_PROCESSES = 0, 2
+    try:
+        parallel = importer.match_shards(shards, FIFO)
+    finally:
+        importer.PARALLEL_MATCH_MIN_FILLS, importer.MATCH_PROCESSES = saved
+    assert parallel == serial
+
+
+if __name__ == "__main__":
+    test_average_cost_after_partial_close()
+    test_fifo_lots()
+    test_reversal_opens_opposite_position()
+    test_orders_csv()
+    test_simulated_trades_csv()
+    test_parallel_matching_matches_serial()
+    print("All ledger tests passed")
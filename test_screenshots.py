@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for background screenshot scaling (app/screenshots.py)
+"""
+
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from PIL import Image
+from config import Config
+from app import create_app, db, screenshots, tasks
+from app.models import User, Trade, Strategy
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    TESTING = True
+
+
+def test_variants_fit_their_sizes():
+    """A large JPEG and a transparent PNG both get every size as WebP"""
+    folder = tempfile.mkdtemp()
+    try:
+        os.makedirs(os.path.join(folder, '1', '1'))
+        Image.new('RGB', (3840, 2160), 'navy').save(os.path.join(folder, '1', '1', 'screenshot.jpg'))
+        Image.new('RGBA', (100, 40), (255, 0, 0, 128)).save(os.path.join(folder, '1', '1', 'small.png'))
+        screenshots.make_variants(folder, '1/1/screenshot.jpg')
+        for size, (width, height) in screenshots.SIZES.items():
+            with Image.open(os.path.join(folder, screenshots.variant('1/1/screenshot.jpg', size))) as img:
+                assert img.format == 'WEBP'
+                assert img.width == width and abs(img.height - width * 9 / 16) <= 1
+        screenshots.make_variants(folder, '1/1/small.png')
+        # Never enlarged, and the alpha channel survives
+        with Image.open(os.path.join(folder, '1', '1', 'preview.webp')) as img:
+            assert img.size == (100, 40) and img.mode == 'RGBA'
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_legacy_thumbnail_until_ready():
+    """Uploads from before the scaled copies keep their thumbnail, unless it belongs to an older upload"""
+    folder = tempfile.mkdtemp()
+    try:
+        os.makedirs(os.path.join(folder, '1', '1'))
+        original = os.path.join(folder, '1', '1', 'screenshot.png')
+        thumb = os.path.join(folder, '1', '1', 'thumb.png')
+        Image.new('RGB', (2000, 1000), 'white').save(original)
+        Image.new('RGB', (150, 75), 'white').save(thumb)
+        trade = Trade(screenshot='1/1/screenshot.png', screenshot_ready=False)
+        assert screenshots.best_available(folder, trade, 'thumb') == '1/1/thumb.png'
+        assert screenshots.best_available(folder, trade, 'inset') == '1/1/thumb.png'
+        assert screenshots.best_available(folder, trade, 'preview') == '1/1/screenshot.png'
+
+        os.utime(thumb, ns=(0, 0))
+        assert screenshots.best_available(folder, trade, 'thumb') == '1/1/screenshot.png'
+        trade.screenshot_ready = True
+        assert screenshots.best_available(folder, trade, 'thumb') == '1/1/thumb.webp'
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_trade_is_marked_ready():
+    folder = tempfile.mkdtemp()
+    app = create_app(TestConfig)
+    app.config['CARD_CACHE_FOLDER'] = os.path.join(folder, 'cards')
+    try:
+        with app.app_context():
+            db.create_all()
+            user = User(username='trader')
+            trade = Trade(ticker='MNQU5', direction='Long', entry_price=21000.0, exit_price=21010.0,
+                          position_size=1, pnl=20.0, entry_date=datetime(2025, 7, 1, 10),
+                          exit_date=datetime(2025, 7, 1, 11), trader=user,
+                          strategy=Strategy(name='Breakout', user=user), screenshot='1/1/screenshot.png')
+            db.session.add_all([user, trade])
+            db.session.commit()
+            os.makedirs(os.path.join(folder, '1', '1'))
+            Image.new('RGB', (2000, 1000), 'white').save(os.path.join(folder, '1', '1', 'screenshot.png'))
+            assert not trade.screenshot_ready
+
+            tasks.process_screenshot(app, trade.id, folder)
+            db.session.refresh(trade)
+            assert trade.screenshot_ready
+            assert os.path.exists(os.path.join(folder, '1', '1', 'inset.webp'))
+            # The card was pre-rendered with the inset
+            assert len(os.listdir(app.config['CARD_CACHE_FOLDER'])) == 2
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    test_variants_fit_their_sizes()
+    test_legacy_thumbnail_until_ready()
+    test_trade_is_marked_ready()
+    print("Screenshot tests passed")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tests for trade search (app/search.py): the FTS5 index kept in sync by
+its triggers, ranked suggestions, substring ticker matches and the LIKE
+fallback
+"""
+
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from flask_migrate import upgrade
+from sqlalchemy import inspect
+from config import Config
+from app import create_app, db, search
+from app.models import User, Trade, Strategy
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    TESTING = True
+
+
+def add_trades(user):
+    strategy = Strategy(name='Breakout', user=user)
+    start = datetime(2025, 7, 1, 9)
+    for i, (ticker, notes) in enumerate([
+        ('MNQU5', 'breakout retest, second breakout held'),
+        ('ESU5', 'failed breakout'),
+        ('NQZ5', 'scalp'),
+        ('CLQ5', None),
+    ]):
+        db.session.add(Trade(ticker=ticker, notes=notes, entry_date=start + timedelta(hours=i), entry_price=1.0,
+                             position_size=1, direction='Long', strategy=strategy, trader=user))
+    db.session.commit()
+
+
+def matching(search_query):
+    return sorted(t.ticker for t in Trade.query.filter(search.search_condition(search_query)))
+
+
+def ranked(user, search_query):
+    return [result['ticker'] for result in search.ranked_matches(user.id, search_query)]
+
+
+def test_index_stays_in_sync():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as connection:
+            search.create_index(connection)
+        assert search.fts_enabled()
+        user = User(username='trader')
+        add_trades(user)
+
+        # Ranked by bm25, and tickers match by substring, not only by word prefix
+        assert ranked(user, 'breakout') == ['MNQU5', 'ESU5']
+        assert matching('NQ') == ['MNQU5', 'NQZ5']
+        assert ranked(user, 'nq') == ['NQZ5', 'MNQU5']
+        assert matching('scal') == ['NQZ5']
+        assert matching('"') == []
+
+        # Update and delete, through the ORM and in bulk
+        trade = Trade.query.filter_by(ticker='CLQ5').one()
+        trade.notes = 'breakout on inventory'
+        db.session.commit()
+        assert matching('inventory') == ['CLQ5']
+        Trade.query.filter_by(ticker='NQZ5').update({'notes': 'fade'})
+        db.session.commit()
+        assert matching('scalp') == [] and matching('fade') == ['NQZ5']
+        db.session.delete(Trade.query.filter_by(ticker='ESU5').one())
+        db.session.commit()
+        assert ranked(user, 'breakout') == ['MNQU5', 'CLQ5']
+        assert matching('failed') == []
+
+
+def test_like_fallback():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        assert not search.fts_enabled()
+        user = User(username='trader')
+        add_trades(user)
+        assert matching('reak') == ['ESU5', 'MNQU5']
+        assert matching('NQ') == ['MNQU5', 'NQZ5']
+        # Newest first without a relevance ranking
+        assert ranked(user, 'breakout') == ['ESU5', 'MNQU5']
+
+
+def test_api_search_limit():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as connection:
+            search.create_index(connection)
+        user = User(username='trader')
+        add_trades(user)
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+            session['_fresh'] = True
+        results = client.get('/api/search?q=breakout').get_json()['results']
+        assert [result['ticker'] for result in results] == ['MNQU5', 'ESU5']
+        assert results[0]['url'].endswith(f'/edit_trade/{results[0]["id"]}')
+        # A negative LIMIT would mean no limit on SQLite
+        for limit in (-1, 0):
+            assert len(client.get(f'/api/search?q=breakout&limit={limit}').get_json()['results']) == 1
+
+
+def test_migrations_create_index():
+    folder = tempfile.mkdtemp()
+
+    class MigratedConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(folder, 'app.db')
+
+    app = create_app(MigratedConfig)
+    try:
+        with app.app_context():
+            upgrade(directory=os.path.join(HERE, 'migrations'))
+            assert inspect(db.engine).has_table(search.FTS_TABLE)
+            triggers = db.session.execute(db.text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars()
+            assert sorted(triggers) == ['trade_fts_ad', 'trade_fts_ai', 'trade_fts_au']
+            user = User(username='trader')
+            add_trades(user)
+            assert matching('retest') == ['MNQU5']
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        shutil.rmtree(folder)
+
+if __name__ == "__main__":
+    test_index_stays_in_sync()
+    test_like_fallback()
+    test_api_search_limit()
+    test_migrations_create_index()
+    print("Search tests passed")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tests for the share-card renderer and its content-addressed cache (app/cards.py)
+"""
+
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from config import Config
+from app import create_app, db, cards, tasks
+from app.models import User, Trade, Strategy
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    TESTING = True
+
+
+def test_cards_are_cached_by_content():
+    """Both share routes serve one cached card, re-rendered when the trade changes"""
+    folder = tempfile.mkdtemp()
+    uploads = os.path.join(folder, 'uploads')
+    app = create_app(TestConfig)
+    app.config['CARD_CACHE_FOLDER'] = folder
+    try:
+        with app.app_context():
+            db.create_all()
+            user = User(username='trader', show_on_top_trades=True)
+            strategy = Strategy(name='Breakout', user=user)
+            trade = Trade(ticker='MNQU5', direction='Long', entry_price=21000.0, exit_price=21010.0,
+                          position_size=1, pnl=20.0, entry_date=datetime(2025, 7, 1, 10),
+                          exit_date=datetime(2025, 7, 1, 11), trader=user, strategy=strategy)
+            db.session.add_all([user, trade])
+            db.session.commit()
+
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session['_user_id'] = str(user.id)
+            # Pre-rendering fills the cache the routes serve from
+            tasks.render_cards(app, [trade.id], uploads)
+            key = cards.card_key(trade, uploads)
+            assert sorted(os.listdir(folder)) == sorted(f'{key}.{fmt}' for fmt in cards.PRERENDER_FORMATS)
+            owner = client.get(f'/share_trade/{trade.id}')
+            public = client.get(f'/share_trade/{trade.id}.png')
+            assert owner.status_code == public.status_code == 200
+            assert owner.data[:8] == b'\x89PNG\r\n\x1a\n' and owner.data == public.data
+            first = cards.card_key(trade, uploads)
+            assert first == key
+
+            # Browsers that accept WebP get it; crawlers sending */* get PNG
+            webp = client.get(f'/share_trade/{trade.id}.png', headers={'Accept': 'image/avif,image/webp,*/*'})
+            assert webp.mimetype == 'image/webp' and webp.data[8:12] == b'WEBP'
+            assert len(webp.data) < len(public.data) and 'Accept' in webp.headers['Vary']
+            crawler = client.get(f'/share_trade/{trade.id}.png', headers={'Accept': '*/*'})
+            assert crawler.mimetype == 'image/png' and crawler.data == public.data
+
+            # Fields not drawn on the card keep the key; drawn ones change it
+            trade.notes = 'reviewed'
+            assert cards.card_key(trade, uploads) == first
+            trade.pnl = 25.0
+            assert cards.card_key(trade, uploads) != first
+            db.session.commit()
+            assert client.get(f'/share_trade/{trade.id}.png').data != public.data
+
+            # Repeat views revalidate without rendering; versioned URLs may be cached for good
+            etag = cards.card_key(trade, uploads)
+            response = client.get(f'/share_trade/{trade.id}.png', headers={'If-None-Match': f'"{etag}-png"'})
+            assert response.status_code == 304 and response.headers['ETag'] == f'"{etag}-png"'
+            assert 'no-cache' in response.headers['Cache-Control']
+            response = client.get(f'/share_trade/{trade.id}.png?v={etag[:16]}')
+            assert 'immutable' in response.headers['Cache-Control']
+
+            # The least recently used card is evicted beyond the size limit
+            app.config['CARD_CACHE_MAX_BYTES'] = 1
+            trade.pnl = 30.0
+            path = cards.card_path(trade, uploads, 'webp')
+            assert os.listdir(folder) == [os.path.basename(path)]
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_cache_folder_is_scanned_only_over_the_limit():
+    folder = tempfile.mkdtemp()
+    app = create_app(TestConfig)
+    app.config['CARD_CACHE_FOLDER'] = folder
+    scans = []
+    prune = cards._prune
+
+    def counting_prune(*args):
+        scans.append(args)
+        return prune(*args)
+
+    cards._prune = counting_prune
+    try:
+        with app.app_context():
+            db.create_all()
+            user = User(username='trader')
+            strategy = Strategy(name='Breakout', user=user)
+            trade = Trade(ticker='MNQU5', direction='Long', entry_price=21000.0, exit_price=21010.0,
+                          position_size=1, entry_date=datetime(2025, 7, 1, 10),
+                          exit_date=datetime(2025, 7, 1, 11), trader=user, strategy=strategy)
+            paths = []
+            for pnl in range(4):
+                trade.pnl = float(pnl)
+                paths.append(cards.card_path(trade, folder))
+            # Only the first write scans the folder
+            assert len(scans) == 1 and len(os.listdir(folder)) == 4
+
+            # Crossing the limit scans once and prunes below it, oldest first
+            size = os.path.getsize(paths[-1])
+            app.config['CARD_CACHE_MAX_BYTES'] = sum(os.path.getsize(path) for path in paths) + size // 2
+            trade.pnl = 4.0
+            newest = cards.card_path(trade, folder)
+            assert len(scans) == 2
+            assert not os.path.exists(paths[0]) and os.path.exists(newest)
+    finally:
+        cards._prune = prune
+        cards._folder_bytes.pop(folder, None)
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    test_cards_are_cached_by_content()
+    test_cache_folder_is_scanned_only_over_the_limit()
+    print("Share card tests passed")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the statistics API: conditional requests against the user's
+trade-data version (app/routes.py)
+"""
+
+from datetime import datetime
+from flask import template_rendered
+from config import Config
+from app import create_app, db
+from app.models import User, Trade, Strategy
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    TESTING = True
+
+
+def add_trade(user, strategy, account, pnl):
+    db.session.add(Trade(ticker='MNQU5', account=account, entry_date=datetime(2025, 7, 1, 9),
+                         exit_date=datetime(2025, 7, 1, 10), entry_price=1.0, exit_price=2.0, position_size=1,
+                         direction='Long', strategy=strategy, trader=user, pnl=pnl))
+    db.session.commit()
+
+
+def test_statistics_etag():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(username='trader')
+        strategy = Strategy(name='First', user=user)
+        add_trade(user, strategy, 'A', 50.0)
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+            session['_fresh'] = True
+
+        response = client.get('/api/statistics')
+        assert response.status_code == 200 and response.get_json()['total_pnl'] == 50.0
+        etag = response.headers['ETag']
+        assert response.headers['Cache-Control'] == 'private, no-cache'
+
+        # An unchanged journal revalidates without a body
+        response = client.get('/api/statistics', headers={'If-None-Match': etag})
+        assert response.status_code == 304 and response.data == b''
+        assert response.headers['ETag'] == etag
+
+        # A trade write changes the version
+        add_trade(user, strategy, 'B', -20.0)
+        response = client.get('/api/statistics', headers={'If-None-Match': etag})
+        assert response.status_code == 200 and response.get_json()['total_pnl'] == 30.0
+        assert response.headers['ETag'] != etag
+        etag = response.headers['ETag']
+
+        # Each account filter has its own ETag
+        response = client.get('/api/statistics?account=A', headers={'If-None-Match': etag})
+        assert response.status_code == 200 and response.get_json()['total_pnl'] == 50.0
+        assert response.headers['ETag'] not in (etag, client.get('/api/statistics?account=B').headers['ETag'])
+
+
+def test_statistics_trades_page_size_is_clamped():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(username='trader')
+        strategy = Strategy(name='First', user=user)
+        add_trade(user, strategy, 'A', 50.0)
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+            session['_fresh'] = True
+        rendered = []
+
+        def record(sender, template, context, **extra):
+            rendered.append(context['pagination'].per_page)
+
+        with template_rendered.connected_to(record, app):
+            for per_page in (-5, 0, 100000, 30):
+                assert client.get(f'/statistics/trades?per_page={per_page}').status_code == 200
+        assert rendered == [1, 1, 200, 30]
+
+if __name__ == "__main__":
+    test_statistics_etag()
+    test_statistics_trades_page_size_is_clamped()
+    print("Statistics API tests passed")
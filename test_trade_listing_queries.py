@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Query-count guards for the trade listing and the leaderboard: rendering a
+page must not issue one SELECT per trade for its strategy, tags or trader.
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from config import Config
+from app import create_app, db
+from app.models import User, Trade, Strategy, Tag
+
+# Statements allowed for one rendered page of the listing, independent of its size
+MAX_LISTING_QUERIES = 12
+MAX_TOP_TRADES_QUERIES = 5
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    WTF_CSRF_ENABLED = False
+    TESTING = True
+
+
+def count_queries(client, url):
+    """Number of SQL statements executed while serving url."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_trade_listing_query_count():
+    """The listing issues the same handful of queries for 5 trades as for 100"""
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(username='trader')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.flush()
+        strategies = [Strategy(name=f'Strategy {i}', user_id=user.id) for i in range(5)]
+        tags = [Tag(name=f'tag{i}', user_id=user.id) for i in range(5)]
+        for i in range(100):
+            db.session.add(Trade(
+                ticker='MNQ', account='Sim', direction='Long',
+                entry_date=datetime(2025, 1, 1) + timedelta(hours=i),
+                exit_date=datetime(2025, 1, 1) + timedelta(hours=i, minutes=30),
+                entry_price=100, exit_price=101, position_size=1, pnl=2.0,
+                trader=user, strategy=strategies[i % 5], tags=[tags[i % 5], tags[(i + 1) % 5]],
+            ))
+        db.session.commit()
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+            session['_fresh'] = True
+
+        # The first visit fills the facet cache the listing reads its dropdowns and total from
+        client.get('/index')
+
+        small_page = count_queries(client, '/index?per_page=5')
+        large_page = count_queries(client, '/index?per_page=100')
+
+        print(f"Queries for 5 trades: {small_page}, for 100 trades: {large_page}")
+        assert large_page == small_page
+        assert large_page <= MAX_LISTING_QUERIES
+
+        db.session.remove()
+        db.drop_all()
+
+
+def test_top_trades_query_count():
+    """The leaderboard's card URLs do not load each trade's strategy or trader on its own"""
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        start_of_week = today - timedelta(days=today.weekday())
+        users = [User(username=f'trader{i}', show_on_top_trades=True) for i in range(5)]
+        for i in range(30):
+            user = users[i % 5]
+            db.session.add(Trade(
+                ticker='MNQ', account='Sim', direction='Long',
+                entry_date=start_of_week, exit_date=start_of_week + timedelta(minutes=i),
+                entry_price=100, exit_price=101, position_size=1, pnl=float(i),
+                trader=user, strategy=Strategy(name=f'Strategy {i}', user=user),
+            ))
+        db.session.commit()
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(users[0].id)
+            session['_fresh'] = True
+
+        # The first request also recovers background import jobs
+        client.get('/top_trades')
+
+        small_page = count_queries(client, '/top_trades?per_page=3')
+        large_page = count_queries(client, '/top_trades?per_page=24')
+        print(f"Queries for 3 cards: {small_page}, for 24 cards: {large_page}")
+        # The larger page may already have loaded the current user as a trader
+        assert large_page <= small_page <= MAX_TOP_TRADES_QUERIES
+
+        db.session.remove()
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    test_trade_listing_query_count()
+    test_top_trades_query_count()
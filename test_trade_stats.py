@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the incrementally maintained statistics store (app/stats.py):
+after every kind of write it must agree with the SQL aggregates.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from config import Config
+from app import create_app, db, stats
+from app.models import User, Trade, Strategy, TradeStats
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    TESTING = True
+
+
+def assert_consistent(user_id):
+    for account in (None, 'A', 'B'):
+        # SQLite's julianday() arithmetic leaves rounding noise in holding times
+        assert stats.load_summary(user_id, account) == pytest.approx(stats.aggregate_summary(user_id, account))
+
+
+def test_store_matches_aggregates_after_writes():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(username='trader')
+        db.session.add(user)
+        db.session.flush()
+        first, second = Strategy(name='First', user_id=user.id), Strategy(name='Second', user_id=user.id)
+        db.session.add_all([first, second])
+        start = datetime(2025, 7, 1, 9)
+        for i, pnl in enumerate([120.0, -45.5, 0.0, 310.25, -80.0, None]):
+            db.session.add(Trade(
+                ticker='MNQU5' if i % 2 else 'ESU5', account='A' if i < 3 else 'B',
+                entry_date=start + timedelta(hours=i), exit_date=start + timedelta(hours=i, minutes=30),
+                entry_price=100.0, exit_price=101.0, position_size=1,
+                direction='Long' if i % 3 else 'Short', strategy=first, trader=user, pnl=pnl,
+            ))
+        db.session.commit()
+        # The first read builds the store; later writes are applied incrementally
+        assert_consistent(user.id)
+
+        # Add
+        db.session.add(Trade(ticker='NQU5', account='A', entry_date=start, entry_price=1.0, position_size=2,
+                             direction='Long', strategy=second, trader=user, pnl=999.0))
+        db.session.commit()
+        assert_consistent(user.id)
+
+        # Edit attributes expired by the commit without reading them first
+        trade = Trade.query.filter_by(pnl=310.25).one()
+        db.session.commit()
+        trade.pnl = 15.0
+        trade.direction = 'Short'
+        db.session.commit()
+        assert stats.load_summary(user.id)['largest_win'] == 999.0
+        assert_consistent(user.id)
+
+        # Reassign strategy and account
+        db.session.commit()
+        trade.strategy = second
+        trade.account = 'A'
+        db.session.commit()
+        assert_consistent(user.id)
+
+        # Delete the largest win
+        db.session.delete(Trade.query.filter_by(pnl=999.0).one())
+        db.session.commit()
+        assert stats.load_summary(user.id)['largest_win'] == 120.0
+        assert_consistent(user.id)
+        assert stats.check_user(user.id) == []
+
+
+def test_check_user_rebuilds_drifted_store():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(username='trader')
+        strategy = Strategy(name='First', user=user)
+        db.session.add(Trade(ticker='ESU5', account='A', entry_price=1.0, position_size=1, direction='Long',
+                             strategy=strategy, trader=user, pnl=50.0))
+        db.session.commit()
+        stats.load_summary(user.id)
+        # A bulk write that bypassed the unit of work without calling reset_user()
+        TradeStats.query.filter_by(user_id=user.id).update({'total_pnl': 0, 'win_count': 0})
+        db.session.commit()
+        assert stats.check_user(user.id) == ['account_pnls', 'avg_win', 'total_pnl', 'win_rate']
+        assert stats.load_summary(user.id)['total_pnl'] == 50.0
+        assert stats.check_user(user.id) == []
+
+
+if __name__ == "__main__":
+    test_store_matches_aggregates_after_writes()
+    test_check_user_rebuilds_drifted_store()
+    print("Trade statistics store test passed")